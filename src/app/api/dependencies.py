@@ -4,7 +4,8 @@ from fastapi import Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
-from ..core.db.database import async_get_db
+from ..core.db.database import release_connection
+from ..core.db.replicas import async_get_read_db
 from ..core.exceptions.http_exceptions import ForbiddenException, RateLimitException, UnauthorizedException
 from ..core.logger import logging
 from ..core.security import oauth2_scheme, verify_token
@@ -22,7 +23,7 @@ DEFAULT_PERIOD = settings.DEFAULT_RATE_LIMIT_PERIOD
 
 
 async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)], db: Annotated[AsyncSession, Depends(async_get_db)]
+    token: Annotated[str, Depends(oauth2_scheme)], db: Annotated[AsyncSession, Depends(async_get_read_db)]
 ) -> dict[str, Any] | None:
     token_data = await verify_token(token, db)
     if token_data is None:
@@ -39,7 +40,18 @@ async def get_current_user(
     raise UnauthorizedException("User not authenticated.")
 
 
-async def get_optional_user(request: Request, db: AsyncSession = Depends(async_get_db)) -> dict | None:
+async def get_current_user_without_db(
+    current_user: Annotated[dict, Depends(get_current_user)], db: Annotated[AsyncSession, Depends(async_get_read_db)]
+) -> dict:
+    """`get_current_user` for endpoints that do no database work of their own, such as ones answered from Redis.
+
+    The connection used to authenticate goes back to the pool right away instead of at the end of the response.
+    """
+    await release_connection(db)
+    return current_user
+
+
+async def get_optional_user(request: Request, db: AsyncSession = Depends(async_get_read_db)) -> dict | None:
     token = request.headers.get("Authorization")
     if not token:
         return None
@@ -73,7 +85,9 @@ async def get_current_superuser(current_user: Annotated[dict, Depends(get_curren
 
 
 async def rate_limiter(
-    request: Request, db: Annotated[AsyncSession, Depends(async_get_db)], user: User | None = Depends(get_optional_user)
+    request: Request,
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
+    user: User | None = Depends(get_optional_user),
 ) -> None:
     path = sanitize_path(request.url.path)
     if user:
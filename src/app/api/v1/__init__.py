@@ -6,6 +6,8 @@ from .users import router as users_router
 from .chat import router as chat_router
 from .conversations import router as conversations_router
 from .google_auth import router as google_auth_router
+from .llm_usage import router as llm_usage_router
+from .metrics import router as metrics_router
 
 router = APIRouter(prefix="/v1")
 router.include_router(login_router)
@@ -13,4 +15,6 @@ router.include_router(logout_router)
 router.include_router(users_router)
 router.include_router(chat_router)
 router.include_router(conversations_router)
-router.include_router(google_auth_router)
\ No newline at end of file
+router.include_router(google_auth_router)
+router.include_router(metrics_router)
+router.include_router(llm_usage_router)
\ No newline at end of file
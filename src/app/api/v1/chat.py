@@ -1,82 +1,135 @@
+import asyncio
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
+from arq.jobs import Job, JobStatus
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from ...core.config import settings
 from ...core.db.database import async_get_db
-from ...schemas.chat import ChatRequest, ChatResponse
-from ...services.openai_service import OpenAIService
-from ...api.dependencies import get_current_user
+from ...core.db.unit_of_work import async_get_uow_db
+from ...schemas.chat import ChatJobResponse, ChatJobStatus, ChatRequest, ChatResponse
+from ...api.dependencies import get_current_user, get_current_user_without_db
 from ...schemas.user import UserRead
-from ...crud.crud_conversations import crud_conversations
-from ...schemas.conversation import ConversationRead, QueryCreate, ConversationCreateInternal, QueryUpdate
-from datetime import datetime, UTC
+from ...core.utils import queue
+from ...core.utils.disconnect import ClientDisconnected, cancel_on_disconnect
+from ...services import chat_service, conversation_turns
+from ...schemas.conversation import QueryCreate, QueryUpdate
 from uuid import uuid4
 
 router = APIRouter(tags=["chat"])
 
-# Initialize OpenAI service
-openai_service = OpenAIService()
 
-    
-@router.post("/chat", response_model=ChatResponse)
+async def _get_chat_job_status(job_id: str, user_id: int) -> ChatJobStatus:
+    if queue.pool is None:
+        raise HTTPException(status_code=503, detail="Job queue is not available")
+
+    job = Job(job_id, redis=queue.pool)
+    info = await job.info()
+    if info is None or info.function != "generate_chat_job" or info.args[0] != user_id:
+        raise HTTPException(status_code=404, detail="Chat job not found")
+
+    status = await job.status()
+    job_status = ChatJobStatus(job_id=job_id, status=status.value)
+    if status == JobStatus.complete:
+        result = await job.result_info()
+        if result is not None and result.success:
+            job_status.result = ChatResponse(**result.result)
+        elif result is not None:
+            job_status.error = str(result.result)
+    else:
+        progress = await queue.pool.get(f"{chat_service.PROGRESS_KEY_PREFIX}:{job_id}")
+        job_status.progress = progress.decode() if progress else None
+
+    return job_status
+
+
+@router.post("/chat", response_model=ChatResponse | ChatJobResponse)
 async def chat(
     request: ChatRequest,
+    http_request: Request,
+    response: Response,
     current_user: Annotated[UserRead, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(async_get_db)]
-) -> ChatResponse:
-    try:
-        # Generate response from OpenAI
-        response = await openai_service.generate_chat_response(
-            message=request.message,
-            follow_up=request.follow_up,
-            image_url=request.image_url,
-            file=request.file
-        )
+    db: Annotated[AsyncSession, Depends(async_get_db)],
+    background: bool = False,
+) -> ChatResponse | ChatJobResponse:
+    """
+    Answers a chat message. With `background=true` the turn is queued for the worker instead and a job id is
+    returned immediately; poll `/chat/jobs/{job_id}` or follow `/chat/jobs/{job_id}/events` for the result.
+    Otherwise the answer is generated in the request, and abandoned if the client disconnects first.
+    """
+    if background:
+        if queue.pool is None:
+            raise HTTPException(status_code=503, detail="Job queue is not available")
+        if request.file is not None:
+            raise HTTPException(status_code=400, detail="File uploads are not supported for background chat jobs")
 
-        # Handle conversation creation or update
-        if request.conversation_id:
-            # Get existing conversation
-            conversation = await crud_conversations.get(
-                db=db,
-                schema_to_select=ConversationRead,
-                id=request.conversation_id,
-                created_by_user_id=current_user["id"],
-                is_deleted=False
-            )
-            if not conversation:
-                raise HTTPException(status_code=404, detail="Conversation not found")
-            conversation_id = request.conversation_id
-        else:
-            # Create new conversation
-            conversation_internal = ConversationCreateInternal(
-                created_by_user_id=current_user["id"],
-                queries=[]
-            )
-            conversation = await crud_conversations.create(db=db, object=conversation_internal)
-            conversation_id = conversation["id"]
-
-        # Create new query with serialized datetime and identifiers
-        query = {
-            "id": len(conversation["queries"]) ,  # Auto-incrementing ID
-            "uuid": str(uuid4()),  # UUID for the query
-            "query": request.message if not request.follow_up else request.follow_up,
-            "response": response,
-            "created_at": datetime.now(UTC).isoformat(),
-            "updated_at": None,
-            "is_affected": None
-        }
-
-        # Add query to conversation
-        queries = conversation["queries"] + [query]
-        await crud_conversations.update(
-            db=db,
-            id=conversation_id,
-            object={"queries": queries}
+        job = await queue.pool.enqueue_job(
+            "generate_chat_job",
+            current_user["id"],
+            request.model_dump(exclude={"file"}),
+            _job_id=f"chat:{uuid4().hex}",
         )
+        response.status_code = 202
+        return ChatJobResponse(job_id=job.job_id, status=(await job.status()).value)
 
-        return ChatResponse(response=response, conversation_id=conversation_id, query_id=query["id"])
+    try:
+        return await cancel_on_disconnect(
+            http_request, chat_service.run_chat_turn(db=db, current_user=current_user, request=request)
+        )
+    except ClientDisconnected:
+        # nobody is listening any more, 499 only shows up in the access log
+        return Response(status_code=499)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
-    
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/chat/jobs/{job_id}", response_model=ChatJobStatus)
+async def get_chat_job(
+    job_id: str,
+    current_user: Annotated[UserRead, Depends(get_current_user_without_db)],
+) -> ChatJobStatus:
+    """
+    Returns the status of a background chat job and its result once it is complete.
+    """
+    return await _get_chat_job_status(job_id, current_user["id"])
+
+
+@router.get("/chat/jobs/{job_id}/events")
+async def stream_chat_job_events(
+    job_id: str,
+    http_request: Request,
+    current_user: Annotated[UserRead, Depends(get_current_user_without_db)],
+) -> StreamingResponse:
+    """
+    Streams the progress of a background chat job as server-sent events. A `progress` event is sent on every
+    change and the stream ends with a `result` event once the job is complete.
+    """
+    user_id = current_user["id"]
+    job_status = await _get_chat_job_status(job_id, user_id)
+
+    async def event_stream():
+        current = job_status
+        last_payload = None
+        while True:
+            payload = current.model_dump_json()
+            finished = current.status in (JobStatus.complete.value, JobStatus.not_found.value)
+            if payload != last_payload:
+                yield f"event: {'result' if finished else 'progress'}\ndata: {payload}\n\n"
+                last_payload = payload
+
+            if finished or await http_request.is_disconnected():
+                return
+
+            await asyncio.sleep(settings.CHAT_JOB_EVENTS_POLL_INTERVAL)
+            try:
+                current = await _get_chat_job_status(job_id, user_id)
+            except HTTPException:
+                return
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 
 @router.patch("/chat/{conversation_id}/query/{query_id}")
 async def update_query(
@@ -84,50 +137,26 @@ async def update_query(
     query_id: int,
     update_data: QueryUpdate,
     current_user: Annotated[UserRead, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(async_get_db)]
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)]
 ) -> dict[str, str]:
+    if not await conversation_turns.conversation_exists(
+        db=db, id=conversation_id, created_by_user_id=current_user["id"], is_deleted=False
+    ):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
     try:
-        # Get existing conversation
-        conversation = await crud_conversations.get(
-            db=db,
-            schema_to_select=ConversationRead,
-            id=conversation_id,
-            created_by_user_id=current_user["id"],
-            is_deleted=False
-        )
-        
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-
-        # Find the query to update
-        queries = conversation["queries"]
-        query_index = -1
-        
-        for i, query in enumerate(queries):
-            if query["id"] == query_id:
-                query_index = i
-                break
-                
-        if query_index == -1:
-            raise HTTPException(status_code=404, detail="Query not found")
-
-        # Update the query
-        queries[query_index]["query"] = update_data.query
-        queries[query_index]["response"] = update_data.response
-        queries[query_index]["updated_at"] = datetime.now(UTC).isoformat()
-
-        # Mark all subsequent queries as affected
-        for i in range(query_index + 1, len(queries)):
-            queries[i]["is_affected"] = True
-
-        # Update the conversation with modified queries
-        await crud_conversations.update(
+        # Later turns are reported as affected by the edit when the conversation is read
+        updated = await conversation_turns.update_turn(
             db=db,
-            id=conversation_id,
-            object={"queries": queries}
+            conversation_id=conversation_id,
+            seq=query_id,
+            query=update_data.query,
+            response=update_data.response,
         )
-
-        return {"message": "Query updated successfully"}
-        
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not updated:
+        raise HTTPException(status_code=404, detail="Query not found")
+
+    return {"message": "Query updated successfully"}
@@ -1,15 +1,24 @@
 from typing import Annotated
-from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..dependencies import get_current_user
-from ...core.db.database import async_get_db
+from ...core.db.unit_of_work import async_get_uow_db
+from ...core.db.replicas import async_get_read_db
 from ...crud.crud_conversations import crud_conversations
 from ...crud.crud_users import crud_users
-from ...schemas.conversation import ConversationCreateInternal, ConversationRead, ConversationDelete, QueryCreate
+from ...schemas.conversation import (
+    ConversationCreateInternal,
+    ConversationDelete,
+    ConversationPage,
+    ConversationRead,
+    ConversationSearchPage,
+    QueryCreate,
+)
 from ...schemas.user import UserRead
+from ...services import conversation_export, conversation_search, conversation_turns
 from datetime import datetime, UTC
 
 router = APIRouter(tags=["conversations"])
@@ -17,7 +26,7 @@ router = APIRouter(tags=["conversations"])
 
 @router.post("/conversations", response_model=ConversationRead, status_code=201)
 async def create_conversation(
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)],
     current_user: Annotated[UserRead, Depends(get_current_user)],
 ) -> ConversationRead:
     """
@@ -31,45 +40,80 @@ async def create_conversation(
     return created_conversation
 
 
-# @from fastapi import HTTPException
-from typing import List
-
-@router.get("/conversations", response_model=List[ConversationRead])
+@router.get("/conversations", response_model=ConversationPage)
 async def get_conversations(
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
     current_user: Annotated[UserRead, Depends(get_current_user)],
-) -> List[ConversationRead]:
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: str | None = None,
+) -> dict:
     """
-    Retrieves all conversations created by the authenticated user.
+    Lists the authenticated user's conversations, newest first, without their turns. Pass the returned
+    `next_cursor` as `cursor` to get the next page; it is null on the last page.
     """
-    # Fetch the conversations
-    conversations = await crud_conversations.get_multi(
-        db=db, schema_to_select=ConversationRead, created_by_user_id=current_user["id"], is_deleted=False
-    )
+    return await conversation_turns.list_conversations(db=db, user_id=current_user["id"], limit=limit, cursor=cursor)
 
-    # Ensure we're returning a list of conversations
-    if isinstance(conversations, dict) and 'data' in conversations:
-        return conversations['data']
 
-    # If no conversations are found, return an empty list
-    if not conversations:
-        return []
+@router.get("/conversations/export", response_class=StreamingResponse)
+async def export_conversations(
+    current_user: Annotated[UserRead, Depends(get_current_user)],
+    gzip: bool = False,
+) -> StreamingResponse:
+    """
+    Downloads all conversations of the authenticated user with their turns as newline-delimited JSON: a
+    `conversation` line followed by its `turn` lines, for every conversation. With `gzip=true` the download is
+    gzip-compressed.
+    """
+    filename = "conversations.ndjson.gz" if gzip else "conversations.ndjson"
+    return StreamingResponse(
+        conversation_export.export_chunks(current_user["id"], compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-    return conversations
 
+@router.get("/conversations/search", response_model=ConversationSearchPage)
+async def search_conversations(
+    q: Annotated[str, Query(min_length=1, max_length=500)],
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
+    current_user: Annotated[UserRead, Depends(get_current_user)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: str | None = None,
+) -> dict:
+    """
+    Searches the queries and responses of the authenticated user's conversations and returns the matching turns,
+    best matches first, with highlighted snippets. `q` supports quoted phrases, `or` and `-` to exclude words.
+    Pass the returned `next_cursor` as `cursor` to get the next page.
+    """
+    return await conversation_search.search_turns(
+        db=db, user_id=current_user["id"], q=q, limit=limit, cursor=cursor
+    )
 
 
 @router.get("/conversations/{id}", response_model=ConversationRead)
 async def get_conversation(
     id: int,
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
     current_user: Annotated[UserRead, Depends(get_current_user)],
+    limit: Annotated[int | None, Query(ge=1, le=500)] = None,
+    before: int | None = None,
+    after: int | None = None,
 ) -> ConversationRead:
     """
     Retrieves a single conversation by ID for the authenticated user.
+
+    Without parameters all turns are returned. `limit` returns only the latest `limit` turns, `before` and `after`
+    the turns before or after the given turn id. Use `previous_cursor` as `before` to scroll back and
+    `next_cursor` as `after` to scroll forward; `turn_count` is the total number of turns.
     """
-    conversation = await crud_conversations.get(
-        db=db, schema_to_select=ConversationRead, id=id, created_by_user_id=current_user["id"], is_deleted=False
+    conversation = await conversation_turns.get_conversation(
+        db=db,
+        limit=limit,
+        before=before,
+        after=after,
+        id=id,
+        created_by_user_id=current_user["id"],
+        is_deleted=False,
     )
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
@@ -79,16 +123,15 @@ async def get_conversation(
 @router.delete("/conversations/{id}", status_code=204)
 async def delete_conversation(
     id: int,
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)],
     current_user: Annotated[UserRead, Depends(get_current_user)],
 ) -> None:
     """
     Soft-deletes a conversation by ID for the authenticated user.
     """
-    conversation = await crud_conversations.get(
-        db=db, schema_to_select=ConversationRead, id=id, created_by_user_id=current_user["id"], is_deleted=False
-    )
-    if conversation is None:
+    if not await conversation_turns.conversation_exists(
+        db=db, id=id, created_by_user_id=current_user["id"], is_deleted=False
+    ):
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     delete_schema = ConversationDelete(is_deleted=True, deleted_at=datetime.now(UTC))
@@ -99,35 +142,20 @@ async def delete_conversation(
 async def add_query_to_conversation(
     id: int,
     query: QueryCreate,
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)],
     current_user: Annotated[UserRead, Depends(get_current_user)],
 ) -> ConversationRead:
     """
-    Adds a new query to an existing conversation.
+    Adds a new query to an existing conversation. Returns the conversation with only the new query under
+    `queries`; `previous_cursor` pages back through the earlier ones.
     """
-    conversation = await crud_conversations.get(
-        db=db, schema_to_select=ConversationRead, id=id, created_by_user_id=current_user["id"], is_deleted=False
-    )
-    if conversation is None:
+    if not await conversation_turns.conversation_exists(
+        db=db, id=id, created_by_user_id=current_user["id"], is_deleted=False
+    ):
         raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    # Create new query object with UUID
-    new_query = {
-        "id": str(uuid4()),
-        "query": query.query,
-        "created_at": datetime.now(UTC).isoformat()
-    }
-    
-    # Get existing queries and append new one
-    existing_queries = conversation["queries"]
-    existing_queries.append(new_query)
-    
-    # Update conversation with new queries list
-    update_data = {"queries": existing_queries}
-    await crud_conversations.update(db=db, id=id, object=update_data)
-    
-    # Get and return updated conversation
-    updated_conversation = await crud_conversations.get(
-        db=db, schema_to_select=ConversationRead, id=id, created_by_user_id=current_user["id"], is_deleted=False
+
+    turn = await conversation_turns.append_turn(db=db, conversation_id=id, query=query.query, response=query.response)
+
+    return await conversation_turns.get_conversation(
+        db=db, limit=1, after=turn["id"] - 1, id=id, created_by_user_id=current_user["id"], is_deleted=False
     )
-    return updated_conversation
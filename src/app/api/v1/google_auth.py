@@ -8,6 +8,7 @@ import logging
 
 from ...core.config import settings
 from ...core.db.database import async_get_db
+from ...core.db.replicas import mark_write
 from ...core.security import create_access_token, create_refresh_token
 from ...crud.crud_users import crud_users
 from ...schemas.google_auth import GoogleAuthRequest, GoogleUser
@@ -77,6 +78,7 @@ async def google_auth(
             user_internal = UserCreateInternal(**user_data)
             db_user = await crud_users.create(db=db, object=user_internal)
             db_user = db_user.model_dump()
+            await mark_write(db_user["username"])
 
         # Create tokens
         access_token = await create_access_token(data={"sub": db_user["username"]})
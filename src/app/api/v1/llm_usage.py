@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...api.dependencies import get_current_superuser
+from ...core.db.replicas import async_get_read_db
+from ...schemas.llm_usage import LLMUsageAggregate
+from ...services import llm_usage
+
+router = APIRouter(tags=["usage"])
+
+
+@router.get("/usage/users", response_model=list[LLMUsageAggregate], dependencies=[Depends(get_current_superuser)])
+async def read_usage_by_user(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[dict[str, Any]]:
+    return await llm_usage.aggregate(db=db, group_by="user", start=start, end=end)
+
+
+@router.get("/usage/tiers", response_model=list[LLMUsageAggregate], dependencies=[Depends(get_current_superuser)])
+async def read_usage_by_tier(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[dict[str, Any]]:
+    return await llm_usage.aggregate(db=db, group_by="tier", start=start, end=end)
+
+
+@router.get("/usage/days", response_model=list[LLMUsageAggregate], dependencies=[Depends(get_current_superuser)])
+async def read_usage_by_day(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[dict[str, Any]]:
+    return await llm_usage.aggregate(db=db, group_by="day", start=start, end=end)
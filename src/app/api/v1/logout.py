@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Response
 from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...core.db.database import async_get_db
+from ...core.db.unit_of_work import async_get_uow_db
 from ...core.exceptions.http_exceptions import UnauthorizedException
 from ...core.security import blacklist_token, oauth2_scheme
 
@@ -11,7 +11,7 @@ router = APIRouter(tags=["login"])
 
 @router.post("/logout")
 async def logout(
-    response: Response, access_token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(async_get_db)
+    response: Response, access_token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(async_get_uow_db)
 ) -> dict[str, str]:
     try:
         await blacklist_token(token=access_token, db=db)
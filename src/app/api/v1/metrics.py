@@ -0,0 +1,13 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, Request
+
+from ...api.dependencies import get_current_superuser
+from ...core.utils import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", dependencies=[Depends(get_current_superuser)])
+async def read_metrics(request: Request) -> dict[str, Any]:
+    return metrics.snapshot()
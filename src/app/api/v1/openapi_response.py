@@ -1,64 +1,50 @@
 from fastapi import APIRouter, UploadFile, Form, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
-import os
-import openai
-import PyPDF2
-from ...core.config import settings
+from typing import Annotated, Optional
+from ..dependencies import get_optional_user
+from ...schemas.user import UserRead
+from ...services import chat_service, document_extraction, llm_cache, upload_store
+from ...services.openai_service import OpenAIService
 # import docx
 
 # Import database session if needed
-from ...core.db.database import async_get_db
+from ...core.config import settings
+from ...core.db.database import async_get_db, release_connection
 
 router = APIRouter(tags=["generate-api"])
 
-# Configuration
-UPLOAD_FOLDER = "./uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
 # Global variable to store conversation history
 conversation_history = []
 
+openai_service = OpenAIService()
+
 
-def extract_text_from_file(file_path: str) -> str:
+async def extract_text_from_file(file_path: str, filename: str, digest: str | None = None) -> str:
     """
     Extract text from different file types.
     """
-    file_extension = os.path.splitext(file_path)[1].lower()
-    try:
-        if file_extension == ".pdf":
-            with open(file_path, "rb") as file:
-                reader = PyPDF2.PdfReader(file)
-                text = "\n".join([page.extract_text() for page in reader.pages])
-                return text
-        # elif file_extension in [".docx", ".doc"]:
-        #     doc = docx.Document(file_path)
-        #     return "\n".join([paragraph.text for paragraph in doc.paragraphs])
-        elif file_extension == ".txt":
-            with open(file_path, "r", encoding="utf-8") as file:
-                return file.read()
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
+    return await document_extraction.extract_text_from_path(file_path, filename, digest=digest)
 
 
 @router.post("/generate-api")
 async def generate_api(
+    current_user: Annotated[UserRead | None, Depends(get_optional_user)],
     specification: Optional[str] = Form(None),
     follow_up: Optional[str] = Form(None),
     file: Optional[UploadFile] = None,
-    db: AsyncSession = Depends(async_get_db),  # Dependency if needed
+    db: AsyncSession = Depends(async_get_db),
 ) -> JSONResponse:
     global conversation_history
 
+    # The tier decides whether the response cache is used, anonymous requests get the setting of users without one
+    tier_name = await chat_service.get_tier_name(db, current_user) if current_user else None
+    await release_connection(db)
+
     # Handle file upload if present
     if file:
-        file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        specification = extract_text_from_file(file_path)
+        stored = await upload_store.store_upload(file)
+        specification = await extract_text_from_file(stored.path, file.filename, digest=stored.digest)
 
     # Validate input
     if not specification and not follow_up:
@@ -99,14 +85,17 @@ async def generate_api(
     messages.append(current_message)
 
     # Call OpenAI API
-    openai.api_key = settings.OPENAI_API_KEY
     try:
-        response = openai.chat.completions.create(
+        generated_response = await openai_service.create_completion(
+            messages,
             model="gpt-4",
-            messages=messages,
             temperature=0.7,
+            # API specs run long, so /generate-api gets a larger limit than chat
+            max_tokens=settings.OPENAI_GENERATE_API_MAX_TOKENS,
+            use_cache=llm_cache.is_enabled_for_tier(tier_name),
+            tier=tier_name,
+            user_id=current_user["id"] if current_user else None,
         )
-        generated_response = response.choices[0].message.content
 
         # Update conversation history
         conversation_history.append(current_message)
@@ -5,32 +5,24 @@ from fastcrud.paginated import PaginatedListResponse, compute_offset, paginated_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...api.dependencies import get_current_superuser
-from ...core.db.database import async_get_db
-from ...core.exceptions.http_exceptions import DuplicateValueException, NotFoundException, RateLimitException
-from ...crud.crud_rate_limit import crud_rate_limits
-from ...crud.crud_tier import crud_tiers
-from ...schemas.rate_limit import RateLimitCreate, RateLimitCreateInternal, RateLimitRead, RateLimitUpdate
+from ...core.db.replicas import async_get_read_db
+from ...core.db.unit_of_work import async_get_uow_db
+from ...schemas.rate_limit import RateLimitCreate, RateLimitRead, RateLimitUpdate
+from ...services import rate_limits
 
 router = APIRouter(tags=["rate_limits"])
 
 
 @router.post("/tier/{tier_name}/rate_limit", dependencies=[Depends(get_current_superuser)], status_code=201)
 async def write_rate_limit(
-    request: Request, tier_name: str, rate_limit: RateLimitCreate, db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request,
+    tier_name: str,
+    rate_limit: RateLimitCreate,
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)],
 ) -> RateLimitRead:
-    db_tier = await crud_tiers.get(db=db, name=tier_name)
-    if not db_tier:
-        raise NotFoundException("Tier not found")
-
-    rate_limit_internal_dict = rate_limit.model_dump()
-    rate_limit_internal_dict["tier_id"] = db_tier["id"]
-
-    db_rate_limit = await crud_rate_limits.exists(db=db, name=rate_limit_internal_dict["name"])
-    if db_rate_limit:
-        raise DuplicateValueException("Rate Limit Name not available")
-
-    rate_limit_internal = RateLimitCreateInternal(**rate_limit_internal_dict)
-    created_rate_limit: RateLimitRead = await crud_rate_limits.create(db=db, object=rate_limit_internal)
+    created_rate_limit: RateLimitRead = await rate_limits.create_rate_limit(
+        db=db, tier_name=tier_name, rate_limit=rate_limit
+    )
     return created_rate_limit
 
 
@@ -38,20 +30,12 @@ async def write_rate_limit(
 async def read_rate_limits(
     request: Request,
     tier_name: str,
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
     page: int = 1,
     items_per_page: int = 10,
 ) -> dict:
-    db_tier = await crud_tiers.get(db=db, name=tier_name)
-    if not db_tier:
-        raise NotFoundException("Tier not found")
-
-    rate_limits_data = await crud_rate_limits.get_multi(
-        db=db,
-        offset=compute_offset(page, items_per_page),
-        limit=items_per_page,
-        schema_to_select=RateLimitRead,
-        tier_id=db_tier["id"],
+    rate_limits_data = await rate_limits.list_rate_limits(
+        db=db, tier_name=tier_name, offset=compute_offset(page, items_per_page), limit=items_per_page
     )
 
     response: dict[str, Any] = paginated_response(crud_data=rate_limits_data, page=page, items_per_page=items_per_page)
@@ -60,19 +44,9 @@ async def read_rate_limits(
 
 @router.get("/tier/{tier_name}/rate_limit/{id}", response_model=RateLimitRead)
 async def read_rate_limit(
-    request: Request, tier_name: str, id: int, db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request, tier_name: str, id: int, db: Annotated[AsyncSession, Depends(async_get_read_db)]
 ) -> dict:
-    db_tier = await crud_tiers.get(db=db, name=tier_name)
-    if not db_tier:
-        raise NotFoundException("Tier not found")
-
-    db_rate_limit: dict | None = await crud_rate_limits.get(
-        db=db, schema_to_select=RateLimitRead, tier_id=db_tier["id"], id=id
-    )
-    if db_rate_limit is None:
-        raise NotFoundException("Rate Limit not found")
-
-    return db_rate_limit
+    return await rate_limits.get_rate_limit(db=db, tier_name=tier_name, id=id)
 
 
 @router.patch("/tier/{tier_name}/rate_limit/{id}", dependencies=[Depends(get_current_superuser)])
@@ -81,39 +55,15 @@ async def patch_rate_limit(
     tier_name: str,
     id: int,
     values: RateLimitUpdate,
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)],
 ) -> dict[str, str]:
-    db_tier = await crud_tiers.get(db=db, name=tier_name)
-    if db_tier is None:
-        raise NotFoundException("Tier not found")
-
-    db_rate_limit = await crud_rate_limits.get(db=db, schema_to_select=RateLimitRead, tier_id=db_tier["id"], id=id)
-    if db_rate_limit is None:
-        raise NotFoundException("Rate Limit not found")
-
-    db_rate_limit_path = await crud_rate_limits.exists(db=db, tier_id=db_tier["id"], path=values.path)
-    if db_rate_limit_path:
-        raise DuplicateValueException("There is already a rate limit for this path")
-
-    await crud_rate_limits.exists(db=db)
-    if db_rate_limit_path:
-        raise DuplicateValueException("There is already a rate limit with this name")
-
-    await crud_rate_limits.update(db=db, object=values, id=db_rate_limit["id"])
+    await rate_limits.update_rate_limit(db=db, tier_name=tier_name, id=id, values=values)
     return {"message": "Rate Limit updated"}
 
 
 @router.delete("/tier/{tier_name}/rate_limit/{id}", dependencies=[Depends(get_current_superuser)])
 async def erase_rate_limit(
-    request: Request, tier_name: str, id: int, db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request, tier_name: str, id: int, db: Annotated[AsyncSession, Depends(async_get_uow_db)]
 ) -> dict[str, str]:
-    db_tier = await crud_tiers.get(db=db, name=tier_name)
-    if not db_tier:
-        raise NotFoundException("Tier not found")
-
-    db_rate_limit = await crud_rate_limits.get(db=db, schema_to_select=RateLimitRead, tier_id=db_tier["id"], id=id)
-    if db_rate_limit is None:
-        raise NotFoundException("Rate Limit not found")
-
-    await crud_rate_limits.delete(db=db, id=db_rate_limit["id"])
+    await rate_limits.delete_rate_limit(db=db, tier_name=tier_name, id=id)
     return {"message": "Rate Limit deleted"}
@@ -5,31 +5,31 @@ from fastcrud.paginated import PaginatedListResponse, compute_offset, paginated_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...api.dependencies import get_current_superuser
-from ...core.db.database import async_get_db
-from ...core.exceptions.http_exceptions import DuplicateValueException, NotFoundException
+from ...core.db.replicas import async_get_read_db
+from ...core.db.unit_of_work import async_get_uow_db
+from ...core.exceptions.http_exceptions import NotFoundException
 from ...crud.crud_tier import crud_tiers
 from ...schemas.tier import TierCreate, TierCreateInternal, TierRead, TierUpdate
+from ...services import tiers
 
 router = APIRouter(tags=["tiers"])
 
 
 @router.post("/tier", dependencies=[Depends(get_current_superuser)], status_code=201)
 async def write_tier(
-    request: Request, tier: TierCreate, db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request, tier: TierCreate, db: Annotated[AsyncSession, Depends(async_get_uow_db)]
 ) -> TierRead:
-    tier_internal_dict = tier.model_dump()
-    db_tier = await crud_tiers.exists(db=db, name=tier_internal_dict["name"])
-    if db_tier:
-        raise DuplicateValueException("Tier Name not available")
-
-    tier_internal = TierCreateInternal(**tier_internal_dict)
-    created_tier: TierRead = await crud_tiers.create(db=db, object=tier_internal)
+    tier_internal = TierCreateInternal(**tier.model_dump())
+    created_tier: TierRead = await tiers.create_tier(db=db, tier=tier_internal)
     return created_tier
 
 
 @router.get("/tiers", response_model=PaginatedListResponse[TierRead])
 async def read_tiers(
-    request: Request, db: Annotated[AsyncSession, Depends(async_get_db)], page: int = 1, items_per_page: int = 10
+    request: Request,
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
+    page: int = 1,
+    items_per_page: int = 10,
 ) -> dict:
     tiers_data = await crud_tiers.get_multi(
         db=db, offset=compute_offset(page, items_per_page), limit=items_per_page, schema_to_select=TierRead
@@ -40,7 +40,7 @@ async def read_tiers(
 
 
 @router.get("/tier/{name}", response_model=TierRead)
-async def read_tier(request: Request, name: str, db: Annotated[AsyncSession, Depends(async_get_db)]) -> dict:
+async def read_tier(request: Request, name: str, db: Annotated[AsyncSession, Depends(async_get_read_db)]) -> dict:
     db_tier: TierRead | None = await crud_tiers.get(db=db, schema_to_select=TierRead, name=name)
     if db_tier is None:
         raise NotFoundException("Tier not found")
@@ -50,21 +50,15 @@ async def read_tier(request: Request, name: str, db: Annotated[AsyncSession, Dep
 
 @router.patch("/tier/{name}", dependencies=[Depends(get_current_superuser)])
 async def patch_tier(
-    request: Request, values: TierUpdate, name: str, db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request, values: TierUpdate, name: str, db: Annotated[AsyncSession, Depends(async_get_uow_db)]
 ) -> dict[str, str]:
-    db_tier = await crud_tiers.get(db=db, schema_to_select=TierRead, name=name)
-    if db_tier is None:
-        raise NotFoundException("Tier not found")
-
-    await crud_tiers.update(db=db, object=values, name=name)
+    await tiers.update_tier(db=db, name=name, values=values)
     return {"message": "Tier updated"}
 
 
 @router.delete("/tier/{name}", dependencies=[Depends(get_current_superuser)])
-async def erase_tier(request: Request, name: str, db: Annotated[AsyncSession, Depends(async_get_db)]) -> dict[str, str]:
-    db_tier = await crud_tiers.get(db=db, schema_to_select=TierRead, name=name)
-    if db_tier is None:
-        raise NotFoundException("Tier not found")
-
-    await crud_tiers.delete(db=db, name=name)
+async def erase_tier(
+    request: Request, name: str, db: Annotated[AsyncSession, Depends(async_get_uow_db)]
+) -> dict[str, str]:
+    await tiers.delete_tier(db=db, name=name)
     return {"message": "Tier deleted"}
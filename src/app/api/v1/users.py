@@ -1,47 +1,56 @@
 from typing import Annotated, Any
+from uuid import uuid4
 
-from fastapi import APIRouter, Depends, Request
+from arq.jobs import Job, JobStatus
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile
 from fastcrud.paginated import PaginatedListResponse, compute_offset, paginated_response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...api.dependencies import get_current_superuser, get_current_user
-from ...core.db.database import async_get_db
-from ...core.exceptions.http_exceptions import DuplicateValueException, ForbiddenException, NotFoundException
+from ...api.dependencies import get_current_superuser, get_current_user, get_current_user_without_db
+from ...core.db.replicas import async_get_read_db, mark_write
+from ...core.db.unit_of_work import async_get_uow_db
+from ...core.exceptions.http_exceptions import NotFoundException
 from ...core.security import blacklist_token, get_password_hash, oauth2_scheme
-from ...crud.crud_rate_limit import crud_rate_limits
-from ...crud.crud_tier import crud_tiers
+from ...core.utils import queue
 from ...crud.crud_users import crud_users
-from ...models.tier import Tier
-from ...schemas.tier import TierRead
-from ...schemas.user import UserCreate, UserCreateInternal, UserRead, UserTierUpdate, UserUpdate
+from ...schemas.user import (
+    UserCreate,
+    UserCreateInternal,
+    UserImportJob,
+    UserImportJobStatus,
+    UserImportResult,
+    UserRead,
+    UserTierBulkResult,
+    UserTierBulkUpdate,
+    UserTierUpdate,
+    UserUpdate,
+)
+from ...services import user_import, users
 
 router = APIRouter(tags=["users"])
 
 
 @router.post("/user", response_model=UserRead, status_code=201)
 async def write_user(
-    request: Request, user: UserCreate, db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request, user: UserCreate, db: Annotated[AsyncSession, Depends(async_get_uow_db)]
 ) -> UserRead:
-    email_row = await crud_users.exists(db=db, email=user.email)
-    if email_row:
-        raise DuplicateValueException("Email is already registered")
-
-    username_row = await crud_users.exists(db=db, username=user.username)
-    if username_row:
-        raise DuplicateValueException("Username not available")
-
     user_internal_dict = user.model_dump()
     user_internal_dict["hashed_password"] = get_password_hash(password=user_internal_dict["password"])
     del user_internal_dict["password"]
 
     user_internal = UserCreateInternal(**user_internal_dict)
-    created_user: UserRead = await crud_users.create(db=db, object=user_internal)
+    created_user: UserRead = await users.create_user(db=db, user=user_internal)
+    # the new user's first requests read them back right after logging in
+    await mark_write(user.username)
     return created_user
 
 
 @router.get("/users", response_model=PaginatedListResponse[UserRead])
 async def read_users(
-    request: Request, db: Annotated[AsyncSession, Depends(async_get_db)], page: int = 1, items_per_page: int = 10
+    request: Request,
+    db: Annotated[AsyncSession, Depends(async_get_read_db)],
+    page: int = 1,
+    items_per_page: int = 10,
 ) -> dict:
     users_data = await crud_users.get_multi(
         db=db,
@@ -55,13 +64,66 @@ async def read_users(
     return response
 
 
+@router.post(
+    "/users/import", response_model=UserImportJob, status_code=202, dependencies=[Depends(get_current_superuser)]
+)
+async def import_users(request: Request, file: UploadFile) -> UserImportJob:
+    """
+    Queues the import of the users of an NDJSON or CSV file for the worker and returns a job id; poll
+    `/users/import/jobs/{job_id}` for the result. Hashing the passwords of a large file takes hours.
+    """
+    if queue.pool is None:
+        raise HTTPException(status_code=503, detail="Job queue is not available")
+
+    records, rejections = await user_import.read_import(file)
+    job = await queue.pool.enqueue_job("import_users_job", records, rejections, _job_id=f"user_import:{uuid4().hex}")
+    return UserImportJob(job_id=job.job_id, status=(await job.status()).value)
+
+
+@router.get(
+    "/users/import/jobs/{job_id}",
+    response_model=UserImportJobStatus,
+    dependencies=[Depends(get_current_superuser)],
+)
+async def read_user_import_job(request: Request, job_id: str) -> UserImportJobStatus:
+    """
+    Returns the status of a user import job and its result once it is complete.
+    """
+    if queue.pool is None:
+        raise HTTPException(status_code=503, detail="Job queue is not available")
+
+    job = Job(job_id, redis=queue.pool)
+    info = await job.info()
+    if info is None or info.function != "import_users_job":
+        raise NotFoundException("Import job not found")
+
+    status = await job.status()
+    job_status = UserImportJobStatus(job_id=job_id, status=status.value)
+    if status == JobStatus.complete:
+        result = await job.result_info()
+        if result is not None and result.success:
+            job_status.result = UserImportResult(**result.result)
+        elif result is not None:
+            job_status.error = str(result.result)
+    return job_status
+
+
+@router.patch("/users/tier", response_model=UserTierBulkResult, dependencies=[Depends(get_current_superuser)])
+async def patch_users_tier(
+    request: Request, values: UserTierBulkUpdate, db: Annotated[AsyncSession, Depends(async_get_uow_db)]
+) -> dict[str, Any]:
+    return await users.set_users_tier(db=db, values=values)
+
+
 @router.get("/user/me/", response_model=UserRead)
-async def read_users_me(request: Request, current_user: Annotated[UserRead, Depends(get_current_user)]) -> UserRead:
+async def read_users_me(
+    request: Request, current_user: Annotated[UserRead, Depends(get_current_user_without_db)]
+) -> UserRead:
     return current_user
 
 
 @router.get("/user/{username}", response_model=UserRead)
-async def read_user(request: Request, username: str, db: Annotated[AsyncSession, Depends(async_get_db)]) -> dict:
+async def read_user(request: Request, username: str, db: Annotated[AsyncSession, Depends(async_get_read_db)]) -> dict:
     db_user: UserRead | None = await crud_users.get(
         db=db, schema_to_select=UserRead, username=username, is_deleted=False
     )
@@ -77,26 +139,9 @@ async def patch_user(
     values: UserUpdate,
     username: str,
     current_user: Annotated[UserRead, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)],
 ) -> dict[str, str]:
-    db_user = await crud_users.get(db=db, schema_to_select=UserRead, username=username)
-    if db_user is None:
-        raise NotFoundException("User not found")
-
-    if db_user["username"] != current_user["username"]:
-        raise ForbiddenException()
-
-    if values.username != db_user["username"]:
-        existing_username = await crud_users.exists(db=db, username=values.username)
-        if existing_username:
-            raise DuplicateValueException("Username not available")
-
-    if values.email != db_user["email"]:
-        existing_email = await crud_users.exists(db=db, email=values.email)
-        if existing_email:
-            raise DuplicateValueException("Email is already registered")
-
-    await crud_users.update(db=db, object=values, username=username)
+    await users.update_user(db=db, username=username, user_id=current_user["id"], values=values)
     return {"message": "User updated"}
 
 
@@ -105,17 +150,10 @@ async def erase_user(
     request: Request,
     username: str,
     current_user: Annotated[UserRead, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)],
     token: str = Depends(oauth2_scheme),
 ) -> dict[str, str]:
-    db_user = await crud_users.get(db=db, schema_to_select=UserRead, username=username)
-    if not db_user:
-        raise NotFoundException("User not found")
-
-    if username != current_user["username"]:
-        raise ForbiddenException()
-
-    await crud_users.delete(db=db, username=username)
+    await users.soft_delete_user(db=db, username=username, user_id=current_user["id"])
     await blacklist_token(token=token, db=db)
     return {"message": "User deleted"}
 
@@ -124,76 +162,34 @@ async def erase_user(
 async def erase_db_user(
     request: Request,
     username: str,
-    db: Annotated[AsyncSession, Depends(async_get_db)],
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)],
     token: str = Depends(oauth2_scheme),
 ) -> dict[str, str]:
-    db_user = await crud_users.exists(db=db, username=username)
-    if not db_user:
-        raise NotFoundException("User not found")
-
-    await crud_users.db_delete(db=db, username=username)
+    await users.hard_delete_user(db=db, username=username)
     await blacklist_token(token=token, db=db)
     return {"message": "User deleted from the database"}
 
 
 @router.get("/user/{username}/rate_limits", dependencies=[Depends(get_current_superuser)])
 async def read_user_rate_limits(
-    request: Request, username: str, db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request, username: str, db: Annotated[AsyncSession, Depends(async_get_read_db)]
 ) -> dict[str, Any]:
-    db_user: dict | None = await crud_users.get(db=db, username=username, schema_to_select=UserRead)
-    if db_user is None:
-        raise NotFoundException("User not found")
-
-    if db_user["tier_id"] is None:
-        db_user["tier_rate_limits"] = []
-        return db_user
-
-    db_tier = await crud_tiers.get(db=db, id=db_user["tier_id"])
-    if db_tier is None:
-        raise NotFoundException("Tier not found")
-
-    db_rate_limits = await crud_rate_limits.get_multi(db=db, tier_id=db_tier["id"])
-
-    db_user["tier_rate_limits"] = db_rate_limits["data"]
-
-    return db_user
+    return await users.get_user_with_rate_limits(db=db, username=username)
 
 
 @router.get("/user/{username}/tier")
 async def read_user_tier(
-    request: Request, username: str, db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request, username: str, db: Annotated[AsyncSession, Depends(async_get_read_db)]
 ) -> dict | None:
-    db_user = await crud_users.get(db=db, username=username, schema_to_select=UserRead)
-    if db_user is None:
-        raise NotFoundException("User not found")
-
-    db_tier = await crud_tiers.exists(db=db, id=db_user["tier_id"])
-    if not db_tier:
-        raise NotFoundException("Tier not found")
-
-    joined: dict = await crud_users.get_joined(
-        db=db,
-        join_model=Tier,
-        join_prefix="tier_",
-        schema_to_select=UserRead,
-        join_schema_to_select=TierRead,
-        username=username,
-    )
-
-    return joined
+    return await users.get_user_with_tier(db=db, username=username)
 
 
 @router.patch("/user/{username}/tier", dependencies=[Depends(get_current_superuser)])
 async def patch_user_tier(
-    request: Request, username: str, values: UserTierUpdate, db: Annotated[AsyncSession, Depends(async_get_db)]
+    request: Request,
+    username: str,
+    values: UserTierUpdate,
+    db: Annotated[AsyncSession, Depends(async_get_uow_db)],
 ) -> dict[str, str]:
-    db_user = await crud_users.get(db=db, username=username, schema_to_select=UserRead)
-    if db_user is None:
-        raise NotFoundException("User not found")
-
-    db_tier = await crud_tiers.get(db=db, id=values.tier_id)
-    if db_tier is None:
-        raise NotFoundException("Tier not found")
-
-    await crud_users.update(db=db, object=values, username=username)
-    return {"message": f"User {db_user['name']} Tier updated"}
+    name = await users.set_user_tier(db=db, username=username, values=values)
+    return {"message": f"User {name} Tier updated"}
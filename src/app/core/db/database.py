@@ -1,21 +1,169 @@
+import time
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import DeclarativeBase, MappedAsDataclass, sessionmaker
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    MappedAsDataclass,
+    ORMExecuteState,
+    Session,
+    SessionTransaction,
+    sessionmaker,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
 from ..config import settings
+from ..logger import logging
+from ..utils import metrics
+from . import request_stats
+
+logger = logging.getLogger(__name__)
+
+
+# The latest migration in src/migrations/versions: `create_tables` stamps the databases it creates with it, so it
+# has to be updated along with every new revision, which `alembic upgrade` checks
+SCHEMA_REVISION = "7c3f5b1e8d90"
 
 
 class Base(DeclarativeBase, MappedAsDataclass):
     pass
 
 
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """A queue pool that records how long checkouts wait for a connection and how many are waiting.
+
+    Metrics are labelled with the pool's `label`, which survives the pool being recreated by `engine.dispose()`.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.label = "primary"
+        self.waiting = 0
+
+    def recreate(self) -> "InstrumentedPool":
+        pool = super().recreate()
+        pool.label = self.label
+        return pool
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.increment("db_pool_timeouts_total", pool=self.label)
+            raise
+        finally:
+            self.waiting -= 1
+            wait = time.perf_counter() - start
+            metrics.observe("db_pool_wait_seconds", wait, pool=self.label)
+            if wait > settings.DATABASE_POOL_WAIT_WARNING:
+                logger.warning(
+                    f"Waited {wait:.3f}s for a {self.label} database connection ({self.checkedout()} checked out, "
+                    f"pool size {self.size()}, overflow {self.overflow()}, {self.waiting} waiting)"
+                )
+
+    def status_gauges(self) -> dict[str, float]:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "waiting": self.waiting,
+        }
+
+
+def engine_options(url: str) -> dict[str, Any]:
+    """Keyword arguments of `create_async_engine` for `url` with the pool configured by `DatabaseSettings`."""
+    options: dict[str, Any] = {
+        "poolclass": InstrumentedPool,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        # statement_cache_size is asyncpg's own cache, prepared_statement_cache_size the one of SQLAlchemy's adapter
+        options["connect_args"] = {
+            "statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DATABASE_PREPARED_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
 DATABASE_URI = settings.POSTGRES_URI
 DATABASE_PREFIX = settings.POSTGRES_ASYNC_PREFIX
 DATABASE_URL = f"{DATABASE_PREFIX}{DATABASE_URI}"
 
-async_engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+async_engine = create_async_engine(DATABASE_URL, echo=False, future=True, **engine_options(DATABASE_URL))
+
+UNIT_OF_WORK_KEY = "unit_of_work"
+
+
+class DeferrableSession(AsyncSession):
+    """An `AsyncSession` whose commits can be deferred to the end of a unit of work.
+
+    While `info[UNIT_OF_WORK_KEY]` is set, as `unit_of_work.async_get_uow_db` does for a request, committing a
+    transaction that wrote only flushes it, so generated keys and constraint violations still show up where the
+    code commits, and the unit of work commits once at its end. Read-only transactions still commit, which lets
+    `release_connection` hand their connection back.
+    """
+
+    async def commit(self) -> None:
+        if self.info.get(UNIT_OF_WORK_KEY) and _has_writes(self):
+            await self.flush()
+            return
+        await super().commit()
+
+
+local_session = sessionmaker(bind=async_engine, class_=DeferrableSession, expire_on_commit=False)
+
+# looked up on every snapshot as engine.dispose() replaces the pool
+metrics.register_gauge("db_pool", lambda: async_engine.pool.status_gauges())
+request_stats.track(async_engine)
+
+WROTE_KEY = "wrote"
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_write(orm_execute_state: ORMExecuteState) -> None:
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush(session: Session, flush_context: Any) -> None:
+    session.info[WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _clear_write(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(WROTE_KEY, None)
+
+
+def _has_writes(db: AsyncSession) -> bool:
+    return bool(db.info.get(WROTE_KEY) or db.new or db.dirty or db.deleted)
+
+
+async def release_connection(db: AsyncSession) -> None:
+    """Return the connection of `db` to the pool when its transaction has only read so far.
+
+    Sessions check out a connection on their first query and keep it until the transaction ends, which for a
+    request that only reads is when the session is closed after the response. Call this once the database work
+    is done and before waiting on something else, such as a model, so the connection serves other requests in
+    the meantime. The session stays usable and checks out a connection again on its next query. Transactions
+    that wrote or have pending changes are left alone.
+    """
+    if not db.in_transaction() or _has_writes(db):
+        return
 
-local_session = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+    # with expire_on_commit off, committing a read-only transaction keeps the loaded objects usable
+    await db.commit()
 
 
 async def async_get_db() -> AsyncSession:
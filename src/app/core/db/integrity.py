@@ -0,0 +1,27 @@
+import re
+from typing import NoReturn
+
+from sqlalchemy.exc import IntegrityError
+
+# the detail of unique and foreign key violations names the columns of the constraint, e.g.
+# "Key (tier_id, path)=(1, api_v1_chat) already exists."
+_KEY_DETAIL = re.compile(r"Key \((?P<columns>[^)]*)\)")
+
+
+def violated_columns(error: IntegrityError) -> str | None:
+    """The columns of the constraint `error` violated as Postgres reports them, e.g. `"tier_id, path"`."""
+    detail = getattr(error.orig, "detail", None) or str(error.orig)
+    match = _KEY_DETAIL.search(detail)
+    return match["columns"] if match else None
+
+
+def raise_violation(error: IntegrityError, violations: dict[str, Exception]) -> NoReturn:
+    """Raise the exception `violations` maps the violated columns to, or `error` itself for other constraints.
+
+    Lets writes rely on unique and foreign key constraints instead of probing for conflicts first. The session
+    has to be rolled back before it is used again.
+    """
+    mapped = violations.get(violated_columns(error) or "")
+    if mapped is None:
+        raise error
+    raise mapped from error
@@ -0,0 +1,125 @@
+import itertools
+import time
+from collections.abc import AsyncGenerator
+from typing import Annotated
+
+from fastapi import Depends, Request
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from ..config import ReplicaBalancing, settings
+from ..logger import logging
+from ..utils import cache, metrics
+from . import request_stats
+from .database import async_get_db, engine_options
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+RECENT_WRITE_KEY_PREFIX = "db:recent_write:"
+LOCAL_RECENT_WRITES_LIMIT = 10_000
+
+
+def _create_replica_engine(url: str, label: str) -> AsyncEngine:
+    engine = create_async_engine(url, echo=False, future=True, **engine_options(url))
+    engine.pool.label = label
+    metrics.register_gauge(f"db_replica_pool_{label}", lambda: engine.pool.status_gauges())
+    request_stats.track(engine)
+    return engine
+
+
+replica_engines: list[AsyncEngine] = [
+    _create_replica_engine(url.strip(), f"replica{i}")
+    for i, url in enumerate(url for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip())
+]
+replica_sessions = [
+    sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False) for engine in replica_engines
+]
+
+_round_robin = itertools.count()
+# deadlines of read-your-writes windows when there is no Redis to share them between workers
+_local_recent_writes: dict[str, float] = {}
+
+
+def choose_replica() -> int:
+    """Index of the replica the next read goes to, by `DATABASE_REPLICA_BALANCING`."""
+    if settings.DATABASE_REPLICA_BALANCING == ReplicaBalancing.LEAST_CONNECTIONS:
+        return min(
+            range(len(replica_engines)),
+            key=lambda i: replica_engines[i].pool.checkedout() + replica_engines[i].pool.waiting,
+        )
+    return next(_round_robin) % len(replica_engines)
+
+
+def token_subject(request: Request) -> str | None:
+    """The subject of the request's bearer token, read without verifying it as it only picks a database."""
+    token_type, _, token = request.headers.get("Authorization", "").partition(" ")
+    if token_type.lower() != "bearer" or not token:
+        return None
+
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+
+async def mark_write(subject: str) -> None:
+    """Send the reads of `subject` to the primary for the next `DATABASE_READ_YOUR_WRITES_SECONDS`."""
+    window = settings.DATABASE_READ_YOUR_WRITES_SECONDS
+    if not replica_engines or window <= 0:
+        return
+
+    if cache.client is not None:
+        try:
+            await cache.client.set(f"{RECENT_WRITE_KEY_PREFIX}{subject}", 1, px=int(window * 1000))
+            return
+        except Exception as e:
+            logger.warning(f"Could not record a write of {subject} in Redis: {e}")
+
+    now = time.monotonic()
+    if len(_local_recent_writes) >= LOCAL_RECENT_WRITES_LIMIT:
+        for expired in [key for key, deadline in _local_recent_writes.items() if deadline <= now]:
+            del _local_recent_writes[expired]
+    _local_recent_writes[subject] = now + window
+
+
+async def wrote_recently(subject: str) -> bool:
+    if _local_recent_writes.get(subject, 0) > time.monotonic():
+        return True
+
+    if cache.client is not None:
+        try:
+            return bool(await cache.client.exists(f"{RECENT_WRITE_KEY_PREFIX}{subject}"))
+        except Exception as e:
+            # a stale read is worse than a read from the primary
+            logger.warning(f"Could not look up recent writes of {subject} in Redis: {e}")
+            return True
+
+    return False
+
+
+async def async_get_read_db(
+    request: Request, db: Annotated[AsyncSession, Depends(async_get_db)]
+) -> AsyncGenerator[AsyncSession, None]:
+    """A session for read-only work, on a replica when one is configured.
+
+    Requests that may write, and requests of users who wrote within the read-your-writes window, get the
+    primary session of `async_get_db`, so a request never holds connections to two databases just to read what
+    it may write. That session only checks out a connection once it is used.
+    """
+    if not replica_sessions or request.method not in SAFE_METHODS:
+        yield db
+        return
+
+    subject = token_subject(request)
+    if subject is not None and await wrote_recently(subject):
+        metrics.increment("db_read_your_writes_total")
+        yield db
+        return
+
+    index = choose_replica()
+    metrics.increment("db_replica_reads_total", pool=replica_engines[index].pool.label)
+    async with replica_sessions[index]() as replica_db:
+        yield replica_db
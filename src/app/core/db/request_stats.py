@@ -0,0 +1,104 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..config import settings
+from ..logger import logging
+
+logger = logging.getLogger(__name__)
+
+RECORD_KEY = "request_stats"
+QUERY_START_KEY = "query_start"
+
+
+@dataclass
+class RequestStats:
+    """Database work of one request, collected while `current` is set."""
+
+    checkouts: int = 0
+    # total time connections were checked out, from checkout to return to the pool
+    held: float = 0.0
+    queries: int = 0
+    # total time spent waiting for statements, including the round trips
+    time: float = 0.0
+    # executions per statement text, the same text with different parameters is counted together
+    statements: Counter[str] = field(default_factory=Counter)
+
+    def repeated_statements(self) -> list[tuple[str, int]]:
+        """Statements executed at least `DATABASE_N_PLUS_ONE_THRESHOLD` times, most frequent first."""
+        threshold = settings.DATABASE_N_PLUS_ONE_THRESHOLD
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+current: ContextVar[RequestStats | None] = ContextVar("db_request_stats", default=None)
+
+
+def redact(parameters: Any, executemany: bool = False) -> Any:
+    """`parameters` with every value replaced by its type, so they can be logged without the data."""
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {key: redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, list | tuple):
+        return [redact(value) for value in parameters]
+    return None if parameters is None else f"<{type(parameters).__name__}>"
+
+
+def _on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+    stats = current.get()
+    if stats is not None:
+        stats.checkouts += 1
+        connection_record.info[RECORD_KEY] = (stats, time.perf_counter())
+
+
+def _on_checkin(dbapi_connection: Any, connection_record: Any) -> None:
+    # checkins can happen outside of the request, so the stats travel with the connection
+    checked_out = connection_record.info.pop(RECORD_KEY, None)
+    if checked_out is not None:
+        stats, start = checked_out
+        stats.held += time.perf_counter() - start
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    conn.info.setdefault(QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    elapsed = time.perf_counter() - conn.info[QUERY_START_KEY].pop()
+    stats = current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.time += elapsed
+        stats.statements[statement] += 1
+
+    if elapsed >= settings.DATABASE_SLOW_QUERY_SECONDS:
+        flat = " ".join(statement.split())
+        logger.warning(f"Slow query ({elapsed:.3f}s): {flat} parameters: {redact(parameters, executemany)}")
+
+
+def _on_error(exception_context: Any) -> None:
+    starts = exception_context.connection.info.get(QUERY_START_KEY) if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def track(engine: AsyncEngine) -> None:
+    """Attribute the connection checkouts and statements of `engine` to the request that made them.
+
+    Statements slower than `DATABASE_SLOW_QUERY_SECONDS` are logged with redacted parameters, whether or not
+    they belong to a request.
+    """
+    event.listen(engine.sync_engine, "checkout", _on_checkout)
+    event.listen(engine.sync_engine, "checkin", _on_checkin)
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _on_error)
@@ -0,0 +1,36 @@
+from collections.abc import AsyncGenerator
+from typing import Annotated
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from ..config import settings
+from .database import UNIT_OF_WORK_KEY, async_get_db
+
+
+async def async_get_uow_db(db: Annotated[AsyncSession, Depends(async_get_db)]) -> AsyncGenerator[AsyncSession, None]:
+    """The request's primary session as one unit of work, committed once after the endpoint returns.
+
+    Commits made while the endpoint runs, by fastcrud or by services, only flush, and the transaction is
+    committed after the endpoint returns and before the response is sent, or rolled back if it raises. Partial
+    failures therefore leave nothing behind. The dependencies of a request share its session, so their writes
+    join the unit of work. Code that has to recover from a failing statement and carry on wraps it in
+    `db.begin_nested()`, whose savepoint rolls back only that statement.
+
+    Endpoints opt in by depending on this instead of `async_get_db`. Leave out endpoints that wait on something
+    slow, such as a model, after writing, since the transaction and its connection stay open until the end of the
+    request. With `DATABASE_UNIT_OF_WORK` off every commit goes through as before.
+    """
+    if not settings.DATABASE_UNIT_OF_WORK:
+        yield db
+        return
+
+    db.info[UNIT_OF_WORK_KEY] = True
+    try:
+        yield db
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        db.info.pop(UNIT_OF_WORK_KEY, None)
+    await db.commit()
@@ -1,4 +1,5 @@
 from collections.abc import AsyncGenerator, Callable
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import _AsyncGeneratorContextManager, asynccontextmanager
 from typing import Any
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,29 +12,68 @@ from arq.connections import RedisSettings
 from fastapi import APIRouter, Depends, FastAPI
 from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
+from sqlalchemy import Column, MetaData, PrimaryKeyConstraint, String, Table, inspect
+from sqlalchemy.engine import Connection
 
 from ..api.dependencies import get_current_superuser
 from ..middleware.client_cache_middleware import ClientCacheMiddleware
+from ..middleware.database_stats_middleware import DatabaseStatsMiddleware
+from ..middleware.read_your_writes_middleware import ReadYourWritesMiddleware
+from ..middleware.request_size_limit_middleware import RequestSizeLimitMiddleware
 from .config import (
     AppSettings,
     ClientSideCacheSettings,
     DatabaseSettings,
     EnvironmentOption,
     EnvironmentSettings,
+    ProcessPoolSettings,
     RedisCacheSettings,
     RedisQueueSettings,
     RedisRateLimiterSettings,
+    UploadSpoolSettings,
     settings,
 )
-from .db.database import Base, async_engine as engine
-from .utils import cache, queue, rate_limit
+from .db.database import SCHEMA_REVISION, Base, async_engine as engine
+from .logger import logging
+from .utils import cache, process_pool, queue, rate_limit
 from ..models import *
 from .cors import setup_cors
 
+logger = logging.getLogger(__name__)
+
+
 # -------------- database --------------
+alembic_version = Table(
+    "alembic_version",
+    MetaData(),
+    Column("version_num", String(32), nullable=False),
+    PrimaryKeyConstraint("version_num", name="alembic_version_pkc"),
+)
+
+
+def _create_tables(conn: Connection) -> None:
+    tables = inspect(conn).get_table_names()
+    if tables:
+        if alembic_version.name not in tables:
+            logger.warning(
+                "The database was not created by the application or migrations, bring it under Alembic with "
+                "`alembic stamp 1b7e0c5a9d44` followed by `alembic upgrade head`"
+            )
+        return
+
+    Base.metadata.create_all(conn)
+    alembic_version.create(conn)
+    conn.execute(alembic_version.insert().values(version_num=SCHEMA_REVISION))
+
+
 async def create_tables() -> None:
+    """Create the tables of an empty database and stamp it with the latest migration, `SCHEMA_REVISION`.
+
+    A database with tables is left to the migrations, `alembic upgrade head`: creating the tables missing from it
+    would make the migrations that add them fail, and columns added to existing tables would be missing anyway.
+    """
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_tables)
 
 
 # -------------- cache --------------
@@ -65,6 +105,15 @@ async def close_redis_rate_limit_pool() -> None:
     await rate_limit.client.aclose()  # type: ignore
 
 
+# -------------- process pool --------------
+async def create_process_pool() -> None:
+    process_pool.pool = ProcessPoolExecutor(max_workers=settings.PROCESS_POOL_WORKERS)
+
+
+async def close_process_pool() -> None:
+    process_pool.pool.shutdown(wait=False, cancel_futures=True)  # type: ignore
+
+
 # -------------- application --------------
 async def set_threadpool_tokens(number_of_tokens: int = 100) -> None:
     limiter = anyio.to_thread.current_default_thread_limiter()
@@ -79,6 +128,7 @@ def lifespan_factory(
         | ClientSideCacheSettings
         | RedisQueueSettings
         | RedisRateLimiterSettings
+        | ProcessPoolSettings
         | EnvironmentSettings
     ),
     create_tables_on_start: bool = True,
@@ -101,6 +151,9 @@ def lifespan_factory(
         if isinstance(settings, RedisRateLimiterSettings):
             await create_redis_rate_limit_pool()
 
+        if isinstance(settings, ProcessPoolSettings):
+            await create_process_pool()
+
         yield
 
         if isinstance(settings, RedisCacheSettings):
@@ -112,6 +165,9 @@ def lifespan_factory(
         if isinstance(settings, RedisRateLimiterSettings):
             await close_redis_rate_limit_pool()
 
+        if isinstance(settings, ProcessPoolSettings):
+            await close_process_pool()
+
     return lifespan
 
 
@@ -125,6 +181,7 @@ def create_application(
         | ClientSideCacheSettings
         | RedisQueueSettings
         | RedisRateLimiterSettings
+        | ProcessPoolSettings
         | EnvironmentSettings
     ),
     create_tables_on_start: bool = True,
@@ -145,17 +202,21 @@ def create_application(
         It determines the configuration applied:
 
         - AppSettings: Configures basic app metadata like name, description, contact, and license info.
-        - DatabaseSettings: Adds event handlers for initializing database tables during startup.
+        - DatabaseSettings: Adds event handlers for initializing database tables during startup, and integrates
+          middleware recording the queries and connection checkouts of every request and keeping the reads of
+          users who just wrote on the primary when read replicas are configured.
         - RedisCacheSettings: Sets up event handlers for creating and closing a Redis cache pool.
         - ClientSideCacheSettings: Integrates middleware for client-side caching.
+        - UploadSpoolSettings: Integrates middleware rejecting request bodies above the configured size.
         - RedisQueueSettings: Sets up event handlers for creating and closing a Redis queue pool.
         - RedisRateLimiterSettings: Sets up event handlers for creating and closing a Redis rate limiter pool.
+        - ProcessPoolSettings: Sets up event handlers for creating and closing a process pool for CPU-bound work.
         - EnvironmentSettings: Conditionally sets documentation URLs and integrates custom routes for API documentation
           based on the environment type.
 
     create_tables_on_start : bool
-        A flag to indicate whether to create database tables on application startup.
-        Defaults to True.
+        A flag to indicate whether to create database tables on application startup, which only happens
+        for an empty database. Defaults to True.
 
     **kwargs
         Additional keyword arguments passed directly to the FastAPI constructor.
@@ -200,6 +261,15 @@ def create_application(
     if isinstance(settings, ClientSideCacheSettings):
         application.add_middleware(ClientCacheMiddleware, max_age=settings.CLIENT_CACHE_MAX_AGE)
 
+    if isinstance(settings, DatabaseSettings):
+        application.add_middleware(DatabaseStatsMiddleware, server_timing=settings.DATABASE_SERVER_TIMING)
+
+    if isinstance(settings, DatabaseSettings) and settings.DATABASE_REPLICA_URLS:
+        application.add_middleware(ReadYourWritesMiddleware)
+
+    if isinstance(settings, UploadSpoolSettings):
+        application.add_middleware(RequestSizeLimitMiddleware, max_body_size=settings.REQUEST_MAX_BODY_SIZE)
+
     if isinstance(settings, EnvironmentSettings):
         if settings.ENVIRONMENT != EnvironmentOption.PRODUCTION:
             docs_router = APIRouter()
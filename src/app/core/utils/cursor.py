@@ -0,0 +1,22 @@
+import base64
+import json
+from typing import Any
+
+from ..exceptions.http_exceptions import BadRequestException
+
+
+def encode(*values: Any) -> str:
+    """An opaque pagination cursor holding the sort key of the last item of a page."""
+    payload = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode(cursor: str, length: int) -> list[Any]:
+    """The values of a cursor made by `encode`; a malformed cursor is a 400."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise BadRequestException("Invalid cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise BadRequestException("Invalid cursor")
+    return values
@@ -0,0 +1,42 @@
+import asyncio
+from collections.abc import Awaitable
+from typing import TypeVar
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """Await `awaitable`, cancelling it as soon as the client of `request` disconnects.
+
+    The request body must have been read already, so that the next ASGI message is `http.disconnect`. Raises
+    `ClientDisconnected` once the cancelled work has finished unwinding.
+    """
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if work.done():
+            return work.result()
+
+        work.cancel()
+        try:
+            await work
+        except asyncio.CancelledError:
+            pass
+        raise ClientDisconnected
+    finally:
+        watcher.cancel()
+        work.cancel()
@@ -0,0 +1,108 @@
+import threading
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+SAMPLE_WINDOW = 1024
+
+_lock = threading.Lock()
+_counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+_gauges: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+_samples: dict[tuple[str, tuple[tuple[str, str], ...]], deque[float]] = {}
+_observation_totals: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}
+_gauge_callbacks: dict[str, Callable[[], float | dict[str, float]]] = {}
+
+
+def _key(name: str, labels: dict[str, Any]) -> tuple[str, tuple[tuple[str, str], ...]]:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _format_key(key: tuple[str, tuple[tuple[str, str], ...]]) -> str:
+    name, labels = key
+    if not labels:
+        return name
+
+    rendered = ",".join(f'{label}="{value}"' for label, value in labels)
+    return f"{name}{{{rendered}}}"
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def increment(name: str, value: float = 1, **labels: Any) -> None:
+    """Add `value` to the counter `name` for the given label set."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    """Set the gauge `name` for the given label set to `value`."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def register_gauge(name: str, callback: Callable[[], float | dict[str, float]]) -> None:
+    """Register a gauge whose value is computed by `callback` every time a snapshot is taken.
+
+    The callback may return a single value or a mapping of sub-names to values, which are reported as
+    `name_<sub-name>`.
+    """
+    with _lock:
+        _gauge_callbacks[name] = callback
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """Record one observation of `name`, such as a latency, for the given label set.
+
+    Count, sum and max are kept for the lifetime of the process while percentiles are computed over the last
+    `SAMPLE_WINDOW` observations.
+    """
+    key = _key(name, labels)
+    with _lock:
+        samples = _samples.setdefault(key, deque(maxlen=SAMPLE_WINDOW))
+        samples.append(value)
+        totals = _observation_totals.setdefault(key, [0, 0.0, value])
+        totals[0] += 1
+        totals[1] += value
+        totals[2] = max(totals[2], value)
+
+
+def get_counter(name: str, **labels: Any) -> float:
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def snapshot() -> dict[str, Any]:
+    """Return the current value of every metric recorded by this process.
+
+    Metrics are kept in process memory, so with several workers each one reports only its own share.
+    """
+    with _lock:
+        counters = {_format_key(key): value for key, value in _counters.items()}
+        gauges = {_format_key(key): value for key, value in _gauges.items()}
+        callbacks = dict(_gauge_callbacks)
+        summaries: dict[str, dict[str, float]] = {}
+        for key, samples in _samples.items():
+            ordered = sorted(samples)
+            count, total, maximum = _observation_totals[key]
+            summaries[_format_key(key)] = {
+                "count": count,
+                "sum": total,
+                "max": maximum,
+                "p50": _percentile(ordered, 0.50),
+                "p95": _percentile(ordered, 0.95),
+                "p99": _percentile(ordered, 0.99),
+            }
+
+    for name, callback in callbacks.items():
+        value = callback()
+        if isinstance(value, dict):
+            for sub_name, sub_value in value.items():
+                gauges[f"{name}_{sub_name}"] = sub_value
+        else:
+            gauges[name] = value
+
+    return {"counters": counters, "gauges": gauges, "summaries": summaries}
@@ -0,0 +1,3 @@
+from concurrent.futures import ProcessPoolExecutor
+
+pool: ProcessPoolExecutor | None = None
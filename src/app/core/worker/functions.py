@@ -1,9 +1,32 @@
 import asyncio
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
 
+import anyio
+import redis.asyncio as redis
 import uvloop
 from arq.worker import Worker
 
+from ...core.config import settings
+from ...core.db.database import local_session
+from ...core.utils import cache, process_pool, queue
+from ...crud.crud_conversations import crud_conversations
+from ...crud.crud_users import crud_users
+from ...schemas.chat import ChatRequest
+from ...services import (
+    archival,
+    chat_service,
+    conversation_export,
+    conversation_summary,
+    conversation_turns,
+    llm_usage,
+    upload_store,
+    user_import,
+)
+from ...services.openai_service import OpenAIService
+
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -15,10 +38,115 @@ async def sample_background_task(ctx: Worker, name: str) -> str:
     return f"Task {name} is complete!"
 
 
+async def summarize_conversation(ctx: Worker, conversation_id: int) -> int:
+    """Fold the older turns of a conversation into its rolling summary.
+
+    Only `summary` and `summarized_turns` are written, so turns appended while the summary is generated are kept.
+    Returns the number of turns covered by the summary.
+    """
+    async with local_session() as db:
+        conversation = await conversation_turns.get_conversation(
+            db=db, unsummarized=True, id=conversation_id, is_deleted=False
+        )
+        if conversation is None or not conversation_summary.needs_summary(conversation):
+            return 0
+
+    messages, covered_turns = conversation_summary.summary_request(conversation)
+    summary = await OpenAIService().create_completion(
+        messages, temperature=0, max_tokens=settings.CONVERSATION_SUMMARY_MAX_TOKENS, use_cache=False
+    )
+
+    async with local_session() as db:
+        await crud_conversations.update(
+            db=db, object={"summary": summary, "summarized_turns": covered_turns}, id=conversation_id
+        )
+
+    logging.info(f"Conversation {conversation_id} summarized up to turn {covered_turns}")
+    return covered_turns
+
+
+async def generate_chat_job(ctx: Worker, user_id: int, request: dict) -> dict:
+    """Run a chat turn queued by `POST /chat?background=true`, publishing the current stage as job progress."""
+    job_id = ctx["job_id"]
+
+    async def publish_progress(stage: str) -> None:
+        await ctx["redis"].set(
+            f"{chat_service.PROGRESS_KEY_PREFIX}:{job_id}", stage, ex=settings.CHAT_JOB_RESULT_TTL
+        )
+
+    async with local_session() as db:
+        current_user = await crud_users.get(db=db, id=user_id, is_deleted=False)
+        if current_user is None:
+            raise ValueError(f"User {user_id} not found")
+
+        response = await chat_service.run_chat_turn(
+            db=db, current_user=current_user, request=ChatRequest(**request), on_progress=publish_progress
+        )
+
+    await publish_progress("complete")
+    return response.model_dump()
+
+
+async def import_users_job(
+    ctx: Worker, records: list[user_import.Record], rejections: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """Create the users of a file uploaded to `POST /users/import`, hashing their passwords in the process pool."""
+    async with local_session() as db:
+        return await user_import.import_records(db=db, records=records, rejections=rejections)
+
+
+async def cleanup_upload_spool(ctx: Worker) -> dict[str, int]:
+    """Enforce the maximum age and disk quota of the upload spool."""
+    result = await anyio.to_thread.run_sync(upload_store.enforce_spool_limits)
+    logging.info(f"Upload spool cleaned up: {result}")
+    return result
+
+
+async def flush_llm_usage(ctx: Worker) -> int:
+    """Write the LLM usage records buffered in Redis to the database."""
+    async with local_session() as db:
+        flushed = await llm_usage.flush(db, cache.client)
+    if flushed:
+        logging.info(f"Flushed {flushed} LLM usage records")
+    return flushed
+
+
+async def backfill_conversation_turns(ctx: Worker, batch_size: int = 100) -> int:
+    """Move conversation turns still stored in the `queries` JSONB array into the `conversation_turn` table."""
+    async with local_session() as db:
+        moved = await conversation_turns.backfill_legacy_turns(db, batch_size=batch_size)
+    logging.info(f"Moved {moved} conversation turns out of the queries array")
+    return moved
+
+
+async def export_conversations(ctx: Worker, user_id: int, compress: bool = True) -> str:
+    """Write the NDJSON export of a user's conversations to a file in `EXPORT_DIR` and return its path."""
+    extension = "ndjson.gz" if compress else "ndjson"
+    path = os.path.join(settings.EXPORT_DIR, f"conversations-{user_id}-{ctx['job_id']}.{extension}")
+    await anyio.to_thread.run_sync(lambda: os.makedirs(settings.EXPORT_DIR, exist_ok=True))
+    size = await conversation_export.export_to_file(user_id, path, compress=compress)
+    logging.info(f"Exported conversations of user {user_id} to {path} ({size} bytes)")
+    return path
+
+
+async def archive_soft_deleted(ctx: Worker) -> dict[str, int]:
+    """Move rows soft-deleted longer than the retention period to the archive tables and purge old archives."""
+    async with local_session() as db:
+        result = await archival.run(db)
+    logging.info(f"Archived soft-deleted rows: {result}")
+    return result
+
+
 # -------- base functions --------
 async def startup(ctx: Worker) -> None:
+    queue.pool = ctx["redis"]
+    process_pool.pool = ProcessPoolExecutor(max_workers=settings.PROCESS_POOL_WORKERS)
+    cache.pool = redis.ConnectionPool.from_url(settings.REDIS_CACHE_URL)
+    cache.client = redis.Redis.from_pool(cache.pool)  # type: ignore
     logging.info("Worker Started")
 
 
 async def shutdown(ctx: Worker) -> None:
+    await cache.client.aclose()  # type: ignore
+    process_pool.pool.shutdown(wait=False, cancel_futures=True)  # type: ignore
     logging.info("Worker end")
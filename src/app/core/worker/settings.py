@@ -1,15 +1,46 @@
 from arq.connections import RedisSettings
+from arq.cron import cron
+from arq.worker import func
 
 from ...core.config import settings
-from .functions import sample_background_task, shutdown, startup
+from .functions import (
+    archive_soft_deleted,
+    backfill_conversation_turns,
+    cleanup_upload_spool,
+    export_conversations,
+    flush_llm_usage,
+    generate_chat_job,
+    import_users_job,
+    sample_background_task,
+    shutdown,
+    startup,
+    summarize_conversation,
+)
 
 REDIS_QUEUE_HOST = settings.REDIS_QUEUE_HOST
 REDIS_QUEUE_PORT = settings.REDIS_QUEUE_PORT
 
 
 class WorkerSettings:
-    functions = [sample_background_task]
+    functions = [
+        sample_background_task,
+        summarize_conversation,
+        func(backfill_conversation_turns, timeout=None),
+        func(export_conversations, timeout=settings.EXPORT_JOB_TIMEOUT),
+        func(generate_chat_job, keep_result=settings.CHAT_JOB_RESULT_TTL, timeout=settings.CHAT_JOB_TIMEOUT),
+        func(import_users_job, keep_result=settings.USER_IMPORT_RESULT_TTL, timeout=settings.USER_IMPORT_JOB_TIMEOUT),
+    ]
+    cron_jobs = [
+        cron(
+            cleanup_upload_spool,
+            minute=set(range(0, 60, settings.UPLOAD_JANITOR_INTERVAL_MINUTES)),
+            run_at_startup=True,
+        ),
+        cron(flush_llm_usage, minute=set(range(0, 60, settings.LLM_USAGE_FLUSH_INTERVAL_MINUTES))),
+        cron(archive_soft_deleted, hour=settings.ARCHIVE_HOUR, minute=0, timeout=None),
+    ]
     redis_settings = RedisSettings(host=REDIS_QUEUE_HOST, port=REDIS_QUEUE_PORT)
+    max_jobs = settings.WORKER_MAX_JOBS
     on_startup = startup
     on_shutdown = shutdown
     handle_signals = False
@@ -0,0 +1,63 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.db import request_stats
+from ..core.logger import logging
+from ..core.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseStatsMiddleware:
+    """ASGI middleware recording the database work of every request, per route.
+
+    Parameters
+    ----------
+    app: ASGIApp
+        The ASGI application to wrap.
+    server_timing: bool, optional
+        Whether to report the queries made until the response started in a `Server-Timing` header.
+        Defaults to False.
+
+    Note
+    ----
+        - `db_queries_per_request` and `db_time_seconds` are the statements a request executed and the time it
+          waited for them, `db_checkouts_per_request` how often it took a connection from one of the pools and
+          `db_connection_held_seconds` for how long it kept them in total.
+        - Statements executed `DATABASE_N_PLUS_ONE_THRESHOLD` times or more by one request, with whatever
+          parameters, are logged as likely N+1 queries and counted in `db_n_plus_one_total`.
+        - Routes are reported by their path template, so path parameters do not create new label sets.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False) -> None:
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = request_stats.RequestStats()
+
+        async def timing_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f'db;dur={stats.time * 1000:.1f};desc="{stats.queries} queries"')
+            await send(message)
+
+        token = request_stats.current.set(stats)
+        try:
+            await self.app(scope, receive, timing_send if self.server_timing else send)
+        finally:
+            request_stats.current.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            metrics.observe("db_queries_per_request", stats.queries, route=path)
+            metrics.observe("db_time_seconds", stats.time, route=path)
+            metrics.observe("db_checkouts_per_request", stats.checkouts, route=path)
+            metrics.observe("db_connection_held_seconds", stats.held, route=path)
+            for statement, count in stats.repeated_statements():
+                metrics.increment("db_n_plus_one_total", route=path)
+                flat = " ".join(statement.split())
+                logger.warning(f"Possible N+1 query in {scope['method']} {path}, executed {count} times: {flat}")
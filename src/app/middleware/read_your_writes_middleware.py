@@ -0,0 +1,41 @@
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.db.replicas import SAFE_METHODS, mark_write, token_subject
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware sending the reads of a user to the primary for a while after they changed something.
+
+    Parameters
+    ----------
+    app: ASGIApp
+        The ASGI application to wrap.
+
+    Note
+    ----
+        - Every successful request with a method other than GET, HEAD or OPTIONS and a bearer token marks the
+          token's subject as having written, for `DATABASE_READ_YOUR_WRITES_SECONDS`.
+        - The mark is made before the response starts, so a read the client sends after receiving it cannot
+          reach a replica that has not replayed the write yet.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        subject = token_subject(Request(scope))
+        if subject is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def marking_send(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                await mark_write(subject)
+            await send(message)
+
+        await self.app(scope, receive, marking_send)
@@ -0,0 +1,72 @@
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware rejecting request bodies larger than `max_body_size` bytes with `413`.
+
+    Parameters
+    ----------
+    app: ASGIApp
+        The ASGI application to wrap.
+    max_body_size: int
+        Largest accepted request body, in bytes.
+
+    Note
+    ----
+        - A declared `Content-Length` above the limit is rejected before any of the body is read.
+        - Bodies without one, such as chunked uploads, are counted as they are received. As soon as the limit is
+          crossed the `413` is sent from here and the application is told the client disconnected, so the body is
+          never buffered or spooled in full and nothing the application sends afterwards reaches the client.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int) -> None:
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        too_large = PlainTextResponse("Request body too large", status_code=413)
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await too_large(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    rejected = True
+                    # raising here would reach the app, which reports errors while reading the body as 400
+                    if not response_started:
+                        await too_large(scope, receive, send)
+                    return {"type": "http.disconnect"}
+
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except Exception:
+            # the app failing on the disconnect it was handed after the 413 was sent
+            if not rejected:
+                raise
@@ -1,3 +1,6 @@
+from .archive import conversation_archive, conversation_turn_archive, user_archive
+from .conversation import Conversation, ConversationTurn
+from .llm_usage import LLMUsage
 from .rate_limit import RateLimit
 from .tier import Tier
 from .user import User
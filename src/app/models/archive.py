@@ -0,0 +1,40 @@
+from sqlalchemy import Column, DateTime, Table, func
+from sqlalchemy.types import NullType, TypeEngine
+
+from ..core.db.database import Base
+from .conversation import Conversation, ConversationTurn
+from .tier import Tier  # noqa: F401, resolves the type of user.tier_id
+from .user import User
+
+
+def _type(column: Column) -> TypeEngine:
+    # a foreign key declared without a type only takes the referenced column's type once that table is known
+    if isinstance(column.type, NullType) and column.foreign_keys:
+        return next(iter(column.foreign_keys)).column.type
+    return column.type
+
+
+def _archive_table(table: Table) -> Table:
+    """A `<name>_archive` table with the columns of `table` and an `archived_at` timestamp.
+
+    Only the primary key is kept: archived rows are not looked up by anything else, and keeping foreign keys would
+    prevent archiving a row before the rows it references.
+    """
+    columns = [
+        Column(
+            column.name, _type(column), primary_key=column.primary_key, nullable=column.nullable, autoincrement=False
+        )
+        for column in table.columns
+        if column.computed is None
+    ]
+    return Table(
+        f"{table.name}_archive",
+        Base.metadata,
+        *columns,
+        Column("archived_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    )
+
+
+conversation_archive = _archive_table(Conversation.__table__)
+conversation_turn_archive = _archive_table(ConversationTurn.__table__)
+user_archive = _archive_table(User.__table__)
@@ -1,21 +1,60 @@
 import uuid as uuid_pkg
 from datetime import UTC, datetime
-from sqlalchemy import DateTime, ForeignKey, String, Boolean, ARRAY, JSON
+from sqlalchemy import Computed, DateTime, ForeignKey, Index, Integer, String, Boolean, Text, ARRAY, JSON, text
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 
 from ..core.db.database import Base
 
 class Conversation(Base):
     __tablename__ = "conversation"
+    __table_args__ = (
+        Index(
+            "ix_conversation_live_user_created_at",
+            "created_by_user_id",
+            "created_at",
+            postgresql_where=text("NOT is_deleted"),
+        ),
+        Index("ix_conversation_deleted_at", "deleted_at", postgresql_where=text("is_deleted")),
+    )
 
     id: Mapped[int] = mapped_column("id", autoincrement=True, nullable=False, unique=True, primary_key=True, init=False)
     created_by_user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True)
     uuid: Mapped[uuid_pkg.UUID] = mapped_column(default_factory=uuid_pkg.uuid4, unique=True, nullable=False)
     queries: Mapped[list] = mapped_column(JSONB, default=list, nullable=False)
-    
+    summary: Mapped[str | None] = mapped_column(Text, default=None)
+    summarized_turns: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    turn_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    title: Mapped[str | None] = mapped_column(String, default=None)
+    last_message_preview: Mapped[str | None] = mapped_column(String, default=None)
+    last_activity_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
+
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default_factory=lambda: datetime.now(UTC))
     deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
-    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
 
     # Add any additional fields as needed
+
+
+class ConversationTurn(Base):
+    __tablename__ = "conversation_turn"
+    __table_args__ = (Index("ix_conversation_turn_search_vector", "search_vector", postgresql_using="gin"),)
+
+    conversation_id: Mapped[int] = mapped_column(ForeignKey("conversation.id"), primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    query: Mapped[str] = mapped_column(Text, nullable=False)
+    response: Mapped[str | None] = mapped_column(Text, default=None)
+    uuid: Mapped[uuid_pkg.UUID] = mapped_column(default_factory=uuid_pkg.uuid4, unique=True, nullable=False)
+    is_affected: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false", nullable=False)
+    is_partial: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false", nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default_factory=lambda: datetime.now(UTC))
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
+
+    # maintained by Postgres on every insert and update of the text
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('english', query || ' ' || coalesce(response, ''))", persisted=True),
+        init=False,
+        deferred=True,
+    )
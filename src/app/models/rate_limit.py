@@ -1,6 +1,6 @@
 from datetime import UTC, datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..core.db.database import Base
@@ -8,9 +8,11 @@ from ..core.db.database import Base
 
 class RateLimit(Base):
     __tablename__ = "rate_limit"
+    # the rate limiter looks limits up by tier and path on every request
+    __table_args__ = (Index("uq_rate_limit_tier_id_path", "tier_id", "path", unique=True),)
 
     id: Mapped[int] = mapped_column("id", autoincrement=True, nullable=False, unique=True, primary_key=True, init=False)
-    tier_id: Mapped[int] = mapped_column(ForeignKey("tier.id"), index=True)
+    tier_id: Mapped[int] = mapped_column(ForeignKey("tier.id"))
     name: Mapped[str] = mapped_column(String, nullable=False, unique=True)
     path: Mapped[str] = mapped_column(String, nullable=False)
     limit: Mapped[int] = mapped_column(Integer, nullable=False)
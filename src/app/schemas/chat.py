@@ -12,4 +12,17 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str = Field(..., description="The response from the chat API")
     conversation_id: int = Field(..., description="ID of the conversation this chat belongs to") 
-    query_id: int = Field(..., description="ID of the query this chat belongs to")
\ No newline at end of file
+    query_id: int = Field(..., description="ID of the query this chat belongs to")
+
+
+class ChatJobResponse(BaseModel):
+    job_id: str = Field(..., description="ID of the queued chat job")
+    status: str = Field(..., description="Status of the job when it was queued")
+
+
+class ChatJobStatus(BaseModel):
+    job_id: str = Field(..., description="ID of the chat job")
+    status: str = Field(..., description="deferred, queued, in_progress, complete or not_found")
+    progress: str | None = Field(None, description="Stage the worker is currently running")
+    result: ChatResponse | None = Field(None, description="The chat response, once the job succeeded")
+    error: str | None = Field(None, description="Error message, if the job failed")
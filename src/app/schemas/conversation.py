@@ -41,9 +41,50 @@ class ConversationRead(BaseModel):
     uuid: UUID
     created_by_user_id: int
     queries: List[dict]
+    summary: str | None = None
+    summarized_turns: int = 0
+    turn_count: int = 0
+    title: str | None = None
+    last_message_preview: str | None = None
+    last_activity_at: datetime | None = None
     created_at: datetime
     deleted_at: datetime | None
     is_deleted: bool
+    previous_cursor: int | None = None
+    next_cursor: int | None = None
+
+
+class ConversationListItem(BaseModel):
+    """Schema for a conversation in the conversation list, without its turns."""
+    id: int
+    uuid: UUID
+    title: str | None
+    turn_count: int
+    last_message_preview: str | None
+    last_activity_at: datetime | None
+    created_at: datetime
+
+
+class ConversationPage(BaseModel):
+    """A page of the conversation list; pass `next_cursor` as `cursor` to get the next one."""
+    data: List[ConversationListItem]
+    next_cursor: str | None = None
+
+
+class ConversationSearchHit(BaseModel):
+    """Schema for a turn matching a conversation search."""
+    conversation_id: int
+    turn_id: int
+    conversation_title: str | None
+    created_at: datetime
+    rank: float
+    snippet: str
+
+
+class ConversationSearchPage(BaseModel):
+    """A page of conversation search hits; pass `next_cursor` as `cursor` to get the next one."""
+    data: List[ConversationSearchHit]
+    next_cursor: str | None = None
 
 
 class ConversationCreate(BaseModel):
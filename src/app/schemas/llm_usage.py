@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class LLMUsageCreateInternal(BaseModel):
+    user_id: int | None
+    tier: str | None
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    upstream_latency: float
+    queue_time: float
+    cache_hit: bool
+    created_at: datetime
+
+
+class LLMUsageAggregate(BaseModel):
+    key: str | None
+    calls: int
+    cache_hits: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    avg_upstream_latency: float
+    avg_queue_time: float
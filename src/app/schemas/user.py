@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Annotated
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
 
 from ..core.schemas import PersistentDeletion, TimestampSchema, UUIDSchema
 
@@ -63,6 +63,58 @@ class UserTierUpdate(BaseModel):
     tier_id: int
 
 
+class UserTierBulkUpdate(BaseModel):
+    tier_id: int
+    usernames: Annotated[list[str], Field(min_length=1, examples=[["userson", "userberg"]])]
+
+
+class UserTierBulkResult(BaseModel):
+    updated: int
+    not_found: list[str]
+
+
+class UserImport(UserBase):
+    model_config = ConfigDict(extra="forbid")
+
+    # either a password or, for users moving from another system, its bcrypt hash
+    password: Annotated[
+        str | None, Field(pattern=r"^.{8,}|[0-9]+|[A-Z]+|[a-z]+|[^a-zA-Z0-9]+$", examples=["Str1ngst!"], default=None)
+    ]
+    hashed_password: Annotated[str | None, Field(pattern=r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$", default=None)]
+    tier: Annotated[str | None, Field(examples=["free"], default=None)]
+
+    @model_validator(mode="after")
+    def check_password(self) -> "UserImport":
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("Exactly one of password and hashed_password is required")
+        return self
+
+
+class UserImportRejection(BaseModel):
+    line: int
+    username: str | None
+    error: str
+
+
+class UserImportResult(BaseModel):
+    received: int
+    imported: int
+    rejected: int
+    errors: list[UserImportRejection]
+
+
+class UserImportJob(BaseModel):
+    job_id: str
+    status: str
+
+
+class UserImportJobStatus(BaseModel):
+    job_id: str
+    status: str
+    result: UserImportResult | None = None
+    error: str | None = None
+
+
 class UserDelete(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
@@ -0,0 +1,117 @@
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import Insert, Table, delete, exists, insert, select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..models.archive import conversation_archive, conversation_turn_archive, user_archive
+from ..models.conversation import Conversation, ConversationTurn
+from ..models.user import User
+
+# Rows soft-deleted for longer than `ARCHIVE_RETENTION_DAYS` are moved to the `*_archive` tables in batches of
+# `ARCHIVE_BATCH_SIZE`, iterating by id, one short transaction per batch. The rows of a batch are locked with
+# SKIP LOCKED, so a row that is being written to is left for the next run instead of waiting for it.
+
+
+def _copy(archive: Table, source: Table, *where: Any) -> Insert:
+    columns = [column.name for column in archive.columns if column.name != "archived_at"]
+    return insert(archive).from_select(columns, select(*(source.c[name] for name in columns)).where(*where))
+
+
+async def archive_conversations(db: AsyncSession, cutoff: datetime) -> int:
+    """Move conversations soft-deleted before `cutoff`, and their turns, to the archive. Returns how many."""
+    archived = 0
+    last_id = 0
+    while True:
+        ids = list(
+            (
+                await db.execute(
+                    select(Conversation.id)
+                    .where(
+                        Conversation.is_deleted == true(),
+                        Conversation.deleted_at < cutoff,
+                        Conversation.id > last_id,
+                    )
+                    .order_by(Conversation.id)
+                    .limit(settings.ARCHIVE_BATCH_SIZE)
+                    .with_for_update(skip_locked=True)
+                )
+            ).scalars()
+        )
+        if not ids:
+            return archived
+
+        turns = ConversationTurn.__table__
+        await db.execute(_copy(conversation_archive, Conversation.__table__, Conversation.id.in_(ids)))
+        await db.execute(_copy(conversation_turn_archive, turns, turns.c.conversation_id.in_(ids)))
+        await db.execute(delete(ConversationTurn).where(ConversationTurn.conversation_id.in_(ids)))
+        await db.execute(delete(Conversation).where(Conversation.id.in_(ids)))
+        await db.commit()
+
+        archived += len(ids)
+        last_id = ids[-1]
+
+
+async def archive_users(db: AsyncSession, cutoff: datetime) -> int:
+    """Move users soft-deleted before `cutoff` to the archive. Returns how many.
+
+    Users who still own conversations that are not archived stay until those are.
+    """
+    archived = 0
+    last_id = 0
+    while True:
+        ids = list(
+            (
+                await db.execute(
+                    select(User.id)
+                    .where(
+                        User.is_deleted == true(),
+                        User.deleted_at < cutoff,
+                        User.id > last_id,
+                        ~exists().where(Conversation.created_by_user_id == User.id),
+                    )
+                    .order_by(User.id)
+                    .limit(settings.ARCHIVE_BATCH_SIZE)
+                    .with_for_update(skip_locked=True)
+                )
+            ).scalars()
+        )
+        if not ids:
+            return archived
+
+        await db.execute(_copy(user_archive, User.__table__, User.id.in_(ids)))
+        await db.execute(delete(User).where(User.id.in_(ids)))
+        await db.commit()
+
+        archived += len(ids)
+        last_id = ids[-1]
+
+
+async def purge_archives(db: AsyncSession, cutoff: datetime) -> int:
+    """Delete rows archived before `cutoff`, in batches. Returns how many."""
+    purged = 0
+    for archive in (conversation_turn_archive, conversation_archive, user_archive):
+        key = tuple_(*archive.primary_key.columns)
+        while True:
+            batch = select(*archive.primary_key.columns).where(archive.c.archived_at < cutoff)
+            result = await db.execute(delete(archive).where(key.in_(batch.limit(settings.ARCHIVE_BATCH_SIZE))))
+            await db.commit()
+            purged += result.rowcount
+            if result.rowcount < settings.ARCHIVE_BATCH_SIZE:
+                break
+    return purged
+
+
+async def run(db: AsyncSession) -> dict[str, int]:
+    """Archive what is past retention and purge archives past `ARCHIVE_PURGE_AFTER_DAYS`, if set."""
+    now = datetime.now(UTC)
+    cutoff = now - timedelta(days=settings.ARCHIVE_RETENTION_DAYS)
+    result = {
+        "conversations": await archive_conversations(db, cutoff),
+        "users": await archive_users(db, cutoff),
+        "purged": 0,
+    }
+    if settings.ARCHIVE_PURGE_AFTER_DAYS > 0:
+        result["purged"] = await purge_archives(db, now - timedelta(days=settings.ARCHIVE_PURGE_AFTER_DAYS))
+    return result
@@ -0,0 +1,129 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.db.database import release_connection
+from ..core.utils import queue
+from ..crud.crud_conversations import crud_conversations
+from ..crud.crud_tier import crud_tiers
+from ..schemas.chat import ChatRequest, ChatResponse
+from ..schemas.conversation import ConversationCreateInternal, ConversationRead
+from . import conversation_summary, conversation_turns, llm_cache
+from .openai_service import OpenAIService
+
+openai_service = OpenAIService()
+
+PROGRESS_KEY_PREFIX = "chat_job_progress"
+
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+
+async def _noop_progress(stage: str) -> None:
+    return None
+
+
+async def get_tier_name(db: AsyncSession, current_user: dict[str, Any]) -> str | None:
+    """The name of the user's tier, or None for users without one."""
+    if current_user["tier_id"] is None:
+        return None
+    tier = await crud_tiers.get(db=db, id=current_user["tier_id"])
+    return tier["name"] if tier else None
+
+
+async def run_chat_turn(
+    db: AsyncSession,
+    current_user: dict[str, Any],
+    request: ChatRequest,
+    on_progress: ProgressCallback = _noop_progress,
+) -> ChatResponse:
+    """Generate the assistant's answer to one chat message and append the turn to its conversation.
+
+    Shared by the `/chat` endpoint and the `generate_chat_job` worker function. `on_progress` is awaited with the
+    name of every stage as it starts.
+
+    When the turn is cancelled while the answer is generated nothing is saved, unless `CHAT_PERSIST_PARTIAL_TURNS`
+    is set, in which case the text generated so far is saved as a turn marked `is_partial`.
+    """
+    await on_progress("loading_conversation")
+
+    # The tier decides the user's share of model capacity and whether the response cache is used
+    tier_name = await get_tier_name(db, current_user)
+
+    # Handle conversation creation or update
+    if request.conversation_id:
+        # Get existing conversation, with only the turns the rolling summary does not cover
+        conversation = await conversation_turns.get_conversation(
+            db=db,
+            unsummarized=True,
+            id=request.conversation_id,
+            created_by_user_id=current_user["id"],
+            is_deleted=False,
+        )
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        conversation_id = request.conversation_id
+    else:
+        # Create new conversation
+        conversation_internal = ConversationCreateInternal(created_by_user_id=current_user["id"], queries=[])
+        created_conversation = await crud_conversations.create(db=db, object=conversation_internal)
+        conversation = ConversationRead.model_validate(created_conversation, from_attributes=True).model_dump()
+        conversation_id = conversation["id"]
+
+    # Generate response from OpenAI with the rolling summary and recent turns as context. The connection is not
+    # needed until the turn is saved, so other requests can use it while the model answers.
+    await release_connection(db)
+    await on_progress("generating")
+    partial: list[str] = []
+    try:
+        response = await openai_service.generate_chat_response(
+            message=request.message,
+            follow_up=request.follow_up,
+            image_url=request.image_url,
+            file=request.file,
+            history=conversation_summary.history_messages(conversation),
+            use_cache=llm_cache.is_enabled_for_tier(tier_name),
+            tier=tier_name,
+            user_id=current_user["id"],
+            partial=partial,
+        )
+    except asyncio.CancelledError:
+        if settings.CHAT_PERSIST_PARTIAL_TURNS and partial:
+            # the cancellation was delivered already, shield the write from a second one
+            await asyncio.shield(_append_turn(db, conversation, conversation_id, request, "".join(partial), True))
+        raise
+
+    await on_progress("saving")
+    query = await _append_turn(db, conversation, conversation_id, request, response, False)
+    return ChatResponse(response=response, conversation_id=conversation_id, query_id=query["id"])
+
+
+async def _append_turn(
+    db: AsyncSession,
+    conversation: dict[str, Any],
+    conversation_id: int,
+    request: ChatRequest,
+    response: str,
+    is_partial: bool,
+) -> dict[str, Any]:
+    query = await conversation_turns.append_turn(
+        db=db,
+        conversation_id=conversation_id,
+        query=request.message if not request.follow_up else request.follow_up,
+        response=response,
+        is_partial=is_partial,
+    )
+
+    # Compact older turns in the background once the unsummarized history grows too large
+    conversation["queries"] = conversation["queries"] + [query]
+    if queue.pool is not None and conversation_summary.needs_summary(conversation):
+        await queue.pool.enqueue_job(
+            "summarize_conversation",
+            conversation_id,
+            _job_id=f"summarize_conversation:{conversation_id}:{conversation['summarized_turns']}",
+        )
+
+    return query
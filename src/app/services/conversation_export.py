@@ -0,0 +1,148 @@
+import json
+import os
+import uuid as uuid_pkg
+import zlib
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any
+
+import anyio
+from sqlalchemy import false, func, select
+
+from ..core.config import settings
+from ..core.db.database import local_session
+from ..models.conversation import Conversation, ConversationTurn
+from . import conversation_turns
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid_pkg.UUID):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class _Writer:
+    """Collects NDJSON lines into chunks of about `EXPORT_CHUNK_SIZE` bytes, gzip-compressed if asked to."""
+
+    def __init__(self, compress: bool) -> None:
+        self.compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+        self.pending: list[bytes] = []
+        self.size = 0
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, default=_default, ensure_ascii=False).encode() + b"\n"
+        self.pending.append(line)
+        self.size += len(line)
+
+    @property
+    def full(self) -> bool:
+        return self.size >= settings.EXPORT_CHUNK_SIZE
+
+    def drain(self, final: bool = False) -> bytes:
+        data = b"".join(self.pending)
+        self.pending, self.size = [], 0
+        if self.compressor is not None:
+            data = self.compressor.compress(data) + (self.compressor.flush() if final else b"")
+        return data
+
+
+async def export_chunks(user_id: int, compress: bool = False) -> AsyncIterator[bytes]:
+    """Stream a user's conversations and their turns as NDJSON, optionally gzip-compressed.
+
+    Every conversation is a line with `"type": "conversation"`, followed by one `"type": "turn"` line per turn in
+    order. Rows are read through a server-side cursor `EXPORT_FETCH_SIZE` at a time and written out in chunks of
+    about `EXPORT_CHUNK_SIZE` bytes, so memory use does not depend on the size of the history.
+
+    Opens its own database session, as a streamed response outlives the request's.
+    """
+    writer = _Writer(compress)
+    stmt = (
+        select(
+            Conversation.id,
+            Conversation.uuid,
+            Conversation.title,
+            Conversation.summary,
+            Conversation.turn_count,
+            Conversation.created_at,
+            func.jsonb_array_length(Conversation.queries).label("legacy_turns"),
+            ConversationTurn.seq,
+            ConversationTurn.uuid.label("turn_uuid"),
+            ConversationTurn.query,
+            ConversationTurn.response,
+            ConversationTurn.is_affected,
+            ConversationTurn.is_partial,
+            ConversationTurn.created_at.label("turn_created_at"),
+            ConversationTurn.updated_at,
+        )
+        .outerjoin(ConversationTurn, ConversationTurn.conversation_id == Conversation.id)
+        .where(Conversation.created_by_user_id == user_id, Conversation.is_deleted == false())
+        .order_by(Conversation.id, ConversationTurn.seq)
+        .execution_options(yield_per=settings.EXPORT_FETCH_SIZE)
+    )
+
+    async with local_session() as db:
+        result = await db.stream(stmt)
+        conversation_id = None
+        skip_turns = False
+        last_edit: datetime | None = None
+        async for row in result.mappings():
+            if row["id"] != conversation_id:
+                conversation_id, last_edit = row["id"], None
+                writer.write(
+                    {
+                        "type": "conversation",
+                        "id": row["id"],
+                        "uuid": row["uuid"],
+                        "title": row["title"],
+                        "summary": row["summary"],
+                        "turn_count": row["turn_count"],
+                        "created_at": row["created_at"],
+                    }
+                )
+                # turns not moved out of the JSONB array yet are merged the same way as on every other read
+                skip_turns = bool(row["legacy_turns"])
+                if skip_turns:
+                    async with local_session() as legacy_db:
+                        conversation = await conversation_turns.get_conversation(legacy_db, id=conversation_id)
+                    for turn in conversation["queries"] if conversation else []:
+                        writer.write({"type": "turn", "conversation_id": conversation_id, **turn})
+
+            if not skip_turns and row["seq"] is not None:
+                turn = {
+                    "id": row["seq"],
+                    "uuid": row["turn_uuid"],
+                    "query": row["query"],
+                    "response": row["response"],
+                    "created_at": row["turn_created_at"],
+                    "updated_at": row["updated_at"],
+                    "is_affected": row["is_affected"],
+                    "is_partial": row["is_partial"],
+                }
+                updated_at = turn["updated_at"]
+                conversation_turns.finish_turns([turn], last_edit)
+                if updated_at is not None and (last_edit is None or updated_at > last_edit):
+                    last_edit = updated_at
+                writer.write({"type": "turn", "conversation_id": conversation_id, **turn})
+
+            if writer.full:
+                yield writer.drain()
+
+    yield writer.drain(final=True)
+
+
+async def export_to_file(user_id: int, path: str, compress: bool = False) -> int:
+    """Write the export of `export_chunks` to `path`, replacing it only once complete. Returns its size."""
+    partial_path = f"{path}.partial"
+    size = 0
+    try:
+        async with await anyio.open_file(partial_path, "wb") as file:
+            async for chunk in export_chunks(user_id, compress):
+                await file.write(chunk)
+                size += len(chunk)
+        await anyio.to_thread.run_sync(os.replace, partial_path, path)
+    except BaseException:
+        await anyio.to_thread.run_sync(lambda: os.path.exists(partial_path) and os.remove(partial_path))
+        raise
+    return size
@@ -0,0 +1,76 @@
+from typing import Any
+
+from sqlalchemy import false, func, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.exceptions.http_exceptions import BadRequestException
+from ..core.utils import cursor as cursors
+from ..models.conversation import Conversation, ConversationTurn
+
+# must match the configuration of the `conversation_turn.search_vector` expression for the index to be used
+TEXT_SEARCH_CONFIG = literal_column("'english'")
+HEADLINE_OPTIONS = "MaxFragments=2, MinWords=8, MaxWords=24, FragmentDelimiter=' … ', StartSel=**, StopSel=**"
+
+
+async def search_turns(
+    db: AsyncSession, user_id: int, q: str, limit: int, cursor: str | None = None
+) -> dict[str, Any]:
+    """Turns of a user's conversations matching the web search style query `q`, best matches first.
+
+    Matching turns are found through the GIN index on `conversation_turn.search_vector` and ranked with
+    `ts_rank_cd`. Pages are delimited by the (rank, conversation_id, seq) of their last hit, and snippets are
+    only generated for the hits of the page. Turns still stored in the `queries` JSONB array of a conversation are
+    not searched until they are backfilled.
+    """
+    tsquery = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(ConversationTurn.search_vector, tsquery)
+    hits = (
+        select(
+            ConversationTurn.conversation_id,
+            ConversationTurn.seq,
+            ConversationTurn.created_at,
+            rank.label("rank"),
+        )
+        .join(Conversation, Conversation.id == ConversationTurn.conversation_id)
+        .where(
+            ConversationTurn.search_vector.op("@@")(tsquery),
+            Conversation.created_by_user_id == user_id,
+            Conversation.is_deleted == false(),
+        )
+        .order_by(rank.desc(), ConversationTurn.conversation_id.desc(), ConversationTurn.seq.desc())
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        after_rank, after_conversation_id, after_seq = cursors.decode(cursor, 3)
+        try:
+            after = (float(after_rank), int(after_conversation_id), int(after_seq))
+        except (TypeError, ValueError):
+            raise BadRequestException("Invalid cursor")
+        hits = hits.where(tuple_(rank, ConversationTurn.conversation_id, ConversationTurn.seq) < after)
+    hits = hits.subquery()
+
+    text = ConversationTurn.query + " " + func.coalesce(ConversationTurn.response, "")
+    stmt = (
+        select(
+            hits.c.conversation_id,
+            hits.c.seq.label("turn_id"),
+            Conversation.title.label("conversation_title"),
+            hits.c.created_at,
+            hits.c.rank,
+            func.ts_headline(TEXT_SEARCH_CONFIG, text, tsquery, HEADLINE_OPTIONS).label("snippet"),
+        )
+        .join(
+            ConversationTurn,
+            (ConversationTurn.conversation_id == hits.c.conversation_id) & (ConversationTurn.seq == hits.c.seq),
+        )
+        .join(Conversation, Conversation.id == hits.c.conversation_id)
+        .order_by(hits.c.rank.desc(), hits.c.conversation_id.desc(), hits.c.seq.desc())
+    )
+
+    rows = [dict(row) for row in (await db.execute(stmt)).mappings()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = cursors.encode(last["rank"], last["conversation_id"], last["turn_id"])
+    return {"data": rows, "next_cursor": next_cursor}
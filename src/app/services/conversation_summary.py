@@ -0,0 +1,86 @@
+from typing import Any
+
+from ..core.config import settings
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """
+You maintain the running summary of a conversation between a user and an assistant that designs APIs.
+Merge the previous summary with the new turns into a single updated summary.
+Keep every decision about the API: type, resources, endpoints, data models, authentication, error handling,
+versioning and any open questions. Drop greetings and small talk. Answer with the summary only.
+"""
+
+
+def estimate_tokens(messages: list[dict[str, Any]]) -> int:
+    """Cheap token estimate for chat messages, about four characters per token plus per-message overhead."""
+    total = 0
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content)
+        total += len(content) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+    return total
+
+
+def turn_messages(queries: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    messages = []
+    for query in queries:
+        messages.append({"role": "user", "content": query["query"]})
+        if query.get("response"):
+            messages.append({"role": "assistant", "content": query["response"]})
+
+    return messages
+
+
+def pending_turns(conversation: dict[str, Any]) -> list[dict[str, Any]]:
+    """The turns not covered by the summary yet, whether `queries` holds the whole history or only those turns."""
+    summarized_turns = conversation.get("summarized_turns") or 0
+    return [query for query in conversation["queries"] if query["id"] >= summarized_turns]
+
+
+def history_messages(conversation: dict[str, Any]) -> list[dict[str, Any]]:
+    """Messages to send ahead of a new turn: the rolling summary, if any, followed by the turns it does not cover."""
+    messages = []
+    if conversation.get("summary"):
+        messages.append(
+            {"role": "system", "content": f"Summary of the conversation so far:\n{conversation['summary']}"}
+        )
+
+    messages.extend(turn_messages(pending_turns(conversation)))
+    return messages
+
+
+def needs_summary(conversation: dict[str, Any]) -> bool:
+    """Whether the turns not yet covered by the summary crossed the turn or token threshold."""
+    pending = pending_turns(conversation)
+    if len(pending) <= settings.CONVERSATION_RECENT_TURNS:
+        return False
+
+    return (
+        len(pending) >= settings.CONVERSATION_SUMMARY_TURN_THRESHOLD
+        or estimate_tokens(turn_messages(pending)) >= settings.CONVERSATION_SUMMARY_TOKEN_THRESHOLD
+    )
+
+
+def summary_request(conversation: dict[str, Any]) -> tuple[list[dict[str, Any]], int]:
+    """Build the summarization prompt and return it with the number of turns the new summary will cover.
+
+    The last `CONVERSATION_RECENT_TURNS` turns are left out so that they keep being sent verbatim.
+    """
+    pending = pending_turns(conversation)
+    covered_turns = (conversation.get("summarized_turns") or 0) + len(pending) - settings.CONVERSATION_RECENT_TURNS
+
+    messages = [{"role": "system", "content": SUMMARY_PROMPT}]
+    if conversation.get("summary"):
+        messages.append({"role": "user", "content": f"Previous summary:\n{conversation['summary']}"})
+
+    transcript = "\n\n".join(
+        f"{message['role']}: {message['content']}"
+        for message in turn_messages(pending[: -settings.CONVERSATION_RECENT_TURNS or None])
+    )
+    messages.append({"role": "user", "content": f"New turns:\n{transcript}"})
+
+    return messages, covered_turns
@@ -0,0 +1,406 @@
+import uuid as uuid_pkg
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import and_, case, false, func, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.exceptions.http_exceptions import BadRequestException
+from ..core.utils import cursor as cursors
+from ..models.conversation import Conversation, ConversationTurn
+
+# Turns live in `conversation_turn`, one row per turn keyed by (conversation_id, seq). Conversations written before
+# that table existed still hold their turns in the `queries` JSONB array, at seq = array index, until
+# `move_legacy_turns` copies them over; reads merge both so the move can happen online.
+#
+# The conversation row carries what the conversation list shows - `turn_count`, `title`, `last_message_preview`
+# and `last_activity_at` - and is updated along with every write of a turn, so listing never reads turns.
+
+TITLE_LENGTH = 80
+PREVIEW_LENGTH = 160
+
+
+def _as_datetime(value: Any) -> datetime | None:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _legacy_uuid(query: dict[str, Any]) -> uuid_pkg.UUID:
+    # turns added through `add_query_to_conversation` kept their UUID under "id"
+    for value in (query.get("uuid"), query.get("id")):
+        try:
+            return uuid_pkg.UUID(str(value))
+        except (TypeError, ValueError):
+            continue
+    return uuid_pkg.uuid4()
+
+
+def _turn(seq: int, turn: Any) -> dict[str, Any]:
+    return {
+        "id": seq,
+        "uuid": str(turn.uuid),
+        "query": turn.query,
+        "response": turn.response,
+        "created_at": turn.created_at,
+        "updated_at": turn.updated_at,
+        "is_affected": turn.is_affected,
+        "is_partial": turn.is_partial,
+    }
+
+
+def _legacy_turn(seq: int, query: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": seq,
+        "uuid": str(_legacy_uuid(query)),
+        "query": query.get("query") or "",
+        "response": query.get("response"),
+        "created_at": _as_datetime(query.get("created_at")),
+        "updated_at": _as_datetime(query.get("updated_at")),
+        "is_affected": bool(query.get("is_affected")),
+        "is_partial": bool(query.get("is_partial")),
+    }
+
+
+def finish_turns(turns: list[dict[str, Any]], last_edit: datetime | None = None) -> list[dict[str, Any]]:
+    """Derive `is_affected` and serialize timestamps; `last_edit` is the latest edit of a turn before `turns`.
+
+    Editing a turn affects every turn that existed at the time, which is exactly the turns created before the
+    latest edit of any earlier turn. Deriving the flag on read keeps an edit a single-row update.
+    """
+    for turn in turns:
+        created_at, updated_at = turn["created_at"], turn["updated_at"]
+        if last_edit is not None and created_at is not None and created_at < last_edit:
+            turn["is_affected"] = True
+        if updated_at is not None and (last_edit is None or updated_at > last_edit):
+            last_edit = updated_at
+
+        turn["created_at"] = created_at.isoformat() if created_at else None
+        turn["updated_at"] = updated_at.isoformat() if updated_at else None
+    return turns
+
+
+def _preview(query: str, response: str | None) -> str:
+    return (response or query)[:PREVIEW_LENGTH]
+
+
+def _merge(rows: list[Any], legacy_queries: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    turns = {row.seq: _turn(row.seq, row) for row in rows}
+    for seq, query in enumerate(legacy_queries):
+        turns.setdefault(seq, _legacy_turn(seq, query))
+    return finish_turns([turns[seq] for seq in sorted(turns)])
+
+
+def _window(
+    turns: list[dict[str, Any]], limit: int | None, before: int | None, after: int | None
+) -> list[dict[str, Any]]:
+    if after is not None:
+        turns = [turn for turn in turns if turn["id"] > after]
+        return turns[:limit] if limit else turns
+    if before is not None:
+        turns = [turn for turn in turns if turn["id"] < before]
+    return turns[-limit:] if limit else turns
+
+
+async def _load_window(
+    db: AsyncSession, conversation_id: int, limit: int | None, before: int | None, after: int | None
+) -> list[dict[str, Any]]:
+    stmt = select(ConversationTurn).where(ConversationTurn.conversation_id == conversation_id)
+    if after is not None:
+        stmt = stmt.where(ConversationTurn.seq > after).order_by(ConversationTurn.seq)
+    else:
+        if before is not None:
+            stmt = stmt.where(ConversationTurn.seq < before)
+        stmt = stmt.order_by(ConversationTurn.seq.desc())
+    if limit:
+        stmt = stmt.limit(limit)
+
+    rows = sorted((await db.execute(stmt)).scalars(), key=lambda row: row.seq)
+    last_edit = None
+    if rows and rows[0].seq > 0:
+        # only the edit timestamps of the earlier turns are needed, not their text
+        last_edit = (
+            await db.execute(
+                select(func.max(ConversationTurn.updated_at)).where(
+                    ConversationTurn.conversation_id == conversation_id, ConversationTurn.seq < rows[0].seq
+                )
+            )
+        ).scalar_one()
+    return finish_turns([_turn(row.seq, row) for row in rows], last_edit)
+
+
+async def conversation_exists(db: AsyncSession, **kwargs: Any) -> bool:
+    """Whether a conversation matches `kwargs`, without reading its columns, the `queries` array in particular."""
+    stmt = select(Conversation.id).where(*(getattr(Conversation, key) == value for key, value in kwargs.items()))
+    return (await db.execute(stmt.limit(1))).first() is not None
+
+
+async def get_conversation(
+    db: AsyncSession,
+    limit: int | None = None,
+    before: int | None = None,
+    after: int | None = None,
+    unsummarized: bool = False,
+    **kwargs: Any,
+) -> dict[str, Any] | None:
+    """Get a conversation matching `kwargs` with its turns under `queries`.
+
+    With `limit`, `before` or `after` only a window of the turns is read: the last `limit` turns, of those with
+    a seq below `before` if given, or the first `limit` turns with a seq above `after`. `previous_cursor` and
+    `next_cursor` are then the seq to pass as `before` or `after` for the adjacent turns, if there are any.
+    With `unsummarized` the window is the turns not covered by the rolling summary yet, as a new chat turn needs.
+    """
+    columns = [column for column in Conversation.__table__.c if column.name != "queries"]
+    row = (
+        await db.execute(
+            select(*columns, func.jsonb_array_length(Conversation.queries).label("legacy_turns")).where(
+                *(getattr(Conversation, key) == value for key, value in kwargs.items())
+            )
+        )
+    ).mappings().one_or_none()
+    if row is None:
+        return None
+
+    conversation = dict(row)
+    legacy_turns = conversation.pop("legacy_turns")
+    if unsummarized:
+        after = (conversation["summarized_turns"] or 0) - 1
+    if legacy_turns:
+        # turns not moved out of the JSONB array yet, their window has to be cut from the whole history
+        legacy_queries = (
+            await db.execute(select(Conversation.queries).where(Conversation.id == conversation["id"]))
+        ).scalar_one()
+        rows = (
+            await db.execute(
+                select(ConversationTurn)
+                .where(ConversationTurn.conversation_id == conversation["id"])
+                .order_by(ConversationTurn.seq)
+            )
+        ).scalars()
+        turns = _merge(list(rows), legacy_queries)
+        conversation["turn_count"] = len(turns)
+        conversation["queries"] = _window(turns, limit, before, after)
+    else:
+        conversation["queries"] = await _load_window(db, conversation["id"], limit, before, after)
+
+    queries = conversation["queries"]
+    conversation["previous_cursor"] = queries[0]["id"] if queries and queries[0]["id"] > 0 else None
+    conversation["next_cursor"] = (
+        queries[-1]["id"] if queries and queries[-1]["id"] < conversation["turn_count"] - 1 else None
+    )
+    return conversation
+
+
+async def list_conversations(
+    db: AsyncSession, user_id: int, limit: int, cursor: str | None = None
+) -> dict[str, Any]:
+    """A page of a user's conversations, newest first, from the conversation rows alone.
+
+    Pages are delimited by the (created_at, id) of their last conversation rather than an offset, so every page
+    is one range scan of the partial (created_by_user_id, created_at) index of live conversations.
+    """
+    stmt = (
+        select(
+            Conversation.id,
+            Conversation.uuid,
+            Conversation.title,
+            Conversation.turn_count,
+            Conversation.last_message_preview,
+            Conversation.last_activity_at,
+            Conversation.created_at,
+        )
+        .where(Conversation.created_by_user_id == user_id, Conversation.is_deleted == false())
+        .order_by(Conversation.created_at.desc(), Conversation.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        created_at, conversation_id = cursors.decode(cursor, 2)
+        try:
+            after = (datetime.fromisoformat(created_at), int(conversation_id))
+        except (TypeError, ValueError):
+            raise BadRequestException("Invalid cursor")
+        stmt = stmt.where(tuple_(Conversation.created_at, Conversation.id) < after)
+
+    rows = [dict(row) for row in (await db.execute(stmt)).mappings()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = cursors.encode(rows[-1]["created_at"].isoformat(), rows[-1]["id"])
+    return {"data": rows, "next_cursor": next_cursor}
+
+
+async def append_turn(
+    db: AsyncSession, conversation_id: int, query: str, response: str | None, is_partial: bool = False
+) -> dict[str, Any]:
+    """Append a turn with one single-row update and one single-row insert, then commit.
+
+    The sequence number comes from incrementing `turn_count`, which also counts turns not yet moved out of the
+    JSONB array. The row lock this takes on the conversation orders concurrent appends instead of letting one
+    overwrite the other.
+    """
+    now = datetime.now(UTC)
+    next_count = func.greatest(Conversation.turn_count, func.jsonb_array_length(Conversation.queries)) + 1
+    turn_count = (
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(
+                turn_count=next_count,
+                title=func.coalesce(Conversation.title, query[:TITLE_LENGTH]),
+                last_message_preview=_preview(query, response),
+                last_activity_at=now,
+            )
+            .returning(Conversation.turn_count)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalar_one()
+
+    turn = ConversationTurn(
+        conversation_id=conversation_id,
+        seq=turn_count - 1,
+        query=query,
+        response=response,
+        is_partial=is_partial,
+        created_at=now,
+    )
+    db.add(turn)
+    await db.commit()
+    return finish_turns([_turn(turn.seq, turn)])[0]
+
+
+async def update_turn(db: AsyncSession, conversation_id: int, seq: int, query: str, response: str) -> bool:
+    """Edit one turn in place and commit; returns whether the turn exists."""
+    now = datetime.now(UTC)
+
+    async def _update() -> int:
+        result = await db.execute(
+            update(ConversationTurn)
+            .where(ConversationTurn.conversation_id == conversation_id, ConversationTurn.seq == seq)
+            .values(query=query, response=response, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    updated = await _update()
+    if not updated and await move_legacy_turns(db, conversation_id):
+        updated = await _update()
+
+    if updated:
+        values: dict[str, Any] = {
+            "last_activity_at": now,
+            "last_message_preview": case(
+                (Conversation.turn_count == seq + 1, _preview(query, response)),
+                else_=Conversation.last_message_preview,
+            ),
+        }
+        if seq == 0:
+            values["title"] = query[:TITLE_LENGTH]
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    await db.commit()
+    return updated > 0
+
+
+async def move_legacy_turns(db: AsyncSession, conversation_id: int) -> int:
+    """Copy the JSONB turns of one conversation into `conversation_turn` and empty the array, without committing.
+
+    Also fills in the list columns of conversations whose turns were written before they existed. The conversation
+    row stays locked until the caller commits. Returns the number of turns moved.
+    """
+    row = (
+        await db.execute(
+            select(Conversation.queries, Conversation.turn_count, Conversation.last_activity_at)
+            .where(Conversation.id == conversation_id)
+            .with_for_update()
+        )
+    ).one_or_none()
+    if row is None or not (row.queries or (row.turn_count and row.last_activity_at is None)):
+        return 0
+
+    now = datetime.now(UTC)
+    values = []
+    for seq, query in enumerate(row.queries):
+        turn = _legacy_turn(seq, query)
+        values.append(
+            {
+                "conversation_id": conversation_id,
+                "seq": seq,
+                "query": turn["query"],
+                "response": turn["response"],
+                "uuid": uuid_pkg.UUID(turn["uuid"]),
+                "is_affected": turn["is_affected"],
+                "is_partial": turn["is_partial"],
+                "created_at": turn["created_at"] or now,
+                "updated_at": turn["updated_at"],
+            }
+        )
+    if values:
+        await db.execute(insert(ConversationTurn).values(values).on_conflict_do_nothing())
+
+    turns = select(ConversationTurn).where(ConversationTurn.conversation_id == conversation_id)
+    first = turns.with_only_columns(ConversationTurn.query).order_by(ConversationTurn.seq).limit(1)
+    last = (
+        turns.with_only_columns(func.coalesce(ConversationTurn.response, ConversationTurn.query))
+        .order_by(ConversationTurn.seq.desc())
+        .limit(1)
+    )
+    activity = turns.with_only_columns(
+        func.max(func.coalesce(ConversationTurn.updated_at, ConversationTurn.created_at))
+    )
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(
+            queries=[],
+            turn_count=func.greatest(Conversation.turn_count, len(values)),
+            title=func.left(first.scalar_subquery(), TITLE_LENGTH),
+            last_message_preview=func.left(last.scalar_subquery(), PREVIEW_LENGTH),
+            last_activity_at=activity.scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return len(values)
+
+
+async def backfill_legacy_turns(db: AsyncSession, batch_size: int = 100) -> int:
+    """Move the JSONB turns of every conversation into `conversation_turn` while the application keeps running.
+
+    Conversations are visited in id order, `batch_size` at a time, each batch in its own short transaction so that
+    concurrent appends only ever wait for one batch. Conversations that only lack their list columns get them
+    filled in. Returns the number of turns moved.
+    """
+    moved = 0
+    last_id = 0
+    while True:
+        ids = list(
+            (
+                await db.execute(
+                    select(Conversation.id)
+                    .where(
+                        Conversation.id > last_id,
+                        or_(
+                            func.jsonb_array_length(Conversation.queries) > 0,
+                            and_(Conversation.turn_count > 0, Conversation.last_activity_at.is_(None)),
+                        ),
+                    )
+                    .order_by(Conversation.id)
+                    .limit(batch_size)
+                )
+            ).scalars()
+        )
+        if not ids:
+            return moved
+
+        for conversation_id in ids:
+            moved += await move_legacy_turns(db, conversation_id)
+        await db.commit()
+        last_id = ids[-1]
@@ -0,0 +1,239 @@
+import asyncio
+import contextlib
+import functools
+import hashlib
+import os
+import signal
+import tempfile
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any, TypeVar
+
+import anyio
+import PyPDF2
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..core.logger import logging
+from ..core.utils import cache, process_pool
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "extracted_text"
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+T = TypeVar("T")
+
+
+# -------- process pool tasks --------
+def _expire(signum: int, frame: Any) -> None:
+    raise TimeoutError("Timed out extracting text from file")
+
+
+@contextlib.contextmanager
+def _time_limit(deadline: float) -> Iterator[None]:
+    """Interrupt the work of a pool task that is still running at `deadline`, a `time.time()` value.
+
+    Waiting on a pool future with a timeout only stops the waiting, so the limit has to be enforced where the work
+    runs. This uses SIGALRM and therefore only applies in the main thread of a pool process; where no process pool
+    was started, tasks run in threads and are only stopped by the checks between pages.
+    """
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise TimeoutError("Timed out extracting text from file")
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    previous = signal.signal(signal.SIGALRM, _expire)
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@functools.lru_cache(maxsize=4)
+def _open_pdf(path: str, mtime_ns: int) -> PyPDF2.PdfReader:
+    """Parse a PDF once per pool process instead of once per batch of pages."""
+    return PyPDF2.PdfReader(path)
+
+
+def _pdf_page_count(path: str, deadline: float) -> int:
+    with _time_limit(deadline):
+        return len(_open_pdf(path, os.stat(path).st_mtime_ns).pages)
+
+
+def _extract_pdf_pages(path: str, start: int, stop: int, deadline: float) -> list[str]:
+    pages = []
+    with _time_limit(deadline):
+        reader = _open_pdf(path, os.stat(path).st_mtime_ns)
+        for i in range(start, stop):
+            if time.time() > deadline:
+                raise TimeoutError("Timed out extracting text from file")
+            pages.append(reader.pages[i].extract_text() or "")
+    return pages
+
+
+def _read_text(path: str) -> str:
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+# -------- helpers --------
+def _extension(filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {extension}")
+    return extension
+
+
+def _check_size(size: int) -> None:
+    if size > settings.EXTRACTION_MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"File is larger than the {settings.EXTRACTION_MAX_FILE_SIZE} bytes allowed"
+        )
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _submit(fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+    """Run `fn` in the shared process pool, or in the default thread pool where no process pool was started."""
+    return asyncio.get_running_loop().run_in_executor(process_pool.pool, fn, *args)
+
+
+async def _wait(future: "asyncio.Future[T]", deadline: float) -> T:
+    remaining = deadline - asyncio.get_running_loop().time()
+    try:
+        return await asyncio.wait_for(future, timeout=max(remaining, 0))
+    except TimeoutError:
+        raise HTTPException(status_code=422, detail="Timed out extracting text from file")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Error reading file: {str(e)}")
+
+
+# -------- extraction --------
+async def iter_pages(path: str, filename: str) -> AsyncIterator[str]:
+    """Yield the text of a stored document page by page, in order.
+
+    PDF pages are parsed in the process pool in batches of `EXTRACTION_PAGES_PER_TASK`, with up to one batch
+    per pool worker in flight ahead of the page being yielded. Text files are a single page. The whole document
+    must be read within `EXTRACTION_TIMEOUT` seconds and PDFs may have at most `EXTRACTION_MAX_PAGES` pages;
+    pool tasks still running at the deadline are interrupted in the pool process.
+    """
+    extension = _extension(filename)
+    _check_size(os.path.getsize(path))
+    deadline = asyncio.get_running_loop().time() + settings.EXTRACTION_TIMEOUT
+    # the same deadline for the pool processes, which do not share the event loop's clock
+    task_deadline = time.time() + settings.EXTRACTION_TIMEOUT
+
+    if extension == ".txt":
+        yield await _wait(_submit(_read_text, path), deadline)
+        return
+
+    page_count = await _wait(_submit(_pdf_page_count, path, task_deadline), deadline)
+    if page_count > settings.EXTRACTION_MAX_PAGES:
+        raise HTTPException(
+            status_code=413, detail=f"PDF has {page_count} pages, at most {settings.EXTRACTION_MAX_PAGES} are allowed"
+        )
+
+    batch_size = settings.EXTRACTION_PAGES_PER_TASK
+    lookahead = max(1, settings.PROCESS_POOL_WORKERS)
+    batches = iter(range(0, page_count, batch_size))
+    pending: list[asyncio.Future[list[str]]] = []
+
+    def submit_batch(start: int) -> None:
+        stop = min(start + batch_size, page_count)
+        pending.append(_submit(_extract_pdf_pages, path, start, stop, task_deadline))
+
+    try:
+        for start in batches:
+            submit_batch(start)
+            if len(pending) >= lookahead:
+                break
+
+        while pending:
+            pages = await _wait(pending.pop(0), deadline)
+            start = next(batches, None)
+            if start is not None:
+                submit_batch(start)
+
+            for page in pages:
+                yield page
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def _cached_text(digest: str) -> str | None:
+    if cache.client is None:
+        return None
+
+    try:
+        cached = await cache.client.get(f"{KEY_PREFIX}:{digest}")
+    except Exception as e:
+        logger.warning(f"Extracted text cache lookup failed: {e}")
+        return None
+
+    return cached.decode() if cached is not None else None
+
+
+async def _store_text(digest: str, text: str) -> None:
+    if cache.client is None:
+        return
+
+    try:
+        await cache.client.set(f"{KEY_PREFIX}:{digest}", text, ex=settings.EXTRACTION_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Extracted text cache store failed: {e}")
+
+
+async def extract_text_from_path(path: str, filename: str, digest: str | None = None) -> str:
+    """Extract the text of a stored document, reusing the text extracted from any earlier upload of the same content.
+
+    Extracted text is cached in Redis under the SHA-256 of the file content, which is computed unless `digest`
+    is given.
+    """
+    _extension(filename)
+    _check_size(os.path.getsize(path))
+    if digest is None:
+        digest = await anyio.to_thread.run_sync(_hash_file, path)
+
+    text = await _cached_text(digest)
+    if text is None:
+        text = "\n".join([page async for page in iter_pages(path, filename)])
+        await _store_text(digest, text)
+
+    return text
+
+
+async def extract_text(content: bytes, filename: str) -> str:
+    """Extract the text of an in-memory document.
+
+    On a cache miss the content is spooled to a temporary file so that pool workers read it from disk instead of
+    receiving a copy of it with every batch.
+    """
+    extension = _extension(filename)
+    _check_size(len(content))
+    digest = (await anyio.to_thread.run_sync(hashlib.sha256, content)).hexdigest()
+
+    text = await _cached_text(digest)
+    if text is not None:
+        return text
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"{digest}{extension}")
+        async with await anyio.open_file(path, "wb") as file:
+            await file.write(content)
+        return await extract_text_from_path(path, filename, digest=digest)
@@ -0,0 +1,141 @@
+import asyncio
+import random
+
+from redis.commands.core import AsyncScript
+
+from ..core.config import settings
+from ..core.exceptions.http_exceptions import RateLimitException
+from ..core.logger import logging
+from ..core.utils import cache, metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "llm_budget"
+BUCKET_TTL = 120
+
+# Two token buckets, one for tokens and one for requests, refilled continuously at limit / 60 per second up to
+# one minute's worth. Time comes from the Redis server so every node shares one clock.
+_REFILL = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local function level(key, limit)
+    local state = redis.call('HMGET', key, 'level', 'updated')
+    local current = tonumber(state[1]) or limit
+    local updated = tonumber(state[2]) or now
+    return math.min(limit, current + math.max(now - updated, 0) * limit / 60)
+end
+local function save(key, value)
+    redis.call('HSET', key, 'level', tostring(value), 'updated', tostring(now))
+    redis.call('EXPIRE', key, tonumber(ARGV[4]))
+end
+"""
+
+# KEYS: token bucket, request bucket. ARGV: tokens per minute, requests per minute, tokens to reserve, ttl.
+# Reserves both or nothing and returns the seconds to wait before the reservation could succeed, 0 on success.
+RESERVE_SCRIPT = (
+    _REFILL
+    + """
+local tpm, rpm, tokens = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local token_level = level(KEYS[1], tpm)
+local request_level = level(KEYS[2], rpm)
+local wait = 0
+if token_level < tokens then
+    wait = (tokens - token_level) * 60 / tpm
+end
+if request_level < 1 then
+    wait = math.max(wait, (1 - request_level) * 60 / rpm)
+end
+if wait == 0 then
+    token_level = token_level - tokens
+    request_level = request_level - 1
+end
+save(KEYS[1], token_level)
+save(KEYS[2], request_level)
+return tostring(wait)
+"""
+)
+
+# KEYS: token bucket. ARGV: tokens per minute, unused, tokens to give back (negative to charge more), ttl.
+RECONCILE_SCRIPT = (
+    _REFILL
+    + """
+local tpm = tonumber(ARGV[1])
+save(KEYS[1], math.min(tpm, level(KEYS[1], tpm) + tonumber(ARGV[3])))
+return 1
+"""
+)
+
+_reserve_script: AsyncScript | None = None
+_reconcile_script: AsyncScript | None = None
+
+
+def _keys(model: str) -> list[str]:
+    return [f"{KEY_PREFIX}:{model}:tokens", f"{KEY_PREFIX}:{model}:requests"]
+
+
+def _scripts() -> tuple[AsyncScript, AsyncScript]:
+    global _reserve_script, _reconcile_script
+    if _reserve_script is None or _reconcile_script is None:
+        _reserve_script = cache.client.register_script(RESERVE_SCRIPT)
+        _reconcile_script = cache.client.register_script(RECONCILE_SCRIPT)
+    return _reserve_script, _reconcile_script
+
+
+async def reserve(model: str, tokens: int) -> int:
+    """Reserve `tokens` tokens and one request of the cluster-wide per-minute budget of `model`.
+
+    Waits until the budget has refilled enough, for at most `LLM_BUDGET_MAX_WAIT` seconds, after which a
+    `RateLimitException` is raised rather than sending a request upstream would throttle. Returns the number of
+    tokens reserved, which must be passed to `reconcile` once the call finished. Fails open, reserving nothing, when
+    the budget is disabled or Redis is unavailable.
+    """
+    if not settings.LLM_BUDGET_ENABLED or cache.client is None:
+        return 0
+
+    tokens = min(tokens, settings.LLM_TOKENS_PER_MINUTE)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + settings.LLM_BUDGET_MAX_WAIT
+    reserve_script, _ = _scripts()
+    while True:
+        try:
+            wait = float(
+                await reserve_script(
+                    keys=_keys(model),
+                    args=[settings.LLM_TOKENS_PER_MINUTE, settings.LLM_REQUESTS_PER_MINUTE, tokens, BUCKET_TTL],
+                    client=cache.client,
+                )
+            )
+        except Exception as e:
+            logger.warning(f"LLM budget reservation failed, sending without it: {e}")
+            return 0
+
+        if wait == 0:
+            metrics.observe("llm_budget_wait_seconds", loop.time() - start, model=model)
+            return tokens
+
+        if loop.time() + wait > deadline:
+            metrics.increment("llm_budget_rejected_total", model=model)
+            raise RateLimitException("The model's token budget is exhausted, please retry later")
+
+        # spread the retries of callers that were told to wait the same time
+        await asyncio.sleep(wait * random.uniform(1, 1.2))
+
+
+async def reconcile(model: str, reserved: int, used: int) -> None:
+    """Give back the part of a reservation that was not used, or charge for usage beyond the estimate."""
+    if reserved == 0 or used == reserved or cache.client is None:
+        return
+
+    _, reconcile_script = _scripts()
+    try:
+        await reconcile_script(
+            keys=_keys(model)[:1],
+            args=[settings.LLM_TOKENS_PER_MINUTE, 0, reserved - used, BUCKET_TTL],
+            client=cache.client,
+        )
+    except Exception as e:
+        logger.warning(f"LLM budget reconciliation failed: {e}")
+        return
+
+    metrics.increment("llm_budget_reconciled_tokens_total", reserved - used, model=model)
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from ..core.config import settings
+from ..core.logger import logging
+from ..core.utils import cache, metrics
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed for the near-duplicate index
+    np = None
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "llm:response"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class CachedCompletion:
+    content: str
+    total_tokens: int
+    near_duplicate: bool = False
+
+
+def _normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def normalize_messages(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Collapse whitespace in every text part so that prompts differing only in formatting share a cache entry."""
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            content = _normalize_text(content)
+        elif isinstance(content, list):
+            content = [
+                {**part, "text": _normalize_text(part["text"])} if part.get("type") == "text" else part
+                for part in content
+            ]
+        normalized.append({"role": message.get("role"), "content": content})
+
+    return normalized
+
+
+def build_cache_key(model: str, temperature: float, messages: list[dict[str, Any]]) -> str:
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": normalize_messages(messages)},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return f"{KEY_PREFIX}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def is_enabled_for_tier(tier_name: str | None) -> bool:
+    if not settings.LLM_CACHE_ENABLED:
+        return False
+
+    bypass_tiers = {name.strip() for name in settings.LLM_CACHE_BYPASS_TIERS.split(",") if name.strip()}
+    return tier_name not in bypass_tiers
+
+
+def _conversation_text(messages: list[dict[str, Any]]) -> str:
+    parts = []
+    for message in normalize_messages(messages):
+        if message["role"] == "system":
+            continue
+        content = message["content"]
+        if isinstance(content, list):
+            content = " ".join(part["text"] for part in content if part.get("type") == "text")
+        parts.append(content or "")
+
+    return " ".join(parts).lower()
+
+
+class NearDuplicateIndex:
+    """Local MinHash/LSH index mapping prompts to the cache keys of similar, already answered prompts.
+
+    Prompts are split into word shingles and summarised by a MinHash signature. Signatures are split into bands
+    and every band is hashed into a bucket, so only prompts sharing at least one bucket are compared. A candidate
+    is accepted when the fraction of equal signature positions, an estimate of the Jaccard similarity of the
+    shingle sets, reaches `threshold`.
+
+    The index lives in process memory and only points at entries stored in Redis, so it is rebuilt as each
+    worker answers prompts and losing it costs nothing but hits.
+    """
+
+    _PRIME = (1 << 31) - 1
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        capacity: int = 10000,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required for the near-duplicate index.")
+
+        self.threshold = threshold
+        self.capacity = capacity
+        # pick the band layout whose LSH collision threshold, (1 / bands) ** (1 / rows), sits just below `threshold`
+        self.bands, self.rows = min(
+            ((bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0),
+            key=lambda layout: abs((1 / layout[0]) ** (1 / layout[1]) - (threshold - 0.05)),
+        )
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, self._PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, self._PRIME, num_perm, dtype=np.uint64)
+
+        self._entries: OrderedDict[str, tuple[str, Any]] = OrderedDict()
+        self._buckets: dict[bytes, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _signature(self, text: str) -> Any:
+        words = text.split()
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {" ".join(words[i : i + size]) for i in range(max(1, len(words) - size + 1))}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        hashes %= self._PRIME
+        return ((hashes[:, None] * self._a + self._b) % self._PRIME).min(axis=0)
+
+    def _band_keys(self, context: str, signature: Any) -> list[bytes]:
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows : (band + 1) * self.rows]
+            keys.append(hashlib.blake2b(f"{context}:{band}:".encode() + rows.tobytes(), digest_size=16).digest())
+        return keys
+
+    def add(self, context: str, text: str, cache_key: str) -> None:
+        signature = self._signature(text)
+        with self._lock:
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+                return
+
+            self._entries[cache_key] = (context, signature)
+            for band_key in self._band_keys(context, signature):
+                self._buckets.setdefault(band_key, set()).add(cache_key)
+
+            while len(self._entries) > self.capacity:
+                evicted_key, (evicted_context, evicted_signature) = self._entries.popitem(last=False)
+                self._discard_buckets(evicted_key, evicted_context, evicted_signature)
+
+    def _discard_buckets(self, cache_key: str, context: str, signature: Any) -> None:
+        for band_key in self._band_keys(context, signature):
+            members = self._buckets.get(band_key)
+            if members is None:
+                continue
+            members.discard(cache_key)
+            if not members:
+                del self._buckets[band_key]
+
+    def remove(self, cache_key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(cache_key, None)
+            if entry is not None:
+                self._discard_buckets(cache_key, *entry)
+
+    def query(self, context: str, text: str) -> tuple[str, float] | None:
+        """Return the cache key of the most similar indexed prompt and its estimated similarity, if above threshold."""
+        signature = self._signature(text)
+        with self._lock:
+            candidates: set[str] = set()
+            for band_key in self._band_keys(context, signature):
+                candidates |= self._buckets.get(band_key, set())
+
+            best: tuple[str, float] | None = None
+            for candidate in candidates:
+                _, candidate_signature = self._entries[candidate]
+                similarity = float(np.mean(candidate_signature == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (candidate, similarity)
+
+            if best is not None:
+                self._entries.move_to_end(best[0])
+
+        return best
+
+
+near_duplicate_index: NearDuplicateIndex | None = None
+if settings.LLM_CACHE_NEAR_DUPLICATE_ENABLED:
+    if np is None:
+        logger.warning("LLM_CACHE_NEAR_DUPLICATE_ENABLED is set but numpy is not installed. Using exact matches only.")
+    else:
+        near_duplicate_index = NearDuplicateIndex(
+            threshold=settings.LLM_CACHE_SIMILARITY_THRESHOLD, capacity=settings.LLM_CACHE_NEAR_DUPLICATE_CAPACITY
+        )
+
+
+def _record_lookup(result: str, saved_tokens: int = 0) -> None:
+    metrics.increment("llm_cache_lookups_total", result=result)
+    if saved_tokens:
+        metrics.increment("llm_cache_saved_tokens_total", saved_tokens)
+
+    hits = metrics.get_counter("llm_cache_lookups_total", result="hit") + metrics.get_counter(
+        "llm_cache_lookups_total", result="near_hit"
+    )
+    total = hits + metrics.get_counter("llm_cache_lookups_total", result="miss")
+    if total:
+        metrics.set_gauge("llm_cache_hit_ratio", hits / total)
+
+
+async def _read(cache_key: str) -> dict[str, Any] | None:
+    if cache.client is None:
+        return None
+
+    cached = await cache.client.get(cache_key)
+    if cached is None:
+        return None
+
+    return json.loads(cached)
+
+
+async def lookup(model: str, temperature: float, messages: list[dict[str, Any]]) -> CachedCompletion | None:
+    """Return a cached completion for this prompt, falling back to the near-duplicate index when enabled.
+
+    Cache failures are logged and treated as misses so that an unavailable Redis never fails a chat request.
+    """
+    cache_key = build_cache_key(model, temperature, messages)
+    try:
+        entry = await _read(cache_key)
+        if entry is not None:
+            _record_lookup("hit", entry["total_tokens"])
+            return CachedCompletion(content=entry["content"], total_tokens=entry["total_tokens"])
+
+        if near_duplicate_index is not None:
+            match = near_duplicate_index.query(f"{model}:{temperature}", _conversation_text(messages))
+            if match is not None:
+                entry = await _read(match[0])
+                if entry is not None:
+                    _record_lookup("near_hit", entry["total_tokens"])
+                    return CachedCompletion(
+                        content=entry["content"], total_tokens=entry["total_tokens"], near_duplicate=True
+                    )
+                near_duplicate_index.remove(match[0])
+
+    except Exception as e:
+        logger.warning(f"LLM cache lookup failed: {e}")
+
+    _record_lookup("miss")
+    return None
+
+
+async def store(
+    model: str, temperature: float, messages: list[dict[str, Any]], content: str, total_tokens: int
+) -> None:
+    if cache.client is None:
+        return
+
+    cache_key = build_cache_key(model, temperature, messages)
+    try:
+        entry = json.dumps({"content": content, "total_tokens": total_tokens})
+        await cache.client.set(cache_key, entry, ex=settings.LLM_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"LLM cache store failed: {e}")
+        return
+
+    if near_duplicate_index is not None:
+        near_duplicate_index.add(f"{model}:{temperature}", _conversation_text(messages), cache_key)
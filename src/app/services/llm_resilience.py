@@ -0,0 +1,127 @@
+import asyncio
+import random
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+import openai
+
+from ..core.config import settings
+from ..core.exceptions.http_exceptions import CustomException
+from ..core.logger import logging
+from ..core.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+DEADLINE_ERRORS = (TimeoutError, openai.APITimeoutError)
+RETRYABLE_ERRORS = (
+    TimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+_latencies: dict[str, deque[float]] = {}
+
+
+def hedge_delay(model: str) -> float:
+    """The observed p95 latency of `model`, or `OPENAI_HEDGE_DELAY` until enough calls were seen."""
+    samples = _latencies.get(model)
+    if samples is None or len(samples) < HEDGE_MIN_SAMPLES:
+        return settings.OPENAI_HEDGE_DELAY
+
+    ordered = sorted(samples)
+    return ordered[round(0.95 * (len(ordered) - 1))]
+
+
+def _backoff(attempt: int, error: BaseException) -> float:
+    """Exponential backoff with full jitter, or the delay upstream asked for with `retry-after`."""
+    if isinstance(error, openai.APIStatusError):
+        retry_after = error.response.headers.get("retry-after")
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), settings.OPENAI_RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+
+    return random.uniform(0, min(settings.OPENAI_RETRY_MAX_DELAY, settings.OPENAI_RETRY_BASE_DELAY * 2**attempt))
+
+
+async def _timed(send: Callable[[str], Awaitable[T]], model: str) -> T:
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    result = await send(model)
+    elapsed = loop.time() - start
+    _latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(elapsed)
+    metrics.observe("llm_upstream_latency_seconds", elapsed, model=model)
+    return result
+
+
+async def _hedged(send: Callable[[str], Awaitable[T]], model: str) -> T:
+    """Send one request and, if it has not answered after the hedge delay, a second one; the first success wins."""
+    if not settings.OPENAI_HEDGE_ENABLED:
+        return await _timed(send, model)
+
+    primary = asyncio.ensure_future(_timed(send, model))
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_delay(model))
+        if not done:
+            metrics.increment("llm_hedged_requests_total", model=model)
+            pending.add(asyncio.ensure_future(_timed(send, model)))
+
+        error: BaseException | None = None
+        while done or pending:
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        metrics.increment("llm_hedge_wins_total", model=model)
+                    return task.result()
+                error = error or task.exception()
+
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def complete(send: Callable[[str], Awaitable[T]], model: str) -> tuple[T, str]:
+    """Run `send(model)` with retries, hedging and model fallback; returns its result and the model that answered.
+
+    `send` performs one upstream request and is expected to raise `TimeoutError` once it misses its deadline.
+    Retryable errors - timeouts, connection errors, 429 and 5xx answers - are retried up to `OPENAI_MAX_RETRIES`
+    times with exponential backoff and jitter. A missed deadline switches the remaining attempts to
+    `OPENAI_FALLBACK_MODEL` without waiting, when one is configured. If the last attempt misses its deadline too,
+    a 504 is raised.
+    """
+    fallback = settings.OPENAI_FALLBACK_MODEL if settings.OPENAI_FALLBACK_MODEL != model else None
+    current = model
+    attempt = 0
+    while True:
+        try:
+            return await _hedged(send, current), current
+        except RETRYABLE_ERRORS as e:
+            missed_deadline = isinstance(e, DEADLINE_ERRORS)
+            if attempt >= settings.OPENAI_MAX_RETRIES:
+                if missed_deadline:
+                    raise CustomException(status_code=504, detail="The model did not answer in time")
+                raise
+
+            delay = _backoff(attempt, e)
+            if missed_deadline and fallback is not None and current != fallback:
+                metrics.increment("llm_fallbacks_total", model=model, fallback=fallback)
+                current, delay = fallback, 0
+
+            metrics.increment("llm_retries_total", model=current, error=type(e).__name__)
+            logger.warning(f"LLM call failed with {type(e).__name__}, retrying with {current} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
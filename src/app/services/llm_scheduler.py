@@ -0,0 +1,203 @@
+import asyncio
+import itertools
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from ..core.config import settings
+from ..core.exceptions.http_exceptions import CustomException, RateLimitException
+from ..core.logger import logging
+from ..core.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIER = "default"
+
+
+def parse_tier_weights(value: str) -> dict[str, float]:
+    """Parse `LLM_TIER_WEIGHTS`, a comma-separated list of `<tier name>:<weight>` pairs."""
+    weights = {}
+    for pair in value.split(","):
+        if not pair.strip():
+            continue
+        name, _, weight = pair.rpartition(":")
+        try:
+            weights[name.strip()] = float(weight)
+        except ValueError:
+            logger.warning(f"Ignoring invalid LLM tier weight {pair!r}")
+    return weights
+
+
+@dataclass(order=True)
+class _Waiter:
+    finish_tag: float
+    sequence: int
+    tier: str = field(compare=False)
+    user_id: int | None = field(compare=False)
+    deadline: float = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class LLMScheduler:
+    """Admit upstream LLM calls into a fixed number of concurrent slots, fairly across tiers.
+
+    Waiting calls are ordered by weighted fair queuing: each one gets a virtual finish tag that advances by
+    `1 / weight` of its tier, so under contention tiers are served in proportion to their weight and, within a
+    tier, in arrival order. A user never holds more than `max_in_flight_per_user` slots; their further calls wait
+    without blocking other users. Calls are refused when `max_queue_depth` calls are already waiting and are dropped
+    from the queue, without reaching upstream, once their deadline passes.
+
+    The scheduler is per process, like the event loop it runs on.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_in_flight_per_user: int,
+        max_queue_depth: int,
+        queue_timeout: float,
+        tier_weights: dict[str, float] | None = None,
+        default_weight: float = 1,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_in_flight_per_user = max_in_flight_per_user
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+        self.tier_weights = tier_weights or {}
+        self.default_weight = default_weight
+
+        self.in_flight = 0
+        self._user_in_flight: dict[int, int] = {}
+        self._waiters: list[_Waiter] = []
+        self._virtual_time = 0.0
+        self._last_tag: dict[str, float] = {}
+        self._sequence = itertools.count()
+
+    def queue_depths(self) -> dict[str, float]:
+        depths: dict[str, float] = {}
+        for waiter in self._waiters:
+            depths[waiter.tier] = depths.get(waiter.tier, 0) + 1
+        return depths
+
+    def _weight(self, tier: str) -> float:
+        return max(self.tier_weights.get(tier, self.default_weight), 1e-6)
+
+    def _can_run(self, user_id: int | None) -> bool:
+        return user_id is None or self._user_in_flight.get(user_id, 0) < self.max_in_flight_per_user
+
+    def _take(self, user_id: int | None) -> None:
+        self.in_flight += 1
+        if user_id is not None:
+            self._user_in_flight[user_id] = self._user_in_flight.get(user_id, 0) + 1
+
+    def _release(self, user_id: int | None) -> None:
+        self.in_flight -= 1
+        if user_id is not None:
+            remaining = self._user_in_flight[user_id] - 1
+            if remaining:
+                self._user_in_flight[user_id] = remaining
+            else:
+                del self._user_in_flight[user_id]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the eligible waiters with the smallest finish tags, dropping expired ones."""
+        now = asyncio.get_running_loop().time()
+        for waiter in [waiter for waiter in self._waiters if waiter.future.done() or waiter.deadline <= now]:
+            self._waiters.remove(waiter)
+            if not waiter.future.done():
+                metrics.increment("llm_scheduler_expired_total", tier=waiter.tier)
+                waiter.future.set_exception(
+                    CustomException(status_code=503, detail="Timed out waiting for model capacity")
+                )
+
+        while self.in_flight < self.max_concurrency:
+            eligible = [waiter for waiter in self._waiters if self._can_run(waiter.user_id)]
+            if not eligible:
+                return
+
+            waiter = min(eligible)
+            self._waiters.remove(waiter)
+            self._virtual_time = max(self._virtual_time, waiter.finish_tag)
+            self._take(waiter.user_id)
+            metrics.observe("llm_queue_wait_seconds", now - waiter.enqueued_at, tier=waiter.tier)
+            waiter.future.set_result(None)
+
+    async def _acquire(self, tier: str, user_id: int | None, deadline: float) -> float:
+        loop = asyncio.get_running_loop()
+        if not self._waiters and self.in_flight < self.max_concurrency and self._can_run(user_id):
+            self._take(user_id)
+            metrics.observe("llm_queue_wait_seconds", 0, tier=tier)
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue_depth:
+            metrics.increment("llm_scheduler_rejected_total", tier=tier)
+            raise RateLimitException("Too many requests are waiting for the model, please retry later")
+
+        finish_tag = max(self._virtual_time, self._last_tag.get(tier, 0.0)) + 1 / self._weight(tier)
+        self._last_tag[tier] = finish_tag
+        waiter = _Waiter(finish_tag, next(self._sequence), tier, user_id, deadline, loop.time(), loop.create_future())
+        self._waiters.append(waiter)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max(deadline - loop.time(), 0))
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._dispatch()
+            elif waiter.future.exception() is None:
+                # the slot was granted in the same tick the wait gave up, give it back
+                self._release(user_id)
+
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            metrics.increment("llm_scheduler_expired_total", tier=tier)
+            raise CustomException(status_code=503, detail="Timed out waiting for model capacity")
+
+        return loop.time() - waiter.enqueued_at
+
+    @asynccontextmanager
+    async def slot(
+        self, tier: str | None = None, user_id: int | None = None, timeout: float | None = None
+    ) -> AsyncIterator[float]:
+        """Hold one upstream slot for the duration of the block, which receives the seconds spent queueing.
+
+        Raises `RateLimitException` when the queue is full and a 503 when no slot frees up within `timeout`
+        seconds, `LLM_QUEUE_TIMEOUT` by default.
+        """
+        tier = tier or DEFAULT_TIER
+        loop = asyncio.get_running_loop()
+        queue_time = await self._acquire(
+            tier, user_id, loop.time() + (self.queue_timeout if timeout is None else timeout)
+        )
+        try:
+            yield queue_time
+        finally:
+            self._release(user_id)
+
+
+scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_in_flight_per_user=settings.LLM_MAX_IN_FLIGHT_PER_USER,
+    max_queue_depth=settings.LLM_MAX_QUEUE_DEPTH,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+    tier_weights=parse_tier_weights(settings.LLM_TIER_WEIGHTS),
+    default_weight=settings.LLM_DEFAULT_TIER_WEIGHT,
+)
+metrics.register_gauge("llm_queue_depth", scheduler.queue_depths)
+metrics.register_gauge("llm_in_flight", lambda: scheduler.in_flight)
+
+
+@asynccontextmanager
+async def slot(
+    tier: str | None = None, user_id: int | None = None, timeout: float | None = None
+) -> AsyncIterator[float]:
+    """Hold a slot of the process-wide scheduler, or do nothing when `LLM_SCHEDULER_ENABLED` is off."""
+    if not settings.LLM_SCHEDULER_ENABLED:
+        yield 0.0
+        return
+
+    async with scheduler.slot(tier=tier, user_id=user_id, timeout=timeout) as queue_time:
+        yield queue_time
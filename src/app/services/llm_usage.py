@@ -0,0 +1,129 @@
+from datetime import UTC, datetime
+from typing import Any, Literal
+
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from sqlalchemy import func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.logger import logging
+from ..core.utils import cache
+from ..models.llm_usage import LLMUsage
+from ..schemas.llm_usage import LLMUsageCreateInternal
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = "llm_usage:buffer"
+
+Grouping = Literal["user", "tier", "day"]
+
+
+async def record(
+    *,
+    user_id: int | None,
+    tier: str | None,
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    upstream_latency: float,
+    queue_time: float,
+    cache_hit: bool,
+) -> None:
+    """Buffer the usage record of one LLM call in Redis until the worker writes it to the database."""
+    if not settings.LLM_USAGE_ENABLED or cache.client is None:
+        return
+
+    usage = LLMUsageCreateInternal(
+        user_id=user_id,
+        tier=tier,
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        upstream_latency=upstream_latency,
+        queue_time=queue_time,
+        cache_hit=cache_hit,
+        created_at=datetime.now(UTC),
+    )
+    try:
+        await cache.client.rpush(BUFFER_KEY, usage.model_dump_json())
+    except Exception as e:
+        logger.warning(f"Could not buffer LLM usage record: {e}")
+
+
+async def flush(db: AsyncSession, client: Redis) -> int:
+    """Move buffered usage records into the `llm_usage` table, `LLM_USAGE_FLUSH_BATCH_SIZE` rows per insert.
+
+    Stops once the buffer held less than a full batch so a steady stream of new records cannot keep it running.
+    A batch that fails to insert is pushed back to the buffer for the next run. Returns the number of rows written.
+    """
+    flushed = 0
+    while True:
+        raw_records = await client.lpop(BUFFER_KEY, settings.LLM_USAGE_FLUSH_BATCH_SIZE)
+        if not raw_records:
+            return flushed
+
+        rows = []
+        for raw in raw_records:
+            try:
+                rows.append(LLMUsageCreateInternal.model_validate_json(raw).model_dump())
+            except ValidationError as e:
+                logger.warning(f"Dropping malformed LLM usage record: {e}")
+
+        try:
+            if rows:
+                await db.execute(insert(LLMUsage), rows)
+                await db.commit()
+        except Exception:
+            await db.rollback()
+            await client.rpush(BUFFER_KEY, *raw_records)
+            raise
+
+        flushed += len(rows)
+        if len(raw_records) < settings.LLM_USAGE_FLUSH_BATCH_SIZE:
+            return flushed
+
+
+async def aggregate(
+    db: AsyncSession, group_by: Grouping, start: datetime | None = None, end: datetime | None = None
+) -> list[dict[str, Any]]:
+    """Sum up the usage records created in `[start, end)` per user, tier or day."""
+    key = {
+        "user": LLMUsage.user_id,
+        "tier": LLMUsage.tier,
+        # a literal so the expression is identical in SELECT and GROUP BY, bind parameters would not be
+        "day": func.date_trunc(literal_column("'day'"), LLMUsage.created_at),
+    }[group_by]
+
+    stmt = (
+        select(
+            key.label("key"),
+            func.count().label("calls"),
+            func.count().filter(LLMUsage.cache_hit).label("cache_hits"),
+            func.coalesce(func.sum(LLMUsage.prompt_tokens), 0).label("prompt_tokens"),
+            func.coalesce(func.sum(LLMUsage.completion_tokens), 0).label("completion_tokens"),
+            func.avg(LLMUsage.upstream_latency).label("avg_upstream_latency"),
+            func.avg(LLMUsage.queue_time).label("avg_queue_time"),
+        )
+        .group_by(key)
+        .order_by(key)
+    )
+    if start is not None:
+        stmt = stmt.where(LLMUsage.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(LLMUsage.created_at < end)
+
+    result = await db.execute(stmt)
+    aggregates = []
+    for row in result.mappings():
+        group = row["key"]
+        if isinstance(group, datetime):
+            group = group.date().isoformat()
+        aggregates.append(
+            {
+                **row,
+                "key": str(group) if group is not None else None,
+                "total_tokens": row["prompt_tokens"] + row["completion_tokens"],
+            }
+        )
+    return aggregates
@@ -1,37 +1,170 @@
+import asyncio
+from dataclasses import dataclass
 from typing import List
 import openai
 from ..core.config import settings
-import os
-import PyPDF2
-from fastapi import UploadFile, HTTPException
+from ..core.utils import metrics
+from fastapi import HTTPException, UploadFile
+from . import (
+    conversation_summary,
+    document_extraction,
+    llm_budget,
+    llm_cache,
+    llm_resilience,
+    llm_scheduler,
+    llm_usage,
+)
+
+
+@dataclass
+class Completion:
+    content: str
+    prompt_tokens: int
+    completion_tokens: int
+
 
 class OpenAIService:
     def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
-        self.conversation_history: List[dict] = []
+        # retries and timeouts are handled by llm_resilience
+        self.client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None, max_retries=0
+        )
         
     async def extract_text_from_file(self, file: UploadFile) -> str:
         """
-        Extract text from different file types.
+        Extract text from different file types in the shared extraction process pool.
         """
-        file_extension = os.path.splitext(file.filename)[1].lower()
-        try:
-            if file_extension == ".pdf":
-                pdf_reader = PyPDF2.PdfReader(file.file)
-                text = "\n".join([page.extract_text() for page in pdf_reader.pages])
-                return text
-            # elif file_extension in [".docx", ".doc"]:
-            #     doc = docx.Document(file_path)
-            #     return "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            elif file_extension == ".txt":
-                content = await file.read()
-                return content.decode("utf-8")
+        content = await file.read()
+        return await document_extraction.extract_text(content, file.filename)
+
+    async def create_completion(
+        self,
+        messages: List[dict],
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        use_cache: bool = True,
+        tier: str | None = None,
+        user_id: int | None = None,
+        partial: List[str] | None = None,
+    ) -> str:
+        """
+        Run a chat completion, answering from the response cache when an identical or near-identical prompt
+        was already answered.
+
+        Upstream calls wait for a slot of the LLM scheduler, which shares them fairly between `tier`s and
+        limits the calls in flight per `user_id`, and then reserve the prompt plus `max_tokens` against the
+        cluster-wide token budget. The reservation is settled with the usage the response reports.
+        Every request must answer within `OPENAI_REQUEST_TIMEOUT` and is retried, hedged or sent to the fallback
+        model as configured. Every call, answered from the cache or not, leaves a usage record.
+
+        Completions are streamed from upstream so that cancelling the call, for instance when the client
+        disconnected, closes the upstream request and stops generation. The text generated until then is
+        appended to `partial`, if given.
+        """
+        model = model or settings.OPENAI_MODEL
+        temperature = settings.OPENAI_TEMPERATURE if temperature is None else temperature
+        max_tokens = max_tokens or settings.OPENAI_MAX_TOKENS
+
+        if use_cache:
+            cached = await llm_cache.lookup(model, temperature, messages)
+            if cached is not None:
+                await llm_usage.record(
+                    user_id=user_id,
+                    tier=tier,
+                    model=model,
+                    prompt_tokens=0,
+                    completion_tokens=0,
+                    upstream_latency=0.0,
+                    queue_time=0.0,
+                    cache_hit=True,
+                )
+                return cached.content
+
+        prompt_tokens = conversation_summary.estimate_tokens(messages)
+        attempts: List[List[str]] = []
+
+        async def send(attempt_model: str) -> Completion:
+            chunks: List[str] = []
+            attempts.append(chunks)
+            reserved = await llm_budget.reserve(attempt_model, prompt_tokens + max_tokens)
+            usage = None
+            try:
+                async with asyncio.timeout(settings.OPENAI_REQUEST_TIMEOUT):
+                    stream = await self.client.chat.completions.create(
+                        model=attempt_model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                    )
+                    async with stream:
+                        async for chunk in stream:
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                chunks.append(chunk.choices[0].delta.content)
+                            if chunk.usage:
+                                usage = chunk.usage
+            except BaseException:
+                # charge what was generated before a failure or a cancellation, including of losing hedges
+                generated_tokens = len("".join(chunks)) // conversation_summary.CHARS_PER_TOKEN
+                await llm_budget.reconcile(attempt_model, reserved, prompt_tokens + generated_tokens if chunks else 0)
+                raise
+
+            content = "".join(chunks)
+            if usage is not None:
+                completion = Completion(content, usage.prompt_tokens, usage.completion_tokens)
             else:
-                raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
-    
-    async def generate_chat_response(self, message: str, follow_up: str | None = None, image_url: str | None = None, file: UploadFile | None = None) -> str:
+                completion = Completion(content, prompt_tokens, len(content) // conversation_summary.CHARS_PER_TOKEN)
+            await llm_budget.reconcile(
+                attempt_model, reserved, completion.prompt_tokens + completion.completion_tokens
+            )
+            return completion
+
+        try:
+            async with llm_scheduler.slot(tier=tier, user_id=user_id) as queue_time:
+                start = asyncio.get_running_loop().time()
+                completion, answered_by = await llm_resilience.complete(send, model)
+                upstream_latency = asyncio.get_running_loop().time() - start
+        except asyncio.CancelledError:
+            generated = max(attempts, key=len, default=[])
+            if partial is not None:
+                partial.extend(generated)
+            generated_tokens = len("".join(generated)) // conversation_summary.CHARS_PER_TOKEN
+            metrics.increment("llm_calls_cancelled_total", model=model)
+            metrics.increment("llm_cancelled_saved_tokens_total", max(max_tokens - generated_tokens, 0), model=model)
+            raise
+
+        await llm_usage.record(
+            user_id=user_id,
+            tier=tier,
+            model=answered_by,
+            prompt_tokens=completion.prompt_tokens,
+            completion_tokens=completion.completion_tokens,
+            upstream_latency=upstream_latency,
+            queue_time=queue_time,
+            cache_hit=False,
+        )
+
+        # answers of the fallback model are not cached under the primary model's key
+        if use_cache and answered_by == model:
+            total_tokens = completion.prompt_tokens + completion.completion_tokens
+            await llm_cache.store(model, temperature, messages, completion.content, total_tokens)
+
+        return completion.content
+
+    async def generate_chat_response(
+        self,
+        message: str,
+        follow_up: str | None = None,
+        image_url: str | None = None,
+        file: UploadFile | None = None,
+        history: List[dict] | None = None,
+        use_cache: bool = True,
+        tier: str | None = None,
+        user_id: int | None = None,
+        partial: List[str] | None = None,
+    ) -> str:
         messages = [
             {
                 "role": "system",
@@ -67,8 +200,8 @@ class OpenAIService:
             }
         ]
 
-        # Add conversation history
-        messages.extend(self.conversation_history)
+        # Add conversation history (rolling summary plus recent turns)
+        messages.extend(history or [])
         if image_url:
         # Add current message
             current_message = {
@@ -87,7 +220,7 @@ class OpenAIService:
         elif file:
             current_message = {
                 "role": "user",
-                "content": follow_up if follow_up else message + "\n" + self.extract_text_from_file(file)
+                "content": follow_up if follow_up else message + "\n" + await self.extract_text_from_file(file)
             }
         else:
             current_message = {
@@ -97,24 +230,13 @@ class OpenAIService:
         messages.append(current_message)
 
         try:
-            response = openai.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=messages,
-                temperature=settings.OPENAI_TEMPERATURE,
-                max_tokens=settings.OPENAI_MAX_TOKENS
+            generated_response = await self.create_completion(
+                messages, use_cache=use_cache, tier=tier, user_id=user_id, partial=partial
             )
-            generated_response = response.choices[0].message.content
-
-            # Update conversation history
-            self.conversation_history.append(current_message)
-            self.conversation_history.append(
-                {"role": "assistant", "content": generated_response}
-            )
-
-            # Limit conversation history
-            self.conversation_history = self.conversation_history[-10:]
 
             return generated_response
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise Exception(f"Error generating response: {str(e)}")
\ No newline at end of file
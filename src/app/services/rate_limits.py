@@ -0,0 +1,128 @@
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import DateTime, Integer, String, delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.db.integrity import raise_violation
+from ..core.exceptions.http_exceptions import DuplicateValueException, NotFoundException
+from ..crud.crud_tier import crud_tiers
+from ..models.rate_limit import RateLimit
+from ..models.tier import Tier
+from ..schemas.rate_limit import RateLimitCreate, RateLimitUpdate
+
+READ_COLUMNS = (RateLimit.id, RateLimit.tier_id, RateLimit.name, RateLimit.path, RateLimit.limit, RateLimit.period)
+
+
+def _duplicates() -> dict[str, Exception]:
+    return {
+        "name": DuplicateValueException("Rate Limit Name not available"),
+        "tier_id, path": DuplicateValueException("There is already a rate limit for this path"),
+    }
+
+
+async def _not_found(db: AsyncSession, tier_name: str) -> NotFoundException:
+    """The error for a rate limit of `tier_name` that matched no row, which only costs a query on this path."""
+    if await crud_tiers.exists(db=db, name=tier_name):
+        return NotFoundException("Rate Limit not found")
+    return NotFoundException("Tier not found")
+
+
+async def create_rate_limit(db: AsyncSession, tier_name: str, rate_limit: RateLimitCreate) -> dict[str, Any]:
+    """Insert a rate limit for the tier named `tier_name` with the tier looked up in the same statement.
+
+    Duplicate names and paths are rejected by the unique indexes instead of being probed for first.
+    """
+    values = rate_limit.model_dump()
+    tier = select(
+        Tier.id,
+        literal(values["name"], String),
+        literal(values["path"], String),
+        literal(values["limit"], Integer),
+        literal(values["period"], Integer),
+        literal(datetime.now(UTC), DateTime(timezone=True)),
+    ).where(Tier.name == tier_name)
+    stmt = (
+        insert(RateLimit)
+        .from_select(["tier_id", "name", "path", "limit", "period", "created_at"], tier)
+        .returning(*READ_COLUMNS)
+    )
+    try:
+        created = (await db.execute(stmt)).mappings().one_or_none()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_violation(e, _duplicates())
+
+    if created is None:
+        raise NotFoundException("Tier not found")
+    await db.commit()
+    return dict(created)
+
+
+async def list_rate_limits(db: AsyncSession, tier_name: str, offset: int, limit: int) -> dict[str, Any]:
+    """A page of the rate limits of `tier_name` in fastcrud's `get_multi` format, counted in the same query."""
+    stmt = (
+        select(*READ_COLUMNS, func.count().over().label("total_count"))
+        .join(Tier, Tier.id == RateLimit.tier_id)
+        .where(Tier.name == tier_name)
+        .order_by(RateLimit.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    rows = (await db.execute(stmt)).mappings().all()
+    if rows:
+        return {
+            "data": [{column.key: row[column.key] for column in READ_COLUMNS} for row in rows],
+            "total_count": rows[0]["total_count"],
+        }
+
+    # an empty page does not tell whether the tier exists or how many rate limits it has
+    count = select(func.count()).where(RateLimit.tier_id == Tier.id).scalar_subquery()
+    total_count = (await db.execute(select(count).where(Tier.name == tier_name))).scalar_one_or_none()
+    if total_count is None:
+        raise NotFoundException("Tier not found")
+    return {"data": [], "total_count": total_count}
+
+
+async def get_rate_limit(db: AsyncSession, tier_name: str, id: int) -> dict[str, Any]:
+    stmt = (
+        select(*READ_COLUMNS)
+        .join(Tier, Tier.id == RateLimit.tier_id)
+        .where(Tier.name == tier_name, RateLimit.id == id)
+    )
+    rate_limit = (await db.execute(stmt)).mappings().one_or_none()
+    if rate_limit is None:
+        raise await _not_found(db, tier_name)
+    return dict(rate_limit)
+
+
+async def update_rate_limit(db: AsyncSession, tier_name: str, id: int, values: RateLimitUpdate) -> None:
+    stmt = (
+        update(RateLimit)
+        .where(RateLimit.id == id, RateLimit.tier_id == Tier.id, Tier.name == tier_name)
+        .values(**values.model_dump(exclude_unset=True), updated_at=datetime.now(UTC))
+        .returning(RateLimit.id)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        updated = (await db.execute(stmt)).scalar_one_or_none()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_violation(e, _duplicates())
+
+    if updated is None:
+        raise await _not_found(db, tier_name)
+    await db.commit()
+
+
+async def delete_rate_limit(db: AsyncSession, tier_name: str, id: int) -> None:
+    stmt = (
+        delete(RateLimit)
+        .where(RateLimit.id == id, RateLimit.tier_id == Tier.id, Tier.name == tier_name)
+        .returning(RateLimit.id)
+        .execution_options(synchronize_session=False)
+    )
+    if (await db.execute(stmt)).scalar_one_or_none() is None:
+        raise await _not_found(db, tier_name)
+    await db.commit()
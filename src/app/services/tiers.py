@@ -0,0 +1,56 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.db.integrity import raise_violation
+from ..core.exceptions.http_exceptions import CustomException, DuplicateValueException, NotFoundException
+from ..crud.crud_tier import crud_tiers
+from ..models.tier import Tier
+from ..schemas.tier import TierCreateInternal, TierUpdate
+
+
+def _duplicates() -> dict[str, Exception]:
+    return {"name": DuplicateValueException("Tier Name not available")}
+
+
+async def create_tier(db: AsyncSession, tier: TierCreateInternal) -> Tier:
+    """Insert a tier, relying on the unique name to reject duplicates."""
+    try:
+        return await crud_tiers.create(db=db, object=tier)
+    except IntegrityError as e:
+        await db.rollback()
+        raise_violation(e, _duplicates())
+
+
+async def update_tier(db: AsyncSession, name: str, values: TierUpdate) -> None:
+    stmt = (
+        update(Tier)
+        .where(Tier.name == name)
+        .values(**values.model_dump(exclude_unset=True), updated_at=datetime.now(UTC))
+        .returning(Tier.id)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        updated = (await db.execute(stmt)).scalar_one_or_none()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_violation(e, _duplicates())
+
+    if updated is None:
+        raise NotFoundException("Tier not found")
+    await db.commit()
+
+
+async def delete_tier(db: AsyncSession, name: str) -> None:
+    stmt = delete(Tier).where(Tier.name == name).returning(Tier.id).execution_options(synchronize_session=False)
+    try:
+        deleted = (await db.execute(stmt)).scalar_one_or_none()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_violation(e, {"id": CustomException(status_code=409, detail="Tier is still in use")})
+
+    if deleted is None:
+        raise NotFoundException("Tier not found")
+    await db.commit()
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import re
+import time
+from dataclasses import dataclass
+from uuid import uuid4
+
+import anyio
+from fastapi import HTTPException, UploadFile
+
+from ..core.config import settings
+from ..core.logger import logging
+
+logger = logging.getLogger(__name__)
+
+TEMP_PREFIX = ".upload-"
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    digest: str
+    size: int
+    deduplicated: bool
+
+
+def _extension(filename: str | None) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _EXTENSION.match(extension) else ""
+
+
+async def store_upload(file: UploadFile) -> StoredUpload:
+    """Stream an upload into the content-addressed spool directory.
+
+    The file is copied in `UPLOAD_CHUNK_SIZE` chunks to a private temporary file while its SHA-256 is computed,
+    then renamed to `<sha256><extension>`, so memory use does not depend on the file size and concurrent uploads
+    never overwrite each other. Content that is already spooled is kept and the new copy dropped. Uploads larger
+    than `UPLOAD_MAX_SIZE` are rejected with 413 as soon as the limit is crossed.
+    """
+    spool = anyio.Path(settings.UPLOAD_SPOOL_DIR)
+    await spool.mkdir(parents=True, exist_ok=True)
+
+    temp_path = spool / f"{TEMP_PREFIX}{uuid4().hex}"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(temp_path, "wb") as spooled:
+            while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.UPLOAD_MAX_SIZE:
+                    raise HTTPException(
+                        status_code=413, detail=f"File is larger than the {settings.UPLOAD_MAX_SIZE} bytes allowed"
+                    )
+                digest.update(chunk)
+                await spooled.write(chunk)
+
+        final_path = spool / f"{digest.hexdigest()}{_extension(file.filename)}"
+        deduplicated = await final_path.exists()
+        if deduplicated:
+            # refresh the age of the existing copy so the janitor keeps it
+            await final_path.touch()
+        else:
+            await temp_path.rename(final_path)
+
+    finally:
+        if await temp_path.exists():
+            await temp_path.unlink()
+
+    return StoredUpload(path=str(final_path), digest=digest.hexdigest(), size=size, deduplicated=deduplicated)
+
+
+def enforce_spool_limits() -> dict[str, int]:
+    """Delete spooled uploads older than `UPLOAD_SPOOL_MAX_AGE`, then the oldest ones until the spool fits
+    `UPLOAD_SPOOL_QUOTA`.
+
+    Abandoned temporary files are removed once they are older than the maximum age as well. This is blocking
+    and meant to run in a worker thread or the arq worker.
+    """
+    if not os.path.isdir(settings.UPLOAD_SPOOL_DIR):
+        return {"expired": 0, "evicted": 0, "remaining_bytes": 0}
+
+    cutoff = time.time() - settings.UPLOAD_SPOOL_MAX_AGE
+    files: list[tuple[float, int, str]] = []
+    expired = 0
+    with os.scandir(settings.UPLOAD_SPOOL_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if stat.st_mtime < cutoff:
+                _remove(entry.path)
+                expired += 1
+            elif not entry.name.startswith(TEMP_PREFIX):
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in files)
+    evicted = 0
+    for _, size, path in sorted(files):
+        if total <= settings.UPLOAD_SPOOL_QUOTA:
+            break
+        _remove(path)
+        total -= size
+        evicted += 1
+
+    return {"expired": expired, "evicted": evicted, "remaining_bytes": total}
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove spooled upload {path}: {e}")
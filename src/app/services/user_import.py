@@ -0,0 +1,258 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import UTC, datetime
+from typing import Any
+
+import anyio
+from fastapi import HTTPException, UploadFile
+from pydantic import ValidationError
+from sqlalchemy import DateTime, Integer, String, Uuid, and_, case, column, exists, literal, or_, select, table, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.exceptions.http_exceptions import BadRequestException
+from ..core.logger import logging
+from ..core.security import get_password_hash
+from ..core.utils import process_pool
+from ..models.tier import Tier
+from ..models.user import User
+from ..schemas.user import UserImport
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+STAGING_TABLE = "user_import"
+STAGING_COLUMNS = ("line", "uuid", "name", "username", "email", "hashed_password", "tier")
+staging = table(
+    STAGING_TABLE,
+    column("line", Integer),
+    column("uuid", Uuid),
+    column("name", String),
+    column("username", String),
+    column("email", String),
+    column("hashed_password", String),
+    column("tier", String),
+)
+
+# (line, uuid, name, username, email, hashed_password, tier), in the order of STAGING_COLUMNS
+Row = tuple[int, uuid.UUID, str, str, str, str, str | None]
+# (line, record) as parsed from the file
+Record = tuple[int, dict[str, Any]]
+
+
+# -------- process pool tasks --------
+def _describe(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+def _prepare(records: list[Record]) -> tuple[list[Row], list[dict[str, Any]]]:
+    """Validate a batch of import records and hash their passwords, returning staging rows and rejections."""
+    rows: list[Row] = []
+    rejections: list[dict[str, Any]] = []
+    for line, record in records:
+        try:
+            user = UserImport.model_validate(record)
+        except ValidationError as e:
+            username = record.get("username")
+            rejections.append(
+                {"line": line, "username": username if isinstance(username, str) else None, "error": _describe(e)}
+            )
+            continue
+
+        hashed_password = user.hashed_password or get_password_hash(user.password or "")
+        rows.append((line, uuid.uuid4(), user.name, user.username, user.email, hashed_password, user.tier))
+    return rows, rejections
+
+
+# -------- parsing --------
+def _format(file: UploadFile) -> str:
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    content_type = (file.content_type or "").split(";")[0].strip()
+    format = FORMATS.get(extension) or CONTENT_TYPES.get(content_type)
+    if format is None:
+        raise BadRequestException("Users can be imported from .csv or .ndjson files")
+    return format
+
+
+async def _read(file: UploadFile) -> bytes:
+    content = bytearray()
+    while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+        content += chunk
+        if len(content) > settings.USER_IMPORT_MAX_SIZE:
+            raise HTTPException(
+                status_code=413, detail=f"File is larger than the {settings.USER_IMPORT_MAX_SIZE} bytes allowed"
+            )
+    return bytes(content)
+
+
+def _parse(content: bytes, format: str) -> tuple[list[Record], list[dict[str, Any]]]:
+    """Split an NDJSON or CSV file into `(line, record)` pairs; blank cells and lines are left out."""
+    records: list[Record] = []
+    rejections: list[dict[str, Any]] = []
+    text_content = content.decode("utf-8-sig", errors="replace")
+
+    if format == "csv":
+        reader = csv.DictReader(io.StringIO(text_content, newline=""))
+        for row in reader:
+            if None in row:
+                rejection = {"line": reader.line_num, "username": row.get("username"), "error": "Too many columns"}
+                rejections.append(rejection)
+                continue
+            records.append((reader.line_num, {key: value for key, value in row.items() if value not in ("", None)}))
+        return records, rejections
+
+    for line, raw in enumerate(text_content.splitlines(), start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            rejections.append({"line": line, "username": None, "error": "Invalid JSON"})
+            continue
+        if not isinstance(record, dict):
+            rejections.append({"line": line, "username": None, "error": "Expected a JSON object"})
+            continue
+        records.append((line, record))
+    return records, rejections
+
+
+# -------- staging and merge --------
+async def _stage(db: AsyncSession, rows: list[Row]) -> None:
+    """Load the rows into a temporary table that is dropped with the transaction, with COPY on asyncpg."""
+    await db.execute(
+        text(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} (line integer, uuid uuid, name text, username text, email text, "
+            "hashed_password text, tier text) ON COMMIT DROP"
+        )
+    )
+    connection = await db.connection()
+    if connection.dialect.driver == "asyncpg":
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(STAGING_TABLE, records=rows, columns=STAGING_COLUMNS)
+    else:
+        await db.execute(staging.insert(), [dict(zip(STAGING_COLUMNS, row)) for row in rows])
+
+
+async def _merge(db: AsyncSession) -> list[dict[str, Any]]:
+    """Insert the staged users that conflict with no existing user, resolving their tiers by name in the same
+    statement, and return the staged rows that were left out with the reason.
+
+    Usernames and emails are checked by the unique constraints, so a file that repeats one keeps its first line.
+    """
+    staged = (
+        select(staging, Tier.id.label("tier_id")).outerjoin(Tier, Tier.name == staging.c.tier).cte("staged")
+    )
+    unknown_tier = and_(staged.c.tier.is_not(None), staged.c.tier_id.is_(None))
+    inserted = (
+        insert(User)
+        .from_select(
+            ["name", "username", "email", "hashed_password", "uuid", "tier_id", "created_at"],
+            select(
+                staged.c.name,
+                staged.c.username,
+                staged.c.email,
+                staged.c.hashed_password,
+                staged.c.uuid,
+                staged.c.tier_id,
+                literal(datetime.now(UTC), DateTime(timezone=True)),
+            )
+            .where(~unknown_tier)
+            .order_by(staged.c.line),
+        )
+        .on_conflict_do_nothing()
+        .returning(User.uuid, User.username)
+        .cte("inserted")
+    )
+    # the statement sees the users table as it was before the insert, so earlier lines of the file are
+    # found through the inserted rows
+    username_taken = or_(
+        exists().where(User.username == staged.c.username), exists().where(inserted.c.username == staged.c.username)
+    )
+    error = case(
+        (unknown_tier, "Tier not found"),
+        (username_taken, "Username not available"),
+        else_="Email is already registered",
+    )
+    stmt = (
+        select(staged.c.line, staged.c.username, error.label("error"))
+        .where(~exists().where(inserted.c.uuid == staged.c.uuid))
+        .order_by(staged.c.line)
+    )
+    return [dict(row) for row in (await db.execute(stmt)).mappings()]
+
+
+async def read_import(file: UploadFile) -> tuple[list[Record], list[dict[str, Any]]]:
+    """Parse an NDJSON or CSV file with `UserImport` fields into `(line, record)` pairs and the lines rejected.
+
+    Only the format, the size and the number of rows are checked here, in the request; the records are validated
+    by `import_records`.
+    """
+    format = _format(file)
+    content = await _read(file)
+    records, rejections = await anyio.to_thread.run_sync(_parse, content, format)
+    received = len(records) + len(rejections)
+    if received > settings.USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=413, detail=f"File has {received} rows, at most {settings.USER_IMPORT_MAX_ROWS} are allowed"
+        )
+    return records, rejections
+
+
+async def prepare(records: list[Record]) -> tuple[list[Row], list[dict[str, Any]]]:
+    """Validate records and hash their passwords in the process pool, in batches of `USER_IMPORT_ROWS_PER_TASK`."""
+    loop = asyncio.get_running_loop()
+    size = settings.USER_IMPORT_ROWS_PER_TASK
+    batches = await asyncio.gather(
+        *(
+            loop.run_in_executor(process_pool.pool, _prepare, records[start : start + size])
+            for start in range(0, len(records), size)
+        )
+    )
+    rows = [row for batch_rows, _ in batches for row in batch_rows]
+    rejections = [rejection for _, batch_rejections in batches for rejection in batch_rejections]
+    return rows, rejections
+
+
+async def import_records(db: AsyncSession, records: list[Record], rejections: list[dict[str, Any]]) -> dict[str, Any]:
+    """Create the users of the records read by `read_import` and report the rows that were rejected.
+
+    Runs in the `import_users_job` worker function. The records are validated and hashed by `prepare`, then the
+    valid rows are copied into a staging table and merged into the users in one statement, so the import costs a
+    fixed number of round trips however many rows the file has. Rows that fail validation, name an unknown tier
+    or conflict with an existing user are skipped and reported by line; the rest are committed together.
+
+    bcrypt is slow on purpose and dominates the time of files with plaintext passwords: each costs a fraction of
+    a second of CPU, spread over the worker's `PROCESS_POOL_WORKERS` pool processes. Rows that carry a
+    `hashed_password` skip it.
+    """
+    received = len(records) + len(rejections)
+    rows, invalid = await prepare(records)
+    rejections = rejections + invalid
+
+    if rows:
+        try:
+            await _stage(db, rows)
+            rejections += await _merge(db)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    rejections.sort(key=lambda rejection: rejection["line"])
+    imported = received - len(rejections)
+    logger.info(f"Imported {imported} of {received} users, {len(rejections)} rejected")
+    return {
+        "received": received,
+        "imported": imported,
+        "rejected": len(rejections),
+        "errors": rejections[: settings.USER_IMPORT_MAX_REPORTED_ERRORS],
+    }
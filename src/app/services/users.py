@@ -0,0 +1,173 @@
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import ARRAY, String, any_, bindparam, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.db.integrity import raise_violation
+from ..core.exceptions.http_exceptions import (
+    BadRequestException,
+    DuplicateValueException,
+    ForbiddenException,
+    NotFoundException,
+)
+from ..crud.crud_users import crud_users
+from ..models.rate_limit import RateLimit
+from ..models.tier import Tier
+from ..models.user import User
+from ..schemas.user import UserCreateInternal, UserTierBulkUpdate, UserTierUpdate, UserUpdate
+
+READ_COLUMNS = (User.id, User.name, User.username, User.email, User.profile_image_url, User.tier_id)
+
+
+def _duplicates() -> dict[str, Exception]:
+    return {
+        "email": DuplicateValueException("Email is already registered"),
+        "username": DuplicateValueException("Username not available"),
+    }
+
+
+async def _not_found_or_forbidden(db: AsyncSession, username: str) -> Exception:
+    """The error for a write to `username` that matched no row, which only costs a query on this path."""
+    if await crud_users.exists(db=db, username=username):
+        return ForbiddenException()
+    return NotFoundException("User not found")
+
+
+async def create_user(db: AsyncSession, user: UserCreateInternal) -> User:
+    """Insert a user, relying on the unique email and username indexes to reject duplicates."""
+    try:
+        return await crud_users.create(db=db, object=user)
+    except IntegrityError as e:
+        await db.rollback()
+        raise_violation(e, _duplicates())
+
+
+async def update_user(db: AsyncSession, username: str, user_id: int, values: UserUpdate) -> None:
+    """Update `username` if it is the user `user_id`, in one statement.
+
+    A username or email already taken is reported by the unique indexes instead of being probed for first.
+    """
+    stmt = (
+        update(User)
+        .where(User.username == username, User.id == user_id)
+        .values(**values.model_dump(exclude_unset=True), updated_at=datetime.now(UTC))
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        updated = (await db.execute(stmt)).scalar_one_or_none()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_violation(e, _duplicates())
+
+    if updated is None:
+        raise await _not_found_or_forbidden(db, username)
+    await db.commit()
+
+
+async def soft_delete_user(db: AsyncSession, username: str, user_id: int) -> None:
+    """Mark `username` as deleted if it is the user `user_id`. The caller commits."""
+    stmt = (
+        update(User)
+        .where(User.username == username, User.id == user_id)
+        .values(is_deleted=True, deleted_at=datetime.now(UTC))
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    if (await db.execute(stmt)).scalar_one_or_none() is None:
+        raise await _not_found_or_forbidden(db, username)
+
+
+async def hard_delete_user(db: AsyncSession, username: str) -> None:
+    """Delete `username` from the database. The caller commits."""
+    stmt = delete(User).where(User.username == username).returning(User.id).execution_options(synchronize_session=False)
+    if (await db.execute(stmt)).scalar_one_or_none() is None:
+        raise NotFoundException("User not found")
+
+
+async def get_user_with_rate_limits(db: AsyncSession, username: str) -> dict[str, Any]:
+    """A user with the rate limits of their tier as `tier_rate_limits`, from one join."""
+    rate_limit_columns = [column.label(f"rate_limit_{column.key}") for column in RateLimit.__table__.c]
+    stmt = (
+        select(*READ_COLUMNS, *rate_limit_columns)
+        .outerjoin(RateLimit, RateLimit.tier_id == User.tier_id)
+        .where(User.username == username)
+        .order_by(RateLimit.id)
+    )
+    rows = (await db.execute(stmt)).mappings().all()
+    if not rows:
+        raise NotFoundException("User not found")
+
+    user = {column.key: rows[0][column.key] for column in READ_COLUMNS}
+    user["tier_rate_limits"] = [
+        {column.key: row[f"rate_limit_{column.key}"] for column in RateLimit.__table__.c}
+        for row in rows
+        if row["rate_limit_id"] is not None
+    ]
+    return user
+
+
+async def get_user_with_tier(db: AsyncSession, username: str) -> dict[str, Any]:
+    """A user with their tier's fields prefixed by `tier_`, from one join."""
+    stmt = (
+        select(*READ_COLUMNS, Tier.name.label("tier_name"), Tier.created_at.label("tier_created_at"))
+        .outerjoin(Tier, Tier.id == User.tier_id)
+        .where(User.username == username)
+    )
+    user = (await db.execute(stmt)).mappings().one_or_none()
+    if user is None:
+        raise NotFoundException("User not found")
+    if user["tier_name"] is None:
+        raise NotFoundException("Tier not found")
+
+    return dict(user)
+
+
+async def set_user_tier(db: AsyncSession, username: str, values: UserTierUpdate) -> str:
+    """Move `username` to another tier, whose existence the foreign key checks. Returns the user's name."""
+    stmt = (
+        update(User)
+        .where(User.username == username)
+        .values(tier_id=values.tier_id, updated_at=datetime.now(UTC))
+        .returning(User.name)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        name = (await db.execute(stmt)).scalar_one_or_none()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_violation(e, {"tier_id": NotFoundException("Tier not found")})
+
+    if name is None:
+        raise NotFoundException("User not found")
+    await db.commit()
+    return name
+
+
+async def set_users_tier(db: AsyncSession, values: UserTierBulkUpdate) -> dict[str, Any]:
+    """Move many users to a tier in one UPDATE, with the usernames sent as a single array parameter.
+
+    Returns how many users were moved and the usernames that matched no user.
+    """
+    usernames = list(dict.fromkeys(values.usernames))
+    if len(usernames) > settings.USER_TIER_BULK_MAX_USERS:
+        raise BadRequestException(f"At most {settings.USER_TIER_BULK_MAX_USERS} users can be updated at once")
+
+    stmt = (
+        update(User)
+        .where(User.username == any_(bindparam("usernames", usernames, type_=ARRAY(String))))
+        .values(tier_id=values.tier_id, updated_at=datetime.now(UTC))
+        .returning(User.username)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        updated = set((await db.execute(stmt)).scalars())
+    except IntegrityError as e:
+        await db.rollback()
+        raise_violation(e, {"tier_id": NotFoundException("Tier not found")})
+
+    await db.commit()
+    return {"updated": len(updated), "not_found": [username for username in usernames if username not in updated]}
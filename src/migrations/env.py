@@ -2,8 +2,11 @@ import asyncio
 from logging.config import fileConfig
 
 from alembic import context
+from alembic.script import ScriptDirectory
 from app.core.config import settings
-from app.core.db.database import Base
+from app.core.db.database import SCHEMA_REVISION, Base
+from app.core.db.token_blacklist import TokenBlacklist  # noqa: F401
+from app.models import *  # noqa: F401, F403
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
@@ -82,6 +85,11 @@ def run_migrations_online() -> None:
     asyncio.run(run_async_migrations())
 
 
+# the application stamps the databases it creates with SCHEMA_REVISION, which has to be the latest migration
+head = ScriptDirectory.from_config(config).get_current_head()
+if SCHEMA_REVISION != head:
+    raise RuntimeError(f"SCHEMA_REVISION in app/core/db/database.py is {SCHEMA_REVISION}, set it to {head}")
+
 if context.is_offline_mode():
     run_migrations_offline()
 else:
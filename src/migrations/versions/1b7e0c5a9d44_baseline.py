@@ -0,0 +1,109 @@
+"""Baseline schema
+
+Revision ID: 1b7e0c5a9d44
+Revises:
+Create Date: 2026-10-19 14:00:00.000000
+
+The tables as `create_all` made them before schema changes went through migrations. A database created that way
+is brought under Alembic with `alembic stamp 1b7e0c5a9d44` followed by `alembic upgrade head`. Databases the
+application creates since are stamped with the latest revision by `create_tables`.
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "1b7e0c5a9d44"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tier",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.create_table(
+        "token_blacklist",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("token", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_index("ix_token_blacklist_token", "token_blacklist", ["token"], unique=True)
+    op.create_table(
+        "user",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(length=30), nullable=False),
+        sa.Column("username", sa.String(length=20), nullable=False),
+        sa.Column("email", sa.String(length=50), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("profile_image_url", sa.String(), nullable=False),
+        sa.Column("uuid", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=False),
+        sa.Column("is_superuser", sa.Boolean(), nullable=False),
+        sa.Column("tier_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["tier_id"], ["tier.id"]),
+        sa.PrimaryKeyConstraint("id", "uuid"),
+        sa.UniqueConstraint("id"),
+        sa.UniqueConstraint("uuid"),
+    )
+    op.create_index("ix_user_email", "user", ["email"], unique=True)
+    op.create_index("ix_user_is_deleted", "user", ["is_deleted"])
+    op.create_index("ix_user_tier_id", "user", ["tier_id"])
+    op.create_index("ix_user_username", "user", ["username"], unique=True)
+    op.create_table(
+        "rate_limit",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("tier_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("limit", sa.Integer(), nullable=False),
+        sa.Column("period", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["tier_id"], ["tier.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.create_index("ix_rate_limit_tier_id", "rate_limit", ["tier_id"])
+    op.create_table(
+        "conversation",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_by_user_id", sa.Integer(), nullable=False),
+        sa.Column("uuid", sa.Uuid(), nullable=False),
+        sa.Column("queries", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["created_by_user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+        sa.UniqueConstraint("uuid"),
+    )
+    op.create_index("ix_conversation_created_by_user_id", "conversation", ["created_by_user_id"])
+    op.create_index("ix_conversation_is_deleted", "conversation", ["is_deleted"])
+
+
+def downgrade() -> None:
+    op.drop_table("conversation")
+    op.drop_table("rate_limit")
+    op.drop_table("user")
+    op.drop_table("token_blacklist")
+    op.drop_table("tier")
@@ -0,0 +1,73 @@
+"""Move conversation turns into the conversation_turn table
+
+Revision ID: 3f1c2a9b7d10
+Revises: 9e6b1d4f2a73
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a9b7d10"
+down_revision: Union[str, None] = "9e6b1d4f2a73"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Only adds a column with a constant default and a new table, both without rewriting or locking `conversation`
+    # for long. Existing turns stay in `queries` and are read from there until the `backfill_conversation_turns`
+    # worker job (or `python -m src.scripts.backfill_conversation_turns`) moves them, while the application runs.
+    op.add_column("conversation", sa.Column("turn_count", sa.Integer(), server_default="0", nullable=False))
+    op.create_table(
+        "conversation_turn",
+        sa.Column("conversation_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("query", sa.Text(), nullable=False),
+        sa.Column("response", sa.Text(), nullable=True),
+        sa.Column("uuid", sa.Uuid(), nullable=False),
+        sa.Column("is_affected", sa.Boolean(), server_default="false", nullable=False),
+        sa.Column("is_partial", sa.Boolean(), server_default="false", nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["conversation_id"], ["conversation.id"]),
+        sa.PrimaryKeyConstraint("conversation_id", "seq"),
+        sa.UniqueConstraint("uuid"),
+    )
+
+
+def downgrade() -> None:
+    # Turns appended after the upgrade only exist in conversation_turn, copy them back before dropping it
+    op.execute(
+        """
+        UPDATE conversation c
+        SET queries = c.queries || t.turns
+        FROM (
+            SELECT ct.conversation_id,
+                   jsonb_agg(
+                       jsonb_build_object(
+                           'id', ct.seq,
+                           'uuid', ct.uuid::text,
+                           'query', ct.query,
+                           'response', ct.response,
+                           'created_at', ct.created_at,
+                           'updated_at', ct.updated_at,
+                           'is_affected', ct.is_affected,
+                           'is_partial', ct.is_partial
+                       )
+                       ORDER BY ct.seq
+                   ) AS turns
+            FROM conversation_turn ct
+            JOIN conversation cc ON cc.id = ct.conversation_id
+            WHERE ct.seq >= jsonb_array_length(cc.queries)
+            GROUP BY ct.conversation_id
+        ) t
+        WHERE c.id = t.conversation_id
+        """
+    )
+    op.drop_table("conversation_turn")
+    op.drop_column("conversation", "turn_count")
@@ -0,0 +1,29 @@
+"""Add the rolling summary columns to conversation
+
+Revision ID: 4d2a8f6c3e15
+Revises: 1b7e0c5a9d44
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4d2a8f6c3e15"
+down_revision: Union[str, None] = "1b7e0c5a9d44"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A nullable column and one with a constant default, neither rewrites the table
+    op.add_column("conversation", sa.Column("summary", sa.Text(), nullable=True))
+    op.add_column("conversation", sa.Column("summarized_turns", sa.Integer(), server_default="0", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("conversation", "summarized_turns")
+    op.drop_column("conversation", "summary")
@@ -0,0 +1,45 @@
+"""Make user.id the primary key on its own and index rate limits by tier and path
+
+Revision ID: 7c3f5b1e8d90
+Revises: e2b94d7a6c18
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c3f5b1e8d90"
+down_revision: Union[str, None] = "e2b94d7a6c18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # `uuid` stays unique through user_uuid_key. Replacing the primary key rebuilds one index on user.id, which
+    # holds a short lock on the table.
+    op.drop_constraint("user_pkey", "user", type_="primary")
+    op.create_primary_key("user_pkey", "user", ["id"])
+    op.drop_constraint("user_archive_pkey", "user_archive", type_="primary")
+    op.create_primary_key("user_archive_pkey", "user_archive", ["id"])
+
+    # Fails if a tier already has two rate limits for the same path, which the rate limiter could not tell apart.
+    # The unique index also serves lookups by tier alone.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_rate_limit_tier_id_path", "rate_limit", ["tier_id", "path"], unique=True, postgresql_concurrently=True
+        )
+        op.drop_index("ix_rate_limit_tier_id", table_name="rate_limit", postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_rate_limit_tier_id", "rate_limit", ["tier_id"], postgresql_concurrently=True)
+        op.drop_index("uq_rate_limit_tier_id_path", table_name="rate_limit", postgresql_concurrently=True)
+
+    op.drop_constraint("user_archive_pkey", "user_archive", type_="primary")
+    op.create_primary_key("user_archive_pkey", "user_archive", ["id", "uuid"])
+    op.drop_constraint("user_pkey", "user", type_="primary")
+    op.create_primary_key("user_pkey", "user", ["id", "uuid"])
@@ -0,0 +1,40 @@
+"""Add the conversation list columns and index
+
+Revision ID: 8a4d6e2c1b57
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8a4d6e2c1b57"
+down_revision: Union[str, None] = "3f1c2a9b7d10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing conversations get their list columns from the `backfill_conversation_turns` worker job
+    op.add_column("conversation", sa.Column("title", sa.String(), nullable=True))
+    op.add_column("conversation", sa.Column("last_message_preview", sa.String(), nullable=True))
+    op.add_column("conversation", sa.Column("last_activity_at", sa.DateTime(timezone=True), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_conversation_user_listing",
+            "conversation",
+            ["created_by_user_id", "is_deleted", "created_at"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_conversation_user_listing", table_name="conversation", postgresql_concurrently=True)
+    op.drop_column("conversation", "last_activity_at")
+    op.drop_column("conversation", "last_message_preview")
+    op.drop_column("conversation", "title")
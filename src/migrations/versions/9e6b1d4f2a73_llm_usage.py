@@ -0,0 +1,44 @@
+"""Add the llm_usage table
+
+Revision ID: 9e6b1d4f2a73
+Revises: 4d2a8f6c3e15
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e6b1d4f2a73"
+down_revision: Union[str, None] = "4d2a8f6c3e15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The create_all at startup added the table to databases that ran the application before it went through
+    # migrations, in the same shape as here
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_usage (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER,
+            tier VARCHAR,
+            model VARCHAR NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            upstream_latency FLOAT NOT NULL,
+            queue_time FLOAT NOT NULL,
+            cache_hit BOOLEAN NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL
+        )
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_llm_usage_created_at ON llm_usage (created_at)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_llm_usage_user_id ON llm_usage (user_id)")
+
+
+def downgrade() -> None:
+    op.drop_table("llm_usage")
@@ -0,0 +1,49 @@
+"""Add full-text search over conversation turns
+
+Revision ID: c5e7a91f0d32
+Revises: 8a4d6e2c1b57
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c5e7a91f0d32"
+down_revision: Union[str, None] = "8a4d6e2c1b57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A stored generated column computes the vector of every existing row and locks the table meanwhile; run this
+    # before backfilling conversation turns, while conversation_turn is still small.
+    op.add_column(
+        "conversation_turn",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', query || ' ' || coalesce(response, ''))", persisted=True),
+            nullable=False,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_conversation_turn_search_vector",
+            "conversation_turn",
+            ["search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_conversation_turn_search_vector", table_name="conversation_turn", postgresql_concurrently=True
+        )
+    op.drop_column("conversation_turn", "search_vector")
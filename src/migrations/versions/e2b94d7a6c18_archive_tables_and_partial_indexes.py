@@ -0,0 +1,126 @@
+"""Add archive tables and replace the is_deleted indexes with partial indexes
+
+Revision ID: e2b94d7a6c18
+Revises: c5e7a91f0d32
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b94d7a6c18"
+down_revision: Union[str, None] = "c5e7a91f0d32"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _archived_at() -> sa.Column:
+    return sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "conversation_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("created_by_user_id", sa.Integer(), nullable=False),
+        sa.Column("uuid", sa.Uuid(), nullable=False),
+        sa.Column("queries", postgresql.JSONB(), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("summarized_turns", sa.Integer(), nullable=False),
+        sa.Column("turn_count", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("last_message_preview", sa.String(), nullable=True),
+        sa.Column("last_activity_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=False),
+        _archived_at(),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "conversation_turn_archive",
+        sa.Column("conversation_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("seq", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("query", sa.Text(), nullable=False),
+        sa.Column("response", sa.Text(), nullable=True),
+        sa.Column("uuid", sa.Uuid(), nullable=False),
+        sa.Column("is_affected", sa.Boolean(), nullable=False),
+        sa.Column("is_partial", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        _archived_at(),
+        sa.PrimaryKeyConstraint("conversation_id", "seq"),
+    )
+    op.create_table(
+        "user_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("name", sa.String(length=30), nullable=False),
+        sa.Column("username", sa.String(length=20), nullable=False),
+        sa.Column("email", sa.String(length=50), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("profile_image_url", sa.String(), nullable=False),
+        sa.Column("uuid", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=False),
+        sa.Column("is_superuser", sa.Boolean(), nullable=False),
+        sa.Column("tier_id", sa.Integer(), nullable=True),
+        _archived_at(),
+        sa.PrimaryKeyConstraint("id", "uuid"),
+    )
+
+    # Every lookup filters on NOT is_deleted, which a B-tree on the boolean barely narrows down. Partial indexes
+    # only hold live rows, or only deleted ones for the archival job, and are built without blocking writes.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_conversation_live_user_created_at",
+            "conversation",
+            ["created_by_user_id", "created_at"],
+            postgresql_where=sa.text("NOT is_deleted"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_conversation_deleted_at",
+            "conversation",
+            ["deleted_at"],
+            postgresql_where=sa.text("is_deleted"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_user_live_id", "user", ["id"], postgresql_where=sa.text("NOT is_deleted"), postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_user_deleted_at",
+            "user",
+            ["deleted_at"],
+            postgresql_where=sa.text("is_deleted"),
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_conversation_user_listing", table_name="conversation", postgresql_concurrently=True)
+        op.drop_index("ix_conversation_is_deleted", table_name="conversation", postgresql_concurrently=True)
+        op.drop_index("ix_user_is_deleted", table_name="user", postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_user_is_deleted", "user", ["is_deleted"], postgresql_concurrently=True)
+        op.create_index("ix_conversation_is_deleted", "conversation", ["is_deleted"], postgresql_concurrently=True)
+        op.create_index(
+            "ix_conversation_user_listing",
+            "conversation",
+            ["created_by_user_id", "is_deleted", "created_at"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_user_deleted_at", table_name="user", postgresql_concurrently=True)
+        op.drop_index("ix_user_live_id", table_name="user", postgresql_concurrently=True)
+        op.drop_index("ix_conversation_deleted_at", table_name="conversation", postgresql_concurrently=True)
+        op.drop_index("ix_conversation_live_user_created_at", table_name="conversation", postgresql_concurrently=True)
+    op.drop_table("user_archive")
+    op.drop_table("conversation_turn_archive")
+    op.drop_table("conversation_archive")
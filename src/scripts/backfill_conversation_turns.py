@@ -0,0 +1,31 @@
+"""Move the turns still stored in the `queries` JSONB array of conversations into the `conversation_turn` table.
+
+Safe to run while the application serves traffic and to interrupt; the `backfill_conversation_turns` worker
+function does the same.
+
+    python -m src.scripts.backfill_conversation_turns [--batch-size 100]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from ..app.core.db.database import local_session
+from ..app.services import conversation_turns
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(batch_size: int) -> None:
+    async with local_session() as db:
+        moved = await conversation_turns.backfill_legacy_turns(db, batch_size=batch_size)
+    logger.info(f"Moved {moved} conversation turns out of the queries array.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,88 @@
+"""Measure prompt size and latency of a chat turn with and without rolling conversation summaries.
+
+Builds a synthetic API-design conversation and, at the requested turn numbers, compares the prompt the chat path
+would send when resending the whole history with the one it sends with summary plus recent turns. Token counts
+are estimates. With `--live` every prompt is also sent upstream to measure latency, which costs tokens.
+
+    python -m src.scripts.benchmark_conversation_prompt --turns 5 20 50 [--live]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any
+
+from ..app.core.config import settings
+from ..app.services import conversation_summary
+from ..app.services.openai_service import OpenAIService
+
+WORDS = (
+    "endpoint resource user post comment token schema field request response status pagination filter version "
+    "authentication role admin upload file error limit cursor index model relation create update delete list"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _conversation(turns: int, seed: int) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [{"id": i, "query": _text(rng, 60), "response": _text(rng, 450)} for i in range(turns)]
+
+
+def _compacted(queries: list[dict[str, Any]], seed: int) -> dict[str, Any]:
+    """Replay the chat path's compaction decisions, standing in a summary of the configured maximum length."""
+    rng = random.Random(seed)
+    conversation: dict[str, Any] = {"queries": [], "summary": None, "summarized_turns": 0}
+    for query in queries:
+        conversation["queries"].append(query)
+        if conversation_summary.needs_summary(conversation):
+            _, covered_turns = conversation_summary.summary_request(conversation)
+            summary_words = settings.CONVERSATION_SUMMARY_MAX_TOKENS * conversation_summary.CHARS_PER_TOKEN // 8
+            conversation["summary"] = _text(rng, summary_words)
+            conversation["summarized_turns"] = covered_turns
+
+    return conversation
+
+
+async def _latency(service: OpenAIService, messages: list[dict[str, Any]]) -> float:
+    start = time.perf_counter()
+    await service.create_completion(messages, max_tokens=1, use_cache=False)
+    return time.perf_counter() - start
+
+
+async def main(turns: list[int], live: bool, seed: int) -> None:
+    service = OpenAIService() if live else None
+    results = []
+    for turn in turns:
+        queries = _conversation(turn, seed)
+        new_message = [{"role": "user", "content": "Add rate limiting to the API."}]
+
+        full = conversation_summary.turn_messages(queries[:-1]) + new_message
+        compacted = conversation_summary.history_messages(_compacted(queries[:-1], seed)) + new_message
+
+        result: dict[str, Any] = {
+            "turn": turn,
+            "full_history_prompt_tokens": conversation_summary.estimate_tokens(full),
+            "summarized_prompt_tokens": conversation_summary.estimate_tokens(compacted),
+        }
+        if service is not None:
+            result["full_history_latency_s"] = round(await _latency(service, full), 3)
+            result["summarized_latency_s"] = round(await _latency(service, compacted), 3)
+
+        results.append(result)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--live", action="store_true", help="send every prompt upstream to measure latency")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.turns, args.live, args.seed))
@@ -0,0 +1,153 @@
+"""Measure conversation search latency on a generated corpus.
+
+Generates `--turns` turns (1M by default) in conversations of `--turns-per-conversation` turns owned by one user,
+directly in the configured database, and times `conversation_search.search_turns` for a set of one and two word
+queries of varying selectivity. The plan of the first query is printed to show that the GIN index is used.
+The generated conversations are marked by their title and removed with `--cleanup`.
+
+    python -m src.scripts.benchmark_conversation_search [--turns 1000000] [--user-id 1] [--skip-generate]
+    python -m src.scripts.benchmark_conversation_search --cleanup
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Any
+
+from sqlalchemy import ARRAY, Integer, String, bindparam, delete, func, select, text
+
+from ..app.core.db.database import AsyncSession, local_session
+from ..app.models.conversation import Conversation, ConversationTurn
+from ..app.models.user import User
+from ..app.services import conversation_search
+
+MARKER = "benchmark:conversation_search"
+COMMON_WORDS = (
+    "endpoint resource user post comment token schema field request response status pagination filter version "
+    "authentication role admin upload file error limit cursor index model relation create update delete list"
+).split()
+RARE_WORDS = [f"term{i}" for i in range(5000)]
+CONVERSATIONS_PER_BATCH = 200
+
+GENERATE_CONVERSATIONS = text(
+    """
+    INSERT INTO conversation (created_by_user_id, uuid, queries, title, turn_count, summarized_turns, created_at,
+                              is_deleted)
+    SELECT :user_id, gen_random_uuid(), '[]'::jsonb, :title, :turns, 0, now(), false
+    FROM generate_series(1, :count)
+    RETURNING id
+    """
+)
+GENERATE_TURNS = text(
+    """
+    INSERT INTO conversation_turn (conversation_id, seq, query, response, uuid, created_at)
+    SELECT c.id, s.seq,
+           array_to_string(ARRAY(
+               SELECT (:words)[1 + floor(random() * cardinality(:words))::int]
+               FROM generate_series(1, 12 + s.seq * 0)
+           ), ' '),
+           array_to_string(ARRAY(
+               SELECT (:words)[1 + floor(random() * cardinality(:words))::int]
+               FROM generate_series(1, 80 + s.seq * 0)
+           ), ' '),
+           gen_random_uuid(),
+           now()
+    FROM conversation c CROSS JOIN generate_series(0, :turns - 1) AS s(seq)
+    WHERE c.id = ANY(:ids)
+    """
+).bindparams(bindparam("words", type_=ARRAY(String)), bindparam("ids", type_=ARRAY(Integer)))
+
+
+async def _generate(db: AsyncSession, user_id: int, turns: int, turns_per_conversation: int) -> None:
+    words = COMMON_WORDS + RARE_WORDS
+    remaining = turns // turns_per_conversation
+    start = time.perf_counter()
+    while remaining > 0:
+        batch = min(remaining, CONVERSATIONS_PER_BATCH)
+        ids = list(
+            (
+                await db.execute(
+                    GENERATE_CONVERSATIONS,
+                    {"user_id": user_id, "title": MARKER, "turns": turns_per_conversation, "count": batch},
+                )
+            ).scalars()
+        )
+        await db.execute(GENERATE_TURNS, {"words": words, "turns": turns_per_conversation, "ids": ids})
+        await db.commit()
+        remaining -= batch
+    await db.execute(text("ANALYZE conversation_turn"))
+    await db.commit()
+    print(f"Generated {turns} turns in {time.perf_counter() - start:.1f}s")
+
+
+async def _cleanup(db: AsyncSession) -> None:
+    ids = select(Conversation.id).where(Conversation.title == MARKER).scalar_subquery()
+    await db.execute(delete(ConversationTurn).where(ConversationTurn.conversation_id.in_(ids)))
+    await db.execute(delete(Conversation).where(Conversation.title == MARKER))
+    await db.commit()
+
+
+async def _time(db: AsyncSession, user_id: int, q: str, runs: int) -> dict[str, Any]:
+    latencies = []
+    hits = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        page = await conversation_search.search_turns(db=db, user_id=user_id, q=q, limit=20)
+        latencies.append(time.perf_counter() - start)
+        hits = len(page["data"])
+    latencies.sort()
+    return {
+        "q": q,
+        "hits_on_first_page": hits,
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[round(0.95 * (len(latencies) - 1))] * 1000, 2),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with local_session() as db:
+        if args.cleanup:
+            await _cleanup(db)
+            return
+
+        user_id = args.user_id or (await db.execute(select(func.min(User.id)))).scalar_one()
+        if user_id is None:
+            raise SystemExit("No user to own the benchmark conversations, create one first")
+        if not args.skip_generate:
+            await _generate(db, user_id, args.turns, args.turns_per_conversation)
+
+        rng = random.Random(args.seed)
+        queries = (
+            [rng.choice(COMMON_WORDS) for _ in range(2)]
+            + [rng.choice(RARE_WORDS) for _ in range(3)]
+            + [f"{rng.choice(RARE_WORDS)} {rng.choice(RARE_WORDS)}" for _ in range(3)]
+            + [f'"{rng.choice(COMMON_WORDS)} {rng.choice(COMMON_WORDS)}"']
+        )
+
+        plan = await db.execute(
+            text(
+                "EXPLAIN ANALYZE SELECT 1 FROM conversation_turn "
+                "WHERE search_vector @@ websearch_to_tsquery('english', :q)"
+            ),
+            {"q": queries[2]},
+        )
+        print("\n".join(row[0] for row in plan))
+
+        results = [await _time(db, user_id, q, args.runs) for q in queries]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=1_000_000)
+    parser.add_argument("--turns-per-conversation", type=int, default=100)
+    parser.add_argument("--user-id", type=int, default=None, help="owner of the conversations, the first user if unset")
+    parser.add_argument("--runs", type=int, default=20, help="searches per query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-generate", action="store_true", help="reuse the corpus of a previous run")
+    parser.add_argument("--cleanup", action="store_true", help="delete the generated corpus and exit")
+
+    asyncio.run(main(parser.parse_args()))
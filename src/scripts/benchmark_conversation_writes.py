@@ -0,0 +1,105 @@
+"""Compare appending a chat turn to the `queries` JSONB array with appending a row to `conversation_turn`.
+
+For every size, one conversation is grown to that many turns each way against the configured database. The JSONB
+path reads the whole array and writes it back as the chat path used to; the row path is
+`conversation_turns.append_turn`. Reports the mean latency of the last appends, where the conversation has
+(almost) the given size, and of all appends. The conversations are deleted afterwards.
+
+    python -m src.scripts.benchmark_conversation_writes --sizes 10 100 1000 [--user-id 1]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import delete, func, select
+
+from ..app.core.db.database import AsyncSession, local_session
+from ..app.crud.crud_conversations import crud_conversations
+from ..app.models.conversation import Conversation, ConversationTurn
+from ..app.models.user import User
+from ..app.schemas.conversation import ConversationCreateInternal, ConversationRead
+from ..app.services import conversation_turns
+
+QUERY = "Add cursor pagination to the list endpoints and document the new parameters. " * 2
+RESPONSE = "Here is the updated API design with cursor pagination for every list endpoint. " * 40
+TAIL = 10
+
+
+async def _append_jsonb(db: AsyncSession, conversation_id: int) -> None:
+    conversation = await crud_conversations.get(db=db, schema_to_select=ConversationRead, id=conversation_id)
+    query = {
+        "id": len(conversation["queries"]),
+        "uuid": str(uuid4()),
+        "query": QUERY,
+        "response": RESPONSE,
+        "created_at": datetime.now(UTC).isoformat(),
+        "updated_at": None,
+        "is_affected": None,
+        "is_partial": False,
+    }
+    await crud_conversations.update(db=db, id=conversation_id, object={"queries": conversation["queries"] + [query]})
+
+
+async def _append_row(db: AsyncSession, conversation_id: int) -> None:
+    await conversation_turns.append_turn(db=db, conversation_id=conversation_id, query=QUERY, response=RESPONSE)
+
+
+async def _grow(
+    db: AsyncSession, user_id: int, size: int, append: Callable[[AsyncSession, int], Awaitable[None]]
+) -> tuple[int, list[float]]:
+    created = await crud_conversations.create(
+        db=db, object=ConversationCreateInternal(created_by_user_id=user_id, queries=[])
+    )
+    latencies = []
+    for _ in range(size):
+        start = time.perf_counter()
+        await append(db, created.id)
+        latencies.append(time.perf_counter() - start)
+    return created.id, latencies
+
+
+def _summary(latencies: list[float]) -> dict[str, float]:
+    return {
+        "last_appends_ms": round(statistics.mean(latencies[-TAIL:]) * 1000, 2),
+        "all_appends_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+
+async def main(sizes: list[int], user_id: int | None) -> None:
+    results: list[dict[str, Any]] = []
+    async with local_session() as db:
+        if user_id is None:
+            user_id = (await db.execute(select(func.min(User.id)))).scalar_one()
+        if user_id is None:
+            raise SystemExit("No user to own the benchmark conversations, create one first")
+
+        created_ids = []
+        try:
+            for size in sizes:
+                jsonb_id, jsonb_latencies = await _grow(db, user_id, size, _append_jsonb)
+                row_id, row_latencies = await _grow(db, user_id, size, _append_row)
+                created_ids += [jsonb_id, row_id]
+                results.append({"turns": size, "jsonb": _summary(jsonb_latencies), "row": _summary(row_latencies)})
+        finally:
+            await db.rollback()
+            await db.execute(delete(ConversationTurn).where(ConversationTurn.conversation_id.in_(created_ids)))
+            await db.execute(delete(Conversation).where(Conversation.id.in_(created_ids)))
+            await db.commit()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--user-id", type=int, default=None, help="owner of the conversations, the first user if unset")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes, args.user_id))
@@ -0,0 +1,128 @@
+"""Measure document text extraction throughput.
+
+Extracts a large PDF, either the one given with `--pdf` or a generated one, three ways: with PyPDF2 on the
+calling thread as the endpoints used to, through the process-pool pipeline, and again through the pipeline
+with the extracted-text cache warm when Redis is reachable.
+
+    python -m src.scripts.benchmark_extraction --pages 400 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import PyPDF2
+import redis.asyncio as redis
+
+from ..app.core.config import settings
+from ..app.core.utils import cache, process_pool
+from ..app.services import document_extraction
+
+
+def build_pdf(path: str, pages: int, lines_per_page: int = 45) -> None:
+    """Write a PDF of `pages` text pages using only the standard library."""
+    objects: list[bytes] = []
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for page in range(pages):
+        lines = [
+            f"({page}.{line} The endpoint returns a paginated list of resources for the current user) Tj T*"
+            for line in range(lines_per_page)
+        ]
+        stream = ("BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(lines) + " ET").encode()
+        content_id = page_ids[page] + 1
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {content_id} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+
+    with open(path, "wb") as file:
+        file.write(output)
+
+
+def _inline(path: str) -> str:
+    with open(path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        return "\n".join([page.extract_text() for page in reader.pages])
+
+
+def _throughput(label: str, seconds: float, pages: int, size: int) -> dict:
+    return {
+        "method": label,
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(pages / seconds, 1),
+        "mb_per_second": round(size / seconds / 1024 / 1024, 2),
+    }
+
+
+async def main(pdf: str | None, pages: int, workers: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        if pdf is None:
+            pdf = os.path.join(directory, "benchmark.pdf")
+            build_pdf(pdf, pages)
+
+        size = os.path.getsize(pdf)
+        page_count = len(PyPDF2.PdfReader(pdf).pages)
+        settings.EXTRACTION_MAX_PAGES = max(settings.EXTRACTION_MAX_PAGES, page_count)
+        settings.EXTRACTION_MAX_FILE_SIZE = max(settings.EXTRACTION_MAX_FILE_SIZE, size)
+        settings.PROCESS_POOL_WORKERS = workers
+        results = []
+
+        start = time.perf_counter()
+        _inline(pdf)
+        results.append(_throughput("inline", time.perf_counter() - start, page_count, size))
+
+        process_pool.pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            await document_extraction.extract_text_from_path(pdf, pdf, digest="warmup")
+
+            start = time.perf_counter()
+            async for _ in document_extraction.iter_pages(pdf, pdf):
+                pass
+            results.append(_throughput("process_pool", time.perf_counter() - start, page_count, size))
+
+            cache.client = redis.Redis.from_url(settings.REDIS_CACHE_URL)
+            try:
+                await cache.client.ping()
+                await document_extraction.extract_text_from_path(pdf, pdf)
+                start = time.perf_counter()
+                await document_extraction.extract_text_from_path(pdf, pdf)
+                results.append(_throughput("process_pool_cached", time.perf_counter() - start, page_count, size))
+            except (ConnectionError, OSError, redis.ConnectionError):
+                pass
+            finally:
+                await cache.client.aclose()
+        finally:
+            process_pool.pool.shutdown()
+
+    print(json.dumps({"pages": page_count, "bytes": size, "workers": workers, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to extract; a synthetic one is generated when omitted")
+    parser.add_argument("--pages", type=int, default=400, help="pages of the generated PDF")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.pdf, args.pages, args.workers))
@@ -0,0 +1,153 @@
+"""Compare the write endpoints with a commit per CRUD call and with a unit of work per request.
+
+Runs a sequence of write requests `--iterations` times against the configured database, once with
+`DATABASE_UNIT_OF_WORK` off and once with it on: create a conversation, add a turn, edit it, delete the
+conversation, rename the user and log out. Reports, per endpoint and setting, the median and 95th percentile
+request latency, the commits per request and the time spent committing per request. Creates a user with a random
+name and removes it with its conversations and blacklisted tokens afterwards.
+
+    python -m src.scripts.benchmark_unit_of_work --iterations 200
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import defaultdict
+from typing import Any
+from uuid import uuid4
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..app.api.v1.chat import router as chat_router
+from ..app.api.v1.conversations import router as conversations_router
+from ..app.api.v1.logout import router as logout_router
+from ..app.api.v1.users import router as users_router
+from ..app.core.config import settings
+from ..app.core.db.database import async_engine, local_session
+from ..app.core.db.token_blacklist import TokenBlacklist
+from ..app.core.security import create_access_token
+from ..app.models.conversation import Conversation, ConversationTurn
+from ..app.models.user import User
+
+QUERY = "Summarise the release notes of the last three versions."
+RESPONSE = "The last three versions added cursor pagination, read replicas and bulk user imports. " * 10
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    for router in (conversations_router, chat_router, users_router, logout_router):
+        app.include_router(router, prefix="/api/v1")
+    return app
+
+
+class _CommitTimer:
+    """Counts the commits that reach the database and the time they take."""
+
+    def __init__(self) -> None:
+        self.commits = 0
+        self.seconds = 0.0
+        self._commit = AsyncSession.commit
+
+    def install(self) -> None:
+        original = self._commit
+
+        # a plain function, so that it binds to the session it is looked up on like the method it replaces; deferred
+        # commits end up here only once the unit of work commits
+        async def commit(db: AsyncSession) -> None:
+            start = time.perf_counter()
+            await original(db)
+            self.seconds += time.perf_counter() - start
+
+        AsyncSession.commit = commit  # type: ignore[method-assign]
+        event.listen(async_engine.sync_engine, "commit", self.count)
+
+    def uninstall(self) -> None:
+        event.remove(async_engine.sync_engine, "commit", self.count)
+        AsyncSession.commit = self._commit  # type: ignore[method-assign]
+
+    def count(self, conn: Any) -> None:
+        self.commits += 1
+
+
+def _summary(samples: list[tuple[float, int, float]]) -> dict[str, Any]:
+    latencies = sorted(sample[0] for sample in samples)
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "commits_per_request": round(statistics.mean(sample[1] for sample in samples), 2),
+        "commit_ms_per_request": round(statistics.mean(sample[2] for sample in samples) * 1000, 2),
+    }
+
+
+async def _run(
+    client: httpx.AsyncClient, username: str, iterations: int, timer: _CommitTimer, tokens: list[str]
+) -> dict[str, Any]:
+    samples: dict[str, list[tuple[float, int, float]]] = defaultdict(list)
+
+    async def request(label: str, method: str, url: str, token: str, body: Any = None) -> httpx.Response:
+        commits, seconds = timer.commits, timer.seconds
+        start = time.perf_counter()
+        response = await client.request(method, url, json=body, headers={"Authorization": f"Bearer {token}"})
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        samples[label].append((elapsed, timer.commits - commits, timer.seconds - seconds))
+        return response
+
+    for i in range(iterations):
+        # every iteration logs out, so it needs a token of its own
+        token = await create_access_token({"sub": username, "jti": uuid4().hex})
+        tokens.append(token)
+        conversation_id = (await request("create conversation", "POST", "/conversations", token)).json()["id"]
+        turn = {"query": QUERY, "response": RESPONSE}
+        await request("add turn", "POST", f"/conversations/{conversation_id}/queries", token, turn)
+        await request("edit turn", "PATCH", f"/chat/{conversation_id}/query/0", token, turn)
+        await request("delete conversation", "DELETE", f"/conversations/{conversation_id}", token)
+        await request("rename user", "PATCH", f"/user/{username}", token, {"name": f"Benchmark {i}"})
+        await request("logout", "POST", "/logout", token)
+
+    return {label: _summary(label_samples) for label, label_samples in samples.items()}
+
+
+async def main(iterations: int) -> None:
+    username = f"uow{uuid4().hex[:8]}"
+    async with local_session() as db:
+        db.add(User(name="Benchmark", username=username, email=f"{username}@example.com", hashed_password="-"))
+        await db.commit()
+        user_id = (await db.execute(select(User.id).where(User.username == username))).scalar_one()
+
+    timer = _CommitTimer()
+    timer.install()
+    results: dict[str, Any] = {}
+    tokens: list[str] = []
+    try:
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test/api/v1") as client:
+            for unit_of_work in (False, True):
+                settings.DATABASE_UNIT_OF_WORK = unit_of_work
+                results["unit_of_work" if unit_of_work else "commit_per_call"] = await _run(
+                    client, username, iterations, timer, tokens
+                )
+    finally:
+        timer.uninstall()
+        async with local_session() as db:
+            conversations = select(Conversation.id).where(Conversation.created_by_user_id == user_id)
+            await db.execute(delete(ConversationTurn).where(ConversationTurn.conversation_id.in_(conversations)))
+            await db.execute(delete(Conversation).where(Conversation.created_by_user_id == user_id))
+            await db.execute(delete(TokenBlacklist).where(TokenBlacklist.token.in_(tokens)))
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+
+    print(json.dumps({"iterations": iterations, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,92 @@
+"""Measure bulk user import throughput.
+
+Generates an NDJSON file of `--users` users and imports it through `services.user_import` as the
+`import_users_job` worker function would, with a process pool of `--workers` processes, reporting users per
+minute. With `--hashed` the rows carry a bcrypt hash made once up front, as a migration from another system would,
+so the run measures parsing, COPY and the merge without bcrypt. Without `--database` only parsing, validation and
+hashing run. The imported users are deleted afterwards.
+
+    python -m src.scripts.benchmark_user_import --users 2000 --workers 4 --database
+    python -m src.scripts.benchmark_user_import --users 100000 --hashed --database
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from uuid import uuid4
+
+from sqlalchemy import delete
+from starlette.datastructures import Headers, UploadFile
+
+from ..app.core.config import settings
+from ..app.core.db.database import local_session
+from ..app.core.security import get_password_hash
+from ..app.core.utils import process_pool
+from ..app.models.user import User
+from ..app.services import user_import
+
+
+def build_file(users: int, prefix: str, hashed: bool) -> bytes:
+    password = {"hashed_password": get_password_hash("Str1ngst!")} if hashed else {"password": "Str1ngst!"}
+    lines = (
+        json.dumps({"name": f"Import {i}", "username": f"{prefix}{i}", "email": f"{prefix}{i}@example.com", **password})
+        for i in range(users)
+    )
+    return "\n".join(lines).encode()
+
+
+async def main(users: int, workers: int, hashed: bool, database: bool) -> None:
+    prefix = f"bi{uuid4().hex[:6]}"
+    content = build_file(users, prefix, hashed)
+    settings.USER_IMPORT_MAX_ROWS = max(settings.USER_IMPORT_MAX_ROWS, users)
+    settings.USER_IMPORT_MAX_SIZE = max(settings.USER_IMPORT_MAX_SIZE, len(content))
+
+    process_pool.pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        start = time.perf_counter()
+        file = UploadFile(io.BytesIO(content), filename="users.ndjson", headers=Headers())
+        records, rejections = await user_import.read_import(file)
+        if database:
+            async with local_session() as db:
+                result = await user_import.import_records(db=db, records=records, rejections=rejections)
+            imported = result["imported"]
+        else:
+            rows, _ = await user_import.prepare(records)
+            imported = len(rows)
+        seconds = time.perf_counter() - start
+    finally:
+        process_pool.pool.shutdown()
+        if database:
+            async with local_session() as db:
+                await db.execute(delete(User).where(User.username.startswith(prefix)))
+                await db.commit()
+
+    print(
+        json.dumps(
+            {
+                "users": users,
+                "imported": imported,
+                "workers": workers,
+                "hashed": hashed,
+                "database": database,
+                "seconds": round(seconds, 3),
+                "users_per_minute": round(imported / seconds * 60),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--hashed", action="store_true", help="send bcrypt hashes instead of passwords")
+    parser.add_argument("--database", action="store_true", help="stage and merge into the configured database")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.users, args.workers, args.hashed, args.database))
@@ -0,0 +1,134 @@
+"""Pin the number of SQL statements every user, tier and rate limit endpoint executes.
+
+Calls each endpoint of `api/v1/users.py`, `api/v1/tiers.py` and `api/v1/rate_limits.py` once against the
+configured database, counting the statements sent for the request, authentication included, and compares them
+with the expected counts below. Creates a superuser, a user, a tier and a rate limit with a random suffix and
+removes them again. Exits with status 1 if a count differs or an endpoint fails, so a change that adds a round
+trip to one of these endpoints has to update the expected count on purpose.
+
+    python -m src.scripts.check_query_counts
+"""
+
+import asyncio
+import sys
+from datetime import timedelta
+from typing import Any
+from uuid import uuid4
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import delete, event, or_
+
+from ..app.api.v1.rate_limits import router as rate_limits_router
+from ..app.api.v1.tiers import router as tiers_router
+from ..app.api.v1.users import router as users_router
+from ..app.core.db.database import async_engine, local_session
+from ..app.core.db.token_blacklist import TokenBlacklist
+from ..app.core.security import create_access_token
+from ..app.models.rate_limit import RateLimit
+from ..app.models.tier import Tier
+from ..app.models.user import User
+
+# every authenticated request checks the token blacklist and loads its user
+AUTH = 2
+
+
+def _app() -> FastAPI:
+    # the tier and rate limit routers are not mounted by the application yet
+    app = FastAPI()
+    for router in (users_router, tiers_router, rate_limits_router):
+        app.include_router(router, prefix="/api/v1")
+    return app
+
+
+async def main() -> int:
+    suffix = uuid4().hex[:8]
+    admin, username, tier = f"qcadmin{suffix}", f"qc{suffix}", f"qc-{suffix}"
+    async with local_session() as db:
+        db.add(
+            User(
+                name="Query Count",
+                username=admin,
+                email=f"{admin}@example.com",
+                hashed_password="-",
+                is_superuser=True,
+            )
+        )
+        await db.commit()
+
+    admin_token = await create_access_token({"sub": admin})
+    # deleting a user from the database blacklists the superuser's token
+    spare_admin_token = await create_access_token({"sub": admin}, expires_delta=timedelta(minutes=5))
+    user_token = await create_access_token({"sub": username})
+    ids: dict[str, Any] = {}
+
+    checks: list[tuple[str, str, Any, str | None, int]] = [
+        ("POST", "/tier", {"name": tier}, admin_token, AUTH + 1),
+        ("GET", "/tiers", None, None, 2),
+        ("GET", "/tier/{tier}", None, None, 1),
+        ("PATCH", "/tier/{tier}", {"name": f"{tier}-2"}, admin_token, AUTH + 1),
+        ("POST", "/tier/{tier}-2/rate_limit", {"name": tier, "path": f"qc/{suffix}", "limit": 5, "period": 60},
+         admin_token, AUTH + 1),
+        ("GET", "/tier/{tier}-2/rate_limits", None, None, 1),
+        ("GET", "/tier/{tier}-2/rate_limit/{rate_limit_id}", None, None, 1),
+        ("PATCH", "/tier/{tier}-2/rate_limit/{rate_limit_id}", {"limit": 10}, admin_token, AUTH + 1),
+        ("POST", "/user", {"name": "Query Count", "username": username, "email": f"{username}@example.com",
+                           "password": "Str1ngst!"}, None, 1),
+        ("GET", "/users", None, None, 2),
+        ("GET", "/user/me/", None, user_token, AUTH),
+        ("GET", "/user/{username}", None, None, 1),
+        ("PATCH", "/user/{username}", {"name": "Query Counted"}, user_token, AUTH + 1),
+        ("PATCH", "/user/{username}/tier", {"tier_id": "{tier_id}"}, admin_token, AUTH + 1),
+        ("GET", "/user/{username}/tier", None, None, 1),
+        ("GET", "/user/{username}/rate_limits", None, admin_token, AUTH + 1),
+        ("DELETE", "/user/{username}", None, user_token, AUTH + 2),
+        ("DELETE", "/db_user/{username}", None, spare_admin_token, AUTH + 2),
+        ("DELETE", "/tier/{tier}-2/rate_limit/{rate_limit_id}", None, admin_token, AUTH + 1),
+        ("DELETE", "/tier/{tier}-2", None, admin_token, AUTH + 1),
+    ]
+
+    statements: list[str] = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append(statement)  # noqa: E731
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    failures = 0
+    try:
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test/api/v1") as client:
+            for method, path, body, token, expected in checks:
+                values = {"tier": tier, "username": username, **ids}
+                url = path.format(**values)
+                if isinstance(body, dict):
+                    body = {key: int(ids["tier_id"]) if value == "{tier_id}" else value for key, value in body.items()}
+                headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+                statements.clear()
+                response = await client.request(method, url, json=body, headers=headers)
+                if path == "/tier/{tier}-2/rate_limit" and response.is_success:
+                    ids["rate_limit_id"] = response.json()["id"]
+                    ids["tier_id"] = response.json()["tier_id"]
+
+                ok = response.is_success and len(statements) == expected
+                failures += not ok
+                status = "ok" if ok else "FAIL"
+                print(f"{status:4} {method:6} {path:45} {response.status_code} {len(statements)} queries, "
+                      f"expected {expected}")
+                if not ok:
+                    for statement in statements:
+                        print(f"         {' '.join(statement.split())[:150]}")
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+        async with local_session() as db:
+            await db.execute(delete(RateLimit).where(RateLimit.name == tier))
+            await db.execute(delete(User).where(User.username.in_([admin, username])))
+            await db.execute(delete(Tier).where(or_(Tier.name == tier, Tier.name == f"{tier}-2")))
+            await db.execute(
+                delete(TokenBlacklist).where(TokenBlacklist.token.in_([admin_token, spare_admin_token, user_token]))
+            )
+            await db.commit()
+
+    print(f"{len(checks)} endpoints checked, {failures} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
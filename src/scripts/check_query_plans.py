@@ -0,0 +1,149 @@
+"""Fail if a hot query of the application cannot be answered through an index.
+
+Runs the lookups the API and the worker make on every request or turn - users by email, username and id, tiers,
+rate limits by tier and path, the token blacklist, the joined user, tier and rate limit reads and writes of the
+user and rate limit services, conversation reads, lists, search and turn writes - against
+the configured database, on a few rows seeded for the purpose, and captures the SQL they send. Every captured
+statement is then run through EXPLAIN with `enable_seqscan` off: the planner still chooses a sequential scan
+when no index can serve a query, so any left in a plan is a missing index. Everything happens in one transaction
+that is rolled back. Exits with status 1 if a plan has a sequential scan.
+
+    python -m src.scripts.check_query_plans [--verbose]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ..app.core.db.crud_token_blacklist import crud_token_blacklist
+from ..app.core.db.database import AsyncSession, async_engine
+from ..app.crud.crud_rate_limit import crud_rate_limits
+from ..app.crud.crud_tier import crud_tiers
+from ..app.crud.crud_users import crud_users
+from ..app.models.conversation import Conversation
+from ..app.models.rate_limit import RateLimit
+from ..app.models.tier import Tier
+from ..app.models.user import User
+from ..app.schemas.rate_limit import RateLimitUpdate
+from ..app.schemas.user import UserRead
+from ..app.services import conversation_search, conversation_turns, llm_usage, rate_limits, users
+
+EXPLAINED = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+async def _hot_queries(db: AsyncSession, capture: list[tuple[str, Any]]) -> None:
+    suffix = uuid4().hex[:8]
+    tier = Tier(name=f"plan-check-{suffix}")
+    db.add(tier)
+    await db.flush()
+    user = User(name="Plan Check", username=f"plan{suffix}", email=f"plan-{suffix}@example.com", hashed_password="-")
+    user.tier_id = tier.id
+    db.add(user)
+    await db.flush()
+    rate_limit = RateLimit(tier_id=tier.id, name=f"plan-check-{suffix}", path="api_v1_chat", limit=10, period=60)
+    db.add(rate_limit)
+    conversation = Conversation(created_by_user_id=user.id, queries=[])
+    db.add(conversation)
+    await db.flush()
+
+    listener = lambda conn, cursor, statement, parameters, context, executemany: (  # noqa: E731
+        capture.append((statement, parameters)) if statement.lstrip().upper().startswith(EXPLAINED) else None
+    )
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        # authentication and rate limiting, on every request
+        await crud_users.get(db=db, email=user.email, is_deleted=False)
+        await crud_users.get(db=db, username=user.username, is_deleted=False)
+        await crud_users.get(db=db, id=user.id, is_deleted=False)
+        await crud_token_blacklist.exists(db, token=f"token-{suffix}")
+        await crud_tiers.get(db=db, id=tier.id)
+        await crud_rate_limits.get(db=db, tier_id=tier.id, path="api_v1_chat")
+
+        # users, tiers and rate limits
+        await crud_users.exists(db=db, email=user.email)
+        await crud_users.get_multi(db=db, offset=0, limit=10, schema_to_select=UserRead, is_deleted=False)
+        await crud_tiers.get(db=db, name=tier.name)
+        await crud_rate_limits.get_multi(db=db, tier_id=tier.id)
+        await users.get_user_with_tier(db=db, username=user.username)
+        await users.get_user_with_rate_limits(db=db, username=user.username)
+        await rate_limits.list_rate_limits(db=db, tier_name=tier.name, offset=0, limit=10)
+        await rate_limits.get_rate_limit(db=db, tier_name=tier.name, id=rate_limit.id)
+        await rate_limits.update_rate_limit(
+            db=db, tier_name=tier.name, id=rate_limit.id, values=RateLimitUpdate(limit=20)
+        )
+        await rate_limits.delete_rate_limit(db=db, tier_name=tier.name, id=rate_limit.id)
+
+        # conversations
+        await conversation_turns.append_turn(db=db, conversation_id=conversation.id, query="pagination", response="-")
+        await conversation_turns.append_turn(db=db, conversation_id=conversation.id, query="filters", response="-")
+        await conversation_turns.update_turn(
+            db=db, conversation_id=conversation.id, seq=0, query="cursor pagination", response="-"
+        )
+        await conversation_turns.conversation_exists(
+            db=db, id=conversation.id, created_by_user_id=user.id, is_deleted=False
+        )
+        await conversation_turns.get_conversation(
+            db=db, id=conversation.id, created_by_user_id=user.id, is_deleted=False
+        )
+        await conversation_turns.get_conversation(
+            db=db, limit=1, before=1, id=conversation.id, created_by_user_id=user.id, is_deleted=False
+        )
+        await conversation_turns.list_conversations(db=db, user_id=user.id, limit=20)
+        await conversation_search.search_turns(db=db, user_id=user.id, q="pagination", limit=20)
+        await llm_usage.aggregate(db=db, group_by="day", start=datetime.now(UTC) - timedelta(days=1))
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+
+
+def _seq_scans(plan: dict[str, Any]) -> list[str]:
+    scans = [plan.get("Relation Name", "?")] if plan["Node Type"] == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        scans += _seq_scans(child)
+    return scans
+
+
+async def _explain(conn: AsyncConnection, statement: str, parameters: Any) -> list[str]:
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return _seq_scans(plan[0]["Plan"])
+
+
+async def main(verbose: bool) -> int:
+    captured: list[tuple[str, Any]] = []
+    failures = 0
+    async with async_engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            # the application commits, which only releases savepoints in this session
+            db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+            await _hot_queries(db, captured)
+            await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+            for statement, parameters in captured:
+                scans = await _explain(conn, statement, parameters)
+                failures += bool(scans)
+                if scans or verbose:
+                    status = f"SEQ SCAN on {', '.join(scans)}" if scans else "ok"
+                    print(f"{status}\n    {' '.join(statement.split())}\n")
+        finally:
+            await transaction.rollback()
+
+    print(f"{len(captured)} statements checked, {failures} with sequential scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="print every statement, not only failing ones")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args.verbose)))
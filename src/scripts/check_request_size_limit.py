@@ -0,0 +1,76 @@
+"""Check that `RequestSizeLimitMiddleware` answers oversized bodies with 413.
+
+Sends bodies to a small app behind the middleware: one declaring a `Content-Length` above the limit, multipart
+uploads without a declared length, as chunked uploads are, above and below the limit, and a chunked JSON body above
+it. Exits with status 1 if any response has an unexpected status.
+
+    python -m src.scripts.check_request_size_limit
+"""
+
+import asyncio
+import sys
+from collections.abc import AsyncIterator
+
+import httpx
+from fastapi import Body, FastAPI, UploadFile
+
+from ..app.middleware.request_size_limit_middleware import RequestSizeLimitMiddleware
+
+LIMIT = 64 * 1024
+BOUNDARY = "size-limit-check"
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile) -> dict[str, int]:
+        return {"size": len(await file.read())}
+
+    @app.post("/json")
+    async def json_body(payload: dict = Body(...)) -> dict[str, int]:
+        return {"keys": len(payload)}
+
+    app.add_middleware(RequestSizeLimitMiddleware, max_body_size=LIMIT)
+    return app
+
+
+def _multipart(size: int) -> bytes:
+    return (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="data.bin"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n".encode()
+        + b"x" * size
+        + f"\r\n--{BOUNDARY}--\r\n".encode()
+    )
+
+
+async def _chunked(body: bytes, chunk_size: int = 8 * 1024) -> AsyncIterator[bytes]:
+    for start in range(0, len(body), chunk_size):
+        yield body[start : start + chunk_size]
+
+
+async def main() -> int:
+    multipart = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    checks = [
+        ("declared length over the limit", "/upload", _multipart(2 * LIMIT), multipart, False, 413),
+        ("chunked upload over the limit", "/upload", _multipart(2 * LIMIT), multipart, True, 413),
+        ("chunked upload under the limit", "/upload", _multipart(LIMIT // 2), multipart, True, 200),
+        ("chunked JSON over the limit", "/json", b'{"a": "' + b"x" * 2 * LIMIT + b'"}',
+         {"Content-Type": "application/json"}, True, 413),
+    ]
+
+    failures = 0
+    transport = httpx.ASGITransport(app=_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for label, path, body, headers, chunked, expected in checks:
+            content = _chunked(body) if chunked else body
+            response = await client.post(path, content=content, headers=headers)
+            ok = response.status_code == expected
+            failures += not ok
+            print(f"{'ok' if ok else 'FAIL':4} {label:32} {response.status_code}, expected {expected}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,203 @@
+"""Serve a local stand-in for the OpenAI chat completions API.
+
+Answers `POST /v1/chat/completions`, streamed or not, with generated text after a sampled time-to-first-token and
+at a fixed token rate, and can inject errors. Point the app and worker at it with
+`OPENAI_BASE_URL=http://localhost:8001/v1/` to exercise the chat path without spending tokens.
+
+    python -m src.scripts.fake_openai_server --port 8001 --latency lognormal --latency-ms 400 \\
+        --tokens-per-second 60 --completion-tokens 200 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import uuid4
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHARS_PER_TOKEN = 4
+WORDS = (
+    "The endpoint accepts a JSON body and returns the created resource with its identifier. Requests must carry "
+    "a bearer token; missing or expired tokens are answered with 401 and a machine readable error code."
+).split()
+
+ERRORS = {
+    429: ("rate_limit_exceeded", "Rate limit reached for requests"),
+    500: ("server_error", "The server had an error while processing your request"),
+    503: ("service_unavailable", "The engine is currently overloaded, please try again later"),
+}
+
+
+@dataclass
+class FakeSettings:
+    latency: str = "constant"
+    latency_ms: float = 300.0
+    latency_jitter_ms: float = 100.0
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 150
+    error_rate: float = 0.0
+    error_statuses: list[int] = field(default_factory=lambda: [429, 500, 503])
+    hang_rate: float = 0.0
+
+
+fake_settings = FakeSettings()
+rng = random.Random()
+app = FastAPI(title="Fake OpenAI")
+
+
+def _first_token_delay() -> float:
+    """Sample the time to first token, in seconds, from the configured distribution."""
+    mean, jitter = fake_settings.latency_ms, fake_settings.latency_jitter_ms
+    if fake_settings.latency == "uniform":
+        delay = rng.uniform(mean - jitter, mean + jitter)
+    elif fake_settings.latency == "normal":
+        delay = rng.gauss(mean, jitter)
+    elif fake_settings.latency == "lognormal":
+        # parameters chosen so the distribution has the configured mean and standard deviation
+        sigma = math.sqrt(math.log(1 + (jitter / mean) ** 2)) if mean > 0 else 0
+        delay = rng.lognormvariate(math.log(mean) - sigma**2 / 2, sigma) if mean > 0 else 0
+    elif fake_settings.latency == "exponential":
+        delay = rng.expovariate(1 / mean) if mean > 0 else 0
+    else:
+        delay = mean
+
+    return max(delay, 0) / 1000
+
+
+def _prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    chars = 0
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        chars += len(content)
+    return chars // CHARS_PER_TOKEN + 4 * len(messages)
+
+
+def _tokens(count: int) -> list[str]:
+    return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+def _error(status: int) -> JSONResponse:
+    code, message = ERRORS.get(status, ("server_error", "Injected error"))
+    headers = {"retry-after": "1"} if status == 429 else None
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": code, "param": None, "code": code}},
+        headers=headers,
+    )
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> Any:
+    body = await request.json()
+    if rng.random() < fake_settings.hang_rate:
+        # stand in for an upstream that accepts the request and never answers
+        await asyncio.sleep(3600)
+    if rng.random() < fake_settings.error_rate:
+        return _error(rng.choice(fake_settings.error_statuses))
+
+    model = body.get("model", "gpt-3.5-turbo")
+    prompt_tokens = _prompt_tokens(body.get("messages", []))
+    completion_tokens = min(body.get("max_tokens") or fake_settings.completion_tokens, fake_settings.completion_tokens)
+    tokens = _tokens(completion_tokens)
+    token_interval = 1 / fake_settings.tokens_per_second if fake_settings.tokens_per_second > 0 else 0
+    completion_id = f"chatcmpl-{uuid4().hex}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(_first_token_delay() + token_interval * completion_tokens)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "finish_reason": "length" if completion_tokens == body.get("max_tokens") else "stop",
+                }
+            ],
+            "usage": _usage(prompt_tokens, completion_tokens),
+        }
+
+    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+    def chunk(delta: dict[str, Any], finish_reason: str | None = None, usage: dict | None = None) -> str:
+        choices = [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": choices,
+        }
+        if usage:
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream() -> AsyncIterator[str]:
+        await asyncio.sleep(_first_token_delay())
+        yield chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            yield chunk({"content": token})
+            await asyncio.sleep(token_interval)
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield chunk({}, usage=_usage(prompt_tokens, completion_tokens))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.get("/v1/models")
+async def list_models() -> dict[str, Any]:
+    return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "owned_by": "fake"}]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument(
+        "--latency", choices=["constant", "uniform", "normal", "lognormal", "exponential"], default="constant"
+    )
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mean time to first token")
+    parser.add_argument("--latency-jitter-ms", type=float, default=100.0, help="spread of the time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=[429, 500, 503])
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests never answered")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    fake_settings = FakeSettings(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_statuses=args.error_statuses,
+        hang_rate=args.hang_rate,
+    )
+    rng.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
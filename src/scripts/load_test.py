@@ -0,0 +1,188 @@
+"""Drive the chat path of a running stack with concurrent virtual users and report a latency baseline.
+
+Every virtual user logs in once, then repeatedly opens a conversation, sends `--turns` chat messages to it and
+reads its conversation list and the conversation back. Users `loadtest<n>` are created through the public sign-up
+endpoint when missing. Run the app against the fake upstream to avoid spending tokens:
+
+    python -m src.scripts.fake_openai_server --port 8001 &
+    OPENAI_BASE_URL=http://localhost:8001/v1/ uvicorn src.app.main:app --port 8000 &
+    python -m src.scripts.load_test --users 20 --duration 60 --output baseline.json
+    python -m src.scripts.load_test --users 20 --duration 60 --compare baseline.json
+
+The report is JSON with throughput, p50/p95/p99 latency and error rate overall and per step; `--compare` adds the
+relative change of each of those against an earlier report.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Any
+
+import httpx
+
+MESSAGE = "Design a REST API for a blog with users, posts and comments. Use JWT authentication."
+FOLLOW_UP = "Add pagination to the list endpoints and describe the error responses."
+COMPARED_FIELDS = ("throughput_rps", "error_rate", "p50_ms", "p95_ms", "p99_ms")
+# a virtual user whose conversation could not be created waits this long before trying again, doubling up to the max
+RETRY_BACKOFF = 0.5
+RETRY_BACKOFF_MAX = 8.0
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.statuses: dict[str, Counter[str]] = defaultdict(Counter)
+
+    async def request(self, client: httpx.AsyncClient, step: str, method: str, url: str, **kwargs: Any) -> Any:
+        """Send one request, recording its latency and outcome under `step`; returns the JSON body or `None`."""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+
+        self.latencies[step].append((time.perf_counter() - start) * 1000)
+        self.statuses[step][status] += 1
+        if response is None or response.is_error:
+            self.errors[step] += 1
+            return None
+
+        return response.json() if response.content else {}
+
+    def _summary(self, latencies: list[float], errors: int, elapsed: float) -> dict[str, Any]:
+        ordered = sorted(latencies)
+        return {
+            "requests": len(ordered),
+            "errors": errors,
+            "error_rate": round(errors / len(ordered), 4) if ordered else 0,
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(_percentile(ordered, 0.50), 1) if ordered else None,
+            "p95_ms": round(_percentile(ordered, 0.95), 1) if ordered else None,
+            "p99_ms": round(_percentile(ordered, 0.99), 1) if ordered else None,
+            "max_ms": round(ordered[-1], 1) if ordered else None,
+        }
+
+    def report(self, elapsed: float) -> dict[str, Any]:
+        all_latencies = [latency for latencies in self.latencies.values() for latency in latencies]
+        steps = {
+            step: {**self._summary(latencies, self.errors[step], elapsed), "statuses": dict(self.statuses[step])}
+            for step, latencies in sorted(self.latencies.items())
+        }
+        return {"overall": self._summary(all_latencies, sum(self.errors.values()), elapsed), "steps": steps}
+
+
+async def _ensure_user(client: httpx.AsyncClient, username: str, password: str) -> None:
+    await client.post(
+        "/api/v1/user",
+        json={"name": username, "username": username, "email": f"{username}@example.com", "password": password},
+    )
+
+
+async def virtual_user(
+    client: httpx.AsyncClient, recorder: Recorder, username: str, password: str, turns: int, deadline: float
+) -> None:
+    token = await recorder.request(
+        client, "login", "POST", "/api/v1/login", data={"username": username, "password": password}
+    )
+    if token is None:
+        return
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    backoff = RETRY_BACKOFF
+    while time.perf_counter() < deadline:
+        conversation = await recorder.request(
+            client, "create_conversation", "POST", "/api/v1/conversations", headers=headers
+        )
+        if conversation is None:
+            # retrying at once would flood the server and the report with errors
+            await asyncio.sleep(min(backoff, max(deadline - time.perf_counter(), 0)))
+            backoff = min(backoff * 2, RETRY_BACKOFF_MAX)
+            continue
+        backoff = RETRY_BACKOFF
+
+        for turn in range(turns):
+            request = {"message": MESSAGE, "conversation_id": conversation["id"]}
+            if turn > 0:
+                request["follow_up"] = FOLLOW_UP
+            await recorder.request(client, "chat", "POST", "/api/v1/chat", json=request, headers=headers)
+
+        await recorder.request(client, "list_conversations", "GET", "/api/v1/conversations", headers=headers)
+        await recorder.request(
+            client, "read_conversation", "GET", f"/api/v1/conversations/{conversation['id']}", headers=headers
+        )
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any]) -> dict[str, Any]:
+    """Relative change of the compared fields of every step present in both reports."""
+
+    def delta(current: dict[str, Any], previous: dict[str, Any]) -> dict[str, float | None]:
+        return {
+            name: round((current[name] - previous[name]) / previous[name], 4) if previous.get(name) else None
+            for name in COMPARED_FIELDS
+            if current.get(name) is not None
+        }
+
+    steps = {
+        step: delta(summary, baseline["steps"][step])
+        for step, summary in report["steps"].items()
+        if step in baseline.get("steps", {})
+    }
+    return {"overall": delta(report["overall"], baseline["overall"]), "steps": steps}
+
+
+async def main(args: argparse.Namespace) -> None:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        usernames = [f"loadtest{i}" for i in range(args.users)]
+        if not args.skip_signup:
+            await asyncio.gather(*(_ensure_user(client, username, args.password) for username in usernames))
+
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(
+            *(
+                virtual_user(client, recorder, username, args.password, args.turns, deadline)
+                for username in usernames
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+    report = {
+        "config": {"base_url": args.base_url, "users": args.users, "duration_s": args.duration, "turns": args.turns},
+        "elapsed_s": round(elapsed, 3),
+        **recorder.report(elapsed),
+    }
+    if args.compare:
+        with open(args.compare) as file:
+            report["change_vs_baseline"] = compare(report, json.load(file))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to keep starting new conversations")
+    parser.add_argument("--turns", type=int, default=3, help="chat messages per conversation")
+    parser.add_argument("--password", default="Str1ngst!")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--skip-signup", action="store_true", help="do not create missing load test users")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--compare", help="earlier report to compare against")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,149 @@
+"""Report table and index sizes and the latency of the hot soft-delete filtered lookups.
+
+Meant to be run before and after index or archival changes against the same database: the sizes of the
+`conversation`, `conversation_turn` and `user` tables and of each of their indexes, and p50/p99 latencies of
+listing conversations, reading a conversation, looking up a user and listing users, each with `is_deleted=False`.
+Lookups are made for randomly picked live rows.
+
+    python -m src.scripts.report_live_lookups --output before.json
+    alembic upgrade head   # or run the archive_soft_deleted job
+    python -m src.scripts.report_live_lookups --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy import bindparam, false, select, text
+
+from ..app.core.db.database import AsyncSession, local_session
+from ..app.crud.crud_conversations import crud_conversations
+from ..app.crud.crud_users import crud_users
+from ..app.models.conversation import Conversation
+from ..app.models.user import User
+from ..app.schemas.conversation import ConversationRead
+from ..app.schemas.user import UserRead
+from ..app.services import conversation_turns
+
+TABLES = ("conversation", "conversation_turn", "user")
+SIZES = text(
+    """
+    SELECT c.relname AS name, t.relname AS "table", c.relkind = 'i' AS is_index,
+           pg_relation_size(c.oid) AS bytes, pg_total_relation_size(c.oid) AS total_bytes
+    FROM pg_class c
+    LEFT JOIN pg_index i ON i.indexrelid = c.oid
+    JOIN pg_class t ON t.oid = coalesce(i.indrelid, c.oid)
+    WHERE t.relname IN :tables AND c.relkind IN ('r', 'i')
+    ORDER BY t.relname, c.relkind DESC, c.relname
+    """
+).bindparams(bindparam("tables", expanding=True))
+SAMPLE_SIZE = 100
+
+
+async def _sizes(db: AsyncSession) -> dict[str, Any]:
+    rows = (await db.execute(SIZES, {"tables": list(TABLES)})).mappings()
+    return {row["name"]: {"table": row["table"], "is_index": row["is_index"], "bytes": row["bytes"]} for row in rows}
+
+
+async def _latencies(run: Callable[[], Awaitable[Any]], runs: int) -> dict[str, float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await run()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p99_ms": round(samples[round(0.99 * (len(samples) - 1))] * 1000, 3),
+    }
+
+
+async def _lookups(db: AsyncSession, runs: int, rng: random.Random) -> dict[str, dict[str, float]]:
+    conversations = (
+        await db.execute(
+            select(Conversation.id, Conversation.created_by_user_id)
+            .where(Conversation.is_deleted == false())
+            .limit(SAMPLE_SIZE)
+        )
+    ).all()
+    usernames = list(
+        (await db.execute(select(User.username).where(User.is_deleted == false()).limit(SAMPLE_SIZE))).scalars()
+    )
+    if not conversations or not usernames:
+        raise SystemExit("The database needs live users and conversations to look up")
+
+    async def list_conversations() -> None:
+        user_id = rng.choice(conversations).created_by_user_id
+        await conversation_turns.list_conversations(db=db, user_id=user_id, limit=20)
+
+    async def read_conversation() -> None:
+        conversation = rng.choice(conversations)
+        await crud_conversations.get(
+            db=db,
+            schema_to_select=ConversationRead,
+            id=conversation.id,
+            created_by_user_id=conversation.created_by_user_id,
+            is_deleted=False,
+        )
+
+    async def read_user() -> None:
+        await crud_users.get(db=db, schema_to_select=UserRead, username=rng.choice(usernames), is_deleted=False)
+
+    async def list_users() -> None:
+        await crud_users.get_multi(db=db, offset=0, limit=10, schema_to_select=UserRead, is_deleted=False)
+
+    return {
+        "list_conversations": await _latencies(list_conversations, runs),
+        "read_conversation": await _latencies(read_conversation, runs),
+        "read_user": await _latencies(read_user, runs),
+        "list_users": await _latencies(list_users, runs),
+    }
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any]) -> dict[str, Any]:
+    """Relative change of every size and latency against an earlier report."""
+
+    def delta(current: float, previous: float | None) -> float | None:
+        return round((current - previous) / previous, 4) if previous else None
+
+    return {
+        "sizes": {
+            name: delta(size["bytes"], baseline["sizes"].get(name, {}).get("bytes"))
+            for name, size in report["sizes"].items()
+        },
+        "lookups": {
+            name: {field: delta(value, baseline["lookups"].get(name, {}).get(field)) for field, value in stats.items()}
+            for name, stats in report["lookups"].items()
+        },
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with local_session() as db:
+        report = {
+            "sizes": await _sizes(db),
+            "lookups": await _lookups(db, args.runs, random.Random(args.seed)),
+        }
+    if args.compare:
+        with open(args.compare) as file:
+            report["change_vs_baseline"] = compare(report, json.load(file))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=500, help="timed runs per lookup")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--compare", help="earlier report to compare against")
+
+    asyncio.run(main(parser.parse_args()))